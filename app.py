@@ -1,5 +1,6 @@
 import streamlit as st
 from datetime import datetime
+import html
 
 # Configuração da página deve ser SEMPRE o primeiro comando Streamlit
 st.set_page_config(
@@ -8,9 +9,12 @@ st.set_page_config(
     page_icon="LOGO VERMELHO.png"
 )
 
-import bcrypt
 import departamento_pessoal
 import beneficios
+import historico
+import sessao
+import snapshot
+from indices import EVENTO_ANIVERSARIO, obter_indice_eventos
 import pandas as pd
 import gspread
 from google.oauth2.service_account import Credentials
@@ -18,7 +22,7 @@ from google.oauth2.service_account import Credentials
 # ==============================
 # CARREGAMENTO DE DADOS (ATUALIZADO)
 # ==============================
-@st.cache_data(ttl=600)
+# Sem cache próprio: quem chama é a loja de snapshots, no máximo uma vez a cada 10 min por processo
 def load_google_sheet():
     creds = Credentials.from_service_account_info(
         st.secrets["gcp_service_account"],
@@ -42,20 +46,14 @@ def load_google_sheet():
 
     return df_ativos, df_desligados
 
-# ==============================
-# FUNÇÃO LOGIN
-# ==============================
-def verificar_senha(senha_digitada, senha_hash):
-    return bcrypt.checkpw(
-        senha_digitada.encode("utf-8"),
-        senha_hash.encode("utf-8")
-    )
-
 # ==============================
 # CONTROLE DE SESSÃO
 # ==============================
+# Recarregar a página não pede login de novo: o cookie assinado é conferido sem bcrypt
 if "authenticated" not in st.session_state:
-    st.session_state.authenticated = False
+    st.session_state.authenticated = "users" in st.secrets and sessao.restaurar_sessao()
+
+sessao.aplicar_cookie()
 
 # ==============================
 # TELA DE LOGIN
@@ -73,16 +71,17 @@ if not st.session_state.authenticated:
 
         if st.button("Entrar", use_container_width=True):
             if "users" in st.secrets:
-                users = st.secrets["users"]
-                
-                if usuario in users and verificar_senha(senha, users[usuario]["password"]):
-                    st.session_state.authenticated = True
-                    st.session_state.user_name = users[usuario]["name"]
+                ok, erro = sessao.autenticar(usuario, senha)
+                if ok:
+                    sessao.iniciar_sessao(usuario)
                     st.rerun()
                 else:
-                    st.error("Usuário ou senha inválidos")
+                    st.error(erro)
             else:
                 st.error("Erro de configuração: Usuários não encontrados nos Secrets.")
+
+        if "users" in st.secrets and not sessao.cookie_disponivel():
+            st.caption("ℹ️ Sem \"session_secret\" nos Secrets o login não fica salvo: recarregar a página pede a senha de novo.")
     
 # ==============================
 # ÁREA AUTENTICADA (SISTEMA)
@@ -91,17 +90,26 @@ else:
     # Carrega os dados
     with st.spinner("Sincronizando dados com Google Sheets..."):
         try:
-            df_ativos, df_desligados = load_google_sheet()
+            loja = snapshot.loja_snapshots()
+            snap = loja.obter(load_google_sheet, departamento_pessoal.preparar_dataframe)
         except Exception as e:
             st.error(f"Erro ao conectar com a planilha: {e}")
             st.stop()
 
+    # Visões rasas do snapshot do processo (nenhuma cópia por sessão)
+    df_ativos, df_desligados = snap.ativos, snap.desligados
+
+    # Histórico: grava as alterações do dia (uma vez por versão dos dados)
+    historico.registrar_snapshot_diario(df_ativos, df_desligados)
+
     # --------------------------------------------------
     # SIDEBAR
     # --------------------------------------------------
     st.sidebar.markdown("<br>", unsafe_allow_html=True)
     
     st.sidebar.success(f"Olá, {st.session_state.get('user_name', 'Gestor')}")
+    if loja.ultimo_erro is not None:
+        st.sidebar.warning(f"⚠️ Planilha indisponível: exibindo os dados de {snap.carregado_em.strftime('%d/%m %H:%M')}.")
 
     pagina = st.sidebar.radio(
         "Navegação",
@@ -112,16 +120,29 @@ else:
         ]
     )
 
+    # --- RESUMO DA CENTRAL DE ALERTAS ---
+    df_alertas = departamento_pessoal.central_alertas(df_ativos)
+    if not df_alertas.empty:
+        contagem = df_alertas["Tipo"].value_counts()
+        st.sidebar.markdown(f"""
+            <div style="padding: 8px 10px; border-left: 4px solid #E30613; background-color: #fff; border-radius: 4px; font-size: 0.9rem;">
+                <b>Alertas de hoje</b><br>
+                🚨 {contagem.get("error", 0)} &nbsp; ⚠️ {contagem.get("warning", 0)} &nbsp; ℹ️ {contagem.get("info", 0)} &nbsp; 🎉 {contagem.get("success", 0)}
+            </div>
+        """, unsafe_allow_html=True)
+        st.sidebar.caption("Detalhes em Departamento Pessoal › Analytics › Operacional")
+
     st.sidebar.markdown("---")
     
     # --- BOTÃO DE ATUALIZAR DADOS ---
     if st.sidebar.button("🔄 Atualizar Dados"):
         st.cache_data.clear()
+        snapshot.loja_snapshots().invalidar()
         st.rerun()
 
     # --- BOTÃO DE LOGOUT ---
     if st.sidebar.button("Sair"):
-        st.session_state.authenticated = False
+        sessao.encerrar_sessao()
         st.rerun()
 
     # --------------------------------------------------
@@ -146,37 +167,28 @@ else:
         if 'df_ativos' in locals() or 'df_ativos' in globals():
             hoje = datetime.now()
             
-            df_niver = df_ativos.copy()
-            df_niver['dt_nasc'] = pd.to_datetime(df_niver['Data de nascimento'], dayfirst=True, errors='coerce')
-            df_niver = df_niver[df_niver['dt_nasc'].notna()]
-            df_niver['dia'] = df_niver['dt_nasc'].dt.day
-            df_niver['mes'] = df_niver['dt_nasc'].dt.month
+            indice_eventos = obter_indice_eventos(df_ativos)
+            aniv_hoje = [e for e in indice_eventos.do_dia(hoje) if e["Tipo"] == EVENTO_ANIVERSARIO]
 
-            aniv_hoje = df_niver[(df_niver['dia'] == hoje.day) & (df_niver['mes'] == hoje.month)].to_dict('records')
+            # Espaçamento para não grudar na mensagem de boas-vindas
+            st.markdown("<br>", unsafe_allow_html=True)
+            
+            # Criamos colunas: a primeira é pequena para o card, a segunda para a agenda
+            col_card, col_futuro = st.columns([0.8, 3.2])
 
             if aniv_hoje:
                 if "idx_niver_land" not in st.session_state:
                     st.session_state.idx_niver_land = 0
                 
                 st.session_state.idx_niver_land = st.session_state.idx_niver_land % len(aniv_hoje)
-                p = aniv_hoje[st.session_state.idx_niver_land]
-                
-                nome_p = p['Nome'].split()[0]
-                nasc_p = p.get('Data de nascimento', '')
-                foto_p = p.get('Foto', '')
-
-                # Espaçamento para não grudar na mensagem de boas-vindas
-                st.markdown("<br>", unsafe_allow_html=True)
-                
-                # Criamos colunas: a primeira é pequena para o card, a segunda sobra para o futuro
-                col_card, col_futuro = st.columns([0.8, 3.2])
                 
                 with col_card:
                     # Pegamos os dados
                     p = aniv_hoje[st.session_state.idx_niver_land]
-                    nome_p = p['Nome'].split()[0]
-                    nasc_p = p.get('Data de nascimento', '')
-                    foto_p = p.get('Foto', '')
+                    # Vêm da planilha e entram num bloco HTML: escapados antes
+                    nome_p = html.escape(p['Nome'].split()[0])
+                    nasc_p = p['Origem'].strftime("%d/%m/%Y")
+                    foto_p = html.escape(str(p.get('Foto', '') or ''))
         
                     # 1. Quadrado Superior (HTML)
                     st.markdown(f"""
@@ -225,9 +237,28 @@ else:
                             if st.button(f"Próximo ({st.session_state.idx_niver_land + 1}/{len(aniv_hoje)}) ➔", key="btn_niver_final_v4"):
                                 st.session_state.idx_niver_land += 1
                                 st.rerun()
+
+            # --- AGENDA: ANIVERSÁRIOS, TEMPO DE CASA E PRAZOS ---
+            with col_futuro:
+                with st.container(border=True):
+                    st.markdown("<p style='margin: 0; font-weight: bold; color: #E30613; font-size: 0.9rem; text-transform: uppercase;'>📅 Próximos eventos</p>", unsafe_allow_html=True)
+                    periodo = st.radio("Período", ["Hoje", "Próximos 7 dias", "Este mês"], index=1, horizontal=True, label_visibility="collapsed", key="radio_agenda")
+                    if periodo == "Hoje":
+                        eventos = indice_eventos.do_dia(hoje)
+                    elif periodo == "Próximos 7 dias":
+                        eventos = indice_eventos.proximos(hoje, dias=7)
+                    else:
+                        eventos = indice_eventos.do_mes(hoje.year, hoje.month)
+
+                    if eventos:
+                        df_eventos = pd.DataFrame(eventos)[["Data", "Tipo", "Nome", "Detalhe"]]
+                        df_eventos["Data"] = pd.to_datetime(df_eventos["Data"]).dt.strftime("%d/%m")
+                        st.dataframe(df_eventos, use_container_width=True, hide_index=True, height=min(35 * (len(df_eventos) + 1) + 3, 300))
+                    else:
+                        st.caption("Nenhum evento no período.")
         
     elif pagina == "💼 Departamento Pessoal":
-        departamento_pessoal.render(df_ativos, df_desligados)
+        departamento_pessoal.render(df_ativos, df_desligados, snap.ativos_proc, snap.desligados_proc)
     
     elif pagina == "🎁 Benefícios":
         beneficios.render(df_ativos)
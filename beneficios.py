@@ -4,47 +4,18 @@ import altair as alt
 import re
 import unicodedata
 from datetime import datetime, date
-from docx import Document
 import gspread
 from google.oauth2.service_account import Credentials
 import os
+from documentos import (
+    MESES_PT, botoes_documento, documento_guardado, email_para_nome_arquivo, formatar_cnpj,
+    gerar_docx_com_substituicoes, guardar_documento, modal_documentos_em_lote, normalizar_cpf,
+)
+from indices import selecionar_registro
 
 # ==========================================
 # FUNÇÕES AUXILIARES
 # ==========================================
-MESES_PT = {
-    1: "janeiro", 2: "fevereiro", 3: "março", 4: "abril",
-    5: "maio", 6: "junho", 7: "julho", 8: "agosto",
-    9: "setembro", 10: "outubro", 11: "novembro", 12: "dezembro"
-}
-
-def substituir_texto(paragraphs, mapa):
-    for p in paragraphs:
-        for run in p.runs:
-            for chave, valor in mapa.items():
-                if chave in run.text:
-                    run.text = run.text.replace(chave, str(valor))
-
-def formatar_cnpj(valor):
-    if pd.isna(valor) or valor == "":
-        return ""
-    v = str(valor).replace(".0", "").replace(".", "").replace("-", "").replace("/", "").strip()
-    v = v.zfill(14)
-    if len(v) == 14:
-        return f"{v[:2]}.{v[2:5]}.{v[5:8]}/{v[8:12]}-{v[12:]}"
-    return v
-
-def normalizar_cpf(valor):
-    if pd.isna(valor) or valor == "":
-        return ""
-    v = str(valor).replace(".0", "").replace(".", "").replace("-", "").replace("/", "").strip()
-    return re.sub(r"\D", "", v).zfill(11)
-
-def email_para_nome_arquivo(email):
-    if not email:
-        return ""
-    return str(email).replace("@", "_").replace(".", "_").lower()
-
 def carregar_desligados_google_sheets():
     # Tenta carregar credenciais usando st.secrets (mais seguro e correto para o Streamlit Cloud)
     try:
@@ -91,14 +62,14 @@ def carregar_desligados_google_sheets():
 def modal_inclusao_subfatura(df):
     nomes = sorted(df["Nome"].dropna().unique())
     nome_escolhido = st.selectbox("Selecione o investidor", nomes, key="nome_subfatura")
+    dados = selecionar_registro(df, nome_escolhido, key="subfatura")
     data_vigencia = st.date_input("Data de início da vigência", format="DD/MM/YYYY")
+    selecao = (nome_escolhido, str(dados.get("CPF", "")), data_vigencia)
 
     st.markdown("<br>", unsafe_allow_html=True)
     col1, col2, col3 = st.columns([1, 2, 1])
     
     if col2.button("✅ Gerar", use_container_width=True, key="btn_subfatura"):
-        dados = df[df["Nome"] == nome_escolhido].iloc[0]
-        
         razao_social = str(dados.get("Razão social", ""))
         cnpj = formatar_cnpj(dados.get("CNPJ", ""))
         cpf = normalizar_cpf(dados.get("CPF", ""))
@@ -110,7 +81,6 @@ def modal_inclusao_subfatura(df):
             st.warning(f"⚠️ **{nome_escolhido}** não possui contrato PJ. Modelo atual: **{modelo_contrato}**")
 
         try:
-            doc = Document("Subfatura.docx")
             vigencia_formatada = data_vigencia.strftime("%d/%m/%Y")
             hoje = date.today()
             data_assinatura = f"{hoje.day} de {MESES_PT[hoje.month]} de {hoje.year}"
@@ -122,35 +92,30 @@ def modal_inclusao_subfatura(df):
                 "{DATA}": data_assinatura
             }
 
-            substituir_texto(doc.paragraphs, mapa)
-            for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        substituir_texto(cell.paragraphs, mapa)
-            for section in doc.sections:
-                substituir_texto(section.header.paragraphs, mapa)
+            dados_doc = gerar_docx_com_substituicoes("Subfatura.docx", mapa)
 
             cpf_limpo = re.sub(r"\D", "", cpf)
             nome_arquivo = f"{nome_escolhido} __ {cpf_limpo} __ {email_arquivo} __ Inclusão Subfatura.docx"
-            doc.save(nome_arquivo)
 
-            with open(nome_arquivo, "rb") as f:
-                st.download_button("⬇️ Download", f, file_name=nome_arquivo, mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document", use_container_width=True)
-            
-            st.link_button("🔁 Converter PDF", "https://www.ilovepdf.com/pt/word_para_pdf", use_container_width=True)
+            guardar_documento("subfatura", selecao, nome_arquivo, dados_doc)
             st.success("Inclusão Subfatura gerada com sucesso ✅")
 
         except Exception as e:
             st.error(f"Erro ao gerar documento: {e}")
 
+    guardado = documento_guardado("subfatura", selecao)
+    if guardado:
+        botoes_documento(st, guardado[1], guardado[0], "subfatura")
+
 @st.dialog("📄 Gerar Termo de Subestipulante")
 def modal_subestipulante(df):
     nomes = sorted(df["Nome"].dropna().unique())
     nome_escolhido = st.selectbox("Selecione o investidor", nomes, key="nome_termo_sub")
+    dados = selecionar_registro(df, nome_escolhido, key="termo_sub")
+    selecao = (nome_escolhido, str(dados.get("CPF", "")))
 
     col1, col2, col3 = st.columns([1, 2, 1])
     if col2.button("✅ Gerar Termo", use_container_width=True, key="btn_termo_sub"):
-        dados = df[df["Nome"] == nome_escolhido].iloc[0]
         razao_social = str(dados.get("Razão social", ""))
         cnpj = formatar_cnpj(dados.get("CNPJ", ""))
         cpf = normalizar_cpf(dados.get("CPF", ""))
@@ -158,70 +123,56 @@ def modal_subestipulante(df):
         email_arquivo = email_para_nome_arquivo(email_pessoal)
 
         try:
-            doc = Document("Termo de integração de subestipulante.docx")
             hoje = date.today()
             data_assinatura = f"{hoje.day} de {MESES_PT[hoje.month]} de {hoje.year}"
 
             mapa = {"{RAZAO_SOCIAL}": razao_social, "{CNPJ}": cnpj, "{DATA}": data_assinatura}
 
-            substituir_texto(doc.paragraphs, mapa)
-            for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        substituir_texto(cell.paragraphs, mapa)
-            for section in doc.sections:
-                substituir_texto(section.header.paragraphs, mapa)
+            dados_doc = gerar_docx_com_substituicoes("Termo de integração de subestipulante.docx", mapa)
 
             cpf_limpo = re.sub(r"\D", "", cpf)
             nome_arquivo = f"{nome_escolhido} __ {cpf_limpo} __ {email_arquivo} __ Termo Subestipulante.docx"
-            doc.save(nome_arquivo)
 
-            with open(nome_arquivo, "rb") as f:
-                st.download_button("⬇️ Download", f, file_name=nome_arquivo, mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document", use_container_width=True)
-            
-            st.link_button("🔁 Converter PDF", "https://www.ilovepdf.com/pt/word_para_pdf", use_container_width=True)
+            guardar_documento("termo_sub", selecao, nome_arquivo, dados_doc)
             st.success("Termo de Subestipulante gerado com sucesso ✅")
         except Exception as e:
             st.error(f"Erro ao gerar documento: {e}")
 
+    guardado = documento_guardado("termo_sub", selecao)
+    if guardado:
+        botoes_documento(st, guardado[1], guardado[0], "termo_sub")
+
 @st.dialog("📄 Gerar Termo de Não Adesão")
 def modal_nao_adesao(df):
     nomes = sorted(df["Nome"].dropna().unique())
     nome_escolhido = st.selectbox("Selecione o investidor", nomes, key="nome_nao_adesao")
+    dados = selecionar_registro(df, nome_escolhido, key="nao_adesao")
+    selecao = (nome_escolhido, str(dados.get("CPF", "")))
 
     col1, col2, col3 = st.columns([1, 2, 1])
     if col2.button("✅ Gerar Termo", use_container_width=True, key="btn_nao_adesao"):
-        dados = df[df["Nome"] == nome_escolhido].iloc[0]
         razao_social = str(dados.get("Razão social", ""))
         cnpj = formatar_cnpj(dados.get("CNPJ", ""))
         
         try:
-            doc = Document("Termo de não adesão - Plano de Saúde e Dental.docx")
             hoje = date.today()
             data_assinatura = f"{hoje.day} de {MESES_PT[hoje.month]} de {hoje.year}"
             
             mapa = {"{RAZAO_SOCIAL}": razao_social, "{CNPJ}": cnpj, "{DATA}": data_assinatura}
 
-            substituir_texto(doc.paragraphs, mapa)
-            for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        substituir_texto(cell.paragraphs, mapa)
-            for section in doc.sections:
-                substituir_texto(section.header.paragraphs, mapa)
-                substituir_texto(section.footer.paragraphs, mapa)
+            dados_doc = gerar_docx_com_substituicoes("Termo de não adesão - Plano de Saúde e Dental.docx", mapa)
 
             nome_arquivo = f"Termo de não adesão ao plano - {nome_escolhido}.docx"
-            doc.save(nome_arquivo)
 
-            with open(nome_arquivo, "rb") as f:
-                st.download_button("⬇️ Download", f, file_name=nome_arquivo, mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document", use_container_width=True)
-            
-            st.link_button("🔁 Converter PDF", "https://www.ilovepdf.com/pt/word_para_pdf", use_container_width=True)
+            guardar_documento("nao_adesao", selecao, nome_arquivo, dados_doc)
             st.success("Termo de Não Adesão gerado com sucesso ✅")
         except Exception as e:
             st.error(f"Erro ao gerar documento: {e}")
 
+    guardado = documento_guardado("nao_adesao", selecao)
+    if guardado:
+        botoes_documento(st, guardado[1], guardado[0], "nao_adesao")
+
 @st.dialog("📄 Gerar Exclusão Subfatura")
 def modal_exclusao_subfatura():
     # Carrega planilha de desligados (função específica)
@@ -233,14 +184,14 @@ def modal_exclusao_subfatura():
 
     nomes = sorted(df_desligados["Nome"].dropna().unique())
     nome_escolhido = st.selectbox("Selecione o investidor", nomes, key="nome_exclusao")
+    dados = selecionar_registro(df_desligados, nome_escolhido, key="exclusao")
     data_exclusao = st.date_input("Data de exclusão", format="DD/MM/YYYY")
+    selecao = (nome_escolhido, str(dados.get("CPF", "")), data_exclusao)
 
     st.markdown("<br>", unsafe_allow_html=True)
     col1, col2, col3 = st.columns([1, 2, 1])
     
     if col2.button("✅ Gerar", use_container_width=True, key="btn_exclusao"):
-        dados = df_desligados[df_desligados["Nome"] == nome_escolhido].iloc[0]
-        
         # 1. Preparação dos dados
         razao_social = str(dados.get("Razão social", "")).upper()
         cnpj = formatar_cnpj(dados.get("CNPJ", ""))
@@ -260,37 +211,23 @@ def modal_exclusao_subfatura():
         }
 
         try:
-            # Carrega o modelo
-            doc = Document("Exclusão Subfatura.docx")
-
-            # 3. Executa a substituição em parágrafos, tabelas e cabeçalhos
-            for p in doc.paragraphs:
-                for chave, valor in mapa.items():
-                    if chave in p.text:
-                        # Substitui no parágrafo inteiro para evitar quebras do Word
-                        p.text = p.text.replace(chave, valor)
-
-            for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        for p in cell.paragraphs:
-                            for chave, valor in mapa.items():
-                                if chave in p.text:
-                                    p.text = p.text.replace(chave, valor)
+            # 3. Substituição em parágrafos, tabelas, cabeçalhos e rodapés (mantém a formatação dos runs)
+            dados_doc = gerar_docx_com_substituicoes("Exclusão Subfatura.docx", mapa)
 
             # 4. Salva e disponibiliza para download
             cpf_limpo = re.sub(r"\D", "", cpf)
             nome_arquivo = f"{nome_escolhido} __ {cpf_limpo} __ {email_arquivo} __ Exclusão Subfatura.docx"
-            doc.save(nome_arquivo)
 
-            with open(nome_arquivo, "rb") as f:
-                st.download_button("⬇️ Download Documento", f, file_name=nome_arquivo, use_container_width=True, type="primary")
-            
+            guardar_documento("exclusao", selecao, nome_arquivo, dados_doc)
             st.success("Documento gerado com sucesso! ✅")
             
         except Exception as e:
             st.error(f"Erro ao processar o Word: {e}")
 
+    guardado = documento_guardado("exclusao", selecao)
+    if guardado:
+        botoes_documento(st, guardado[1], guardado[0], "exclusao", rotulo="⬇️ Download Documento", tipo="primary")
+
 # ==========================================
 # FUNÇÃO PRINCIPAL (RENDER)
 # ==========================================
@@ -428,7 +365,7 @@ def render(df):
         nome_ben = st.selectbox("Buscar investidor", [""] + sorted(df["Nome"].dropna().unique()), key="sel_ben_cart_v4")
         
         if nome_ben:
-            dados = df[df["Nome"] == nome_ben].iloc[0]
+            dados = selecionar_registro(df, nome_ben, key="carteirinha")
             with st.container(border=True):
                 c1, c2 = st.columns(2)
                 c1.markdown(f"**🏥 Saúde ({dados.get('Operadora Médico', 'N/A')})**")
@@ -522,6 +459,11 @@ def render(df):
                 if st.button("📄 Exclusão Subfatura", use_container_width=True):
                     modal_exclusao_subfatura()
 
+            # Expander 3: Vários investidores de uma vez
+            with st.expander("🗂️ Em lote", expanded=False):
+                if st.button("🗂️ Documentos em Lote", use_container_width=True):
+                    modal_documentos_em_lote({"Ativos": df, "Desligados": carregar_desligados_google_sheets()})
+
         with c_mail:
             st.markdown("##### ✉️ E-mails / Mensagens")
             with st.expander("📩 Comunicados", expanded=False):
@@ -0,0 +1,100 @@
+import bisect
+import re
+import unicodedata
+
+import pandas as pd
+
+# ==========================================
+# CATÁLOGO CBO (CÓDIGO -> DESCRIÇÃO, BUSCA)
+# ==========================================
+# Linhas da planilha no formato "2521-05 - Administrador" (separadores variam).
+_PADRAO_LINHA = re.compile(r"^\s*(?P<codigo>\d[\d.\-/ ]*\d)\s*[-–:|]?\s*(?P<descricao>.*?)\s*$")
+LIMITE_RESULTADOS = 50
+
+def _normalizar(texto):
+    sem_acento = unicodedata.normalize("NFKD", str(texto)).encode("ascii", "ignore").decode("ascii")
+    return sem_acento.casefold()
+
+def _tokens(texto):
+    return re.findall(r"\w+", _normalizar(texto))
+
+def codigo_cbo(valor):
+    """Só os dígitos do código ('2521-05' -> '252105'; 252105.0 -> '252105')."""
+    texto = "" if valor is None or (isinstance(valor, float) and pd.isna(valor)) else str(valor).strip()
+    if texto.endswith(".0"):
+        texto = texto[:-2]
+    return re.sub(r"\D", "", texto)
+
+def formatar_codigo_cbo(codigo):
+    return f"{codigo[:4]}-{codigo[4:]}" if len(codigo) == 6 else codigo
+
+class CatalogoCBO:
+    """Índice dos CBOs: código -> descrição, busca por prefixo do código ou das palavras.
+
+    Os códigos e as palavras ficam em listas ordenadas, então um prefixo vira
+    uma faixa encontrada por bisect; cada palavra aponta para os códigos em
+    que aparece.
+    """
+
+    def __init__(self, linhas):
+        self.descricoes = {}
+        for linha in linhas:
+            m = _PADRAO_LINHA.match(str(linha))
+            if not m:
+                continue
+            codigo = codigo_cbo(m["codigo"])
+            if codigo and codigo not in self.descricoes:
+                self.descricoes[codigo] = m["descricao"]
+
+        self._codigos = sorted(self.descricoes)
+        indice = {}
+        for codigo, descricao in self.descricoes.items():
+            for token in set(_tokens(descricao)):
+                indice.setdefault(token, set()).add(codigo)
+        self._palavras = sorted(indice)
+        self._codigos_por_palavra = indice
+
+    def __len__(self):
+        return len(self.descricoes)
+
+    def descricao(self, codigo):
+        return self.descricoes.get(codigo_cbo(codigo), "")
+
+    def rotulo(self, codigo):
+        codigo = codigo_cbo(codigo)
+        return f"{formatar_codigo_cbo(codigo)} - {self.descricoes.get(codigo, '')}" if codigo else ""
+
+    @staticmethod
+    def _faixa(ordenados, prefixo):
+        inicio = bisect.bisect_left(ordenados, prefixo)
+        fim = bisect.bisect_left(ordenados, prefixo + "\uffff")
+        return ordenados[inicio:fim]
+
+    def buscar(self, termo, limite=LIMITE_RESULTADOS):
+        """Códigos que casam com todas as palavras do termo (ou com o prefixo numérico)."""
+        termo = str(termo).strip()
+        if termo and re.fullmatch(r"[\d.\-/ ]+", termo):
+            return self._faixa(self._codigos, codigo_cbo(termo))[:limite]
+
+        candidatos = None
+        for token in _tokens(termo):
+            casados = set()
+            for palavra in self._faixa(self._palavras, token):
+                casados |= self._codigos_por_palavra[palavra]
+            candidatos = casados if candidatos is None else candidatos & casados
+            if not candidatos:
+                return []
+        if candidatos is None:
+            return self._codigos[:limite]
+
+        # Descrições que começam pelo termo aparecem primeiro
+        termo_norm = _normalizar(termo).strip()
+        return sorted(candidatos, key=lambda c: (not _normalizar(self.descricoes[c]).startswith(termo_norm), self.descricoes[c]))[:limite]
+
+    def preencher_descricoes(self, codigos, descricoes=None):
+        """Descrições para uma coluna de códigos, mantendo as que já vieram preenchidas."""
+        do_catalogo = codigos.map(codigo_cbo).map(self.descricoes).fillna("")
+        if descricoes is None:
+            return do_catalogo
+        atuais = descricoes.fillna("").astype(str).str.strip()
+        return atuais.where(atuais != "", do_catalogo)
@@ -0,0 +1,198 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import requests
+import streamlit as st
+
+# ==========================================
+# CONFIGURAÇÃO
+# ==========================================
+# Cache em SQLite (sobrevive a reinícios do app), com validade e limite de linhas.
+# Uma base offline de CEPs (CSV) é consultada antes da rede e pode substituí-la.
+CEP_CACHE = os.environ.get("V4_CEP_CACHE", ".cep_cache.sqlite3")
+CEP_DATASET = os.environ.get("V4_CEP_DATASET", "ceps.csv")
+CEP_OFFLINE = os.environ.get("V4_CEP_OFFLINE", "") == "1"
+
+URL_VIACEP = "https://viacep.com.br/ws/{}/json/"
+TIMEOUT_VIACEP = (2, 3)  # segundos: conexão, leitura
+VALIDADE_ENCONTRADO = 30 * 86400
+VALIDADE_INEXISTENTE = 86400
+LIMITE_CACHE_CEP = 50_000  # linhas
+PAUSA_APOS_FALHAS = 60  # segundos sem chamar a rede depois de falhas seguidas
+FALHAS_PARA_PAUSA = 3
+WORKERS_CEP = 8
+
+CAMPOS_ENDERECO = ["logradouro", "bairro", "localidade", "uf"]
+OK, INVALIDO, INEXISTENTE, INDISPONIVEL = "OK", "Formato inválido", "CEP não encontrado", "Consulta indisponível"
+
+def normalizar_cep(valor, digitado=False):
+    """'01310-100', '1310100' ou 1310100.0 viram '01310100'; o resto vira ''.
+
+    Com `digitado=True` (campo de texto, que não perde zeros) exige os 8 dígitos.
+    """
+    texto = "" if valor is None or (isinstance(valor, float) and pd.isna(valor)) else str(valor).strip()
+    if texto.endswith(".0"):
+        texto = texto[:-2]
+    limpo = texto.replace("-", "").replace(".", "").replace(" ", "")
+    # Planilhas guardam CEP como número e perdem o zero à esquerda (só um: nenhum CEP começa com 00)
+    if not limpo.isdigit() or not (8 if digitado else 7) <= len(limpo) <= 8:
+        return ""
+    cep = limpo.zfill(8)
+    return "" if cep == "00000000" else cep
+
+def formatar_cep(cep):
+    return f"{cep[:5]}-{cep[5:]}" if len(cep) == 8 else cep
+
+def texto_endereco(dados):
+    return f"{dados['logradouro']}, {dados['bairro']}, {dados['localidade']}-{dados['uf']}"
+
+# ==========================================
+# BASE OFFLINE
+# ==========================================
+@st.cache_resource(show_spinner=False)
+def _base_offline_em_cache(caminho, mtime):
+    df = pd.read_csv(caminho, sep=None, engine="python", dtype=str, encoding="utf-8-sig").fillna("")
+    df.columns = [str(c).strip().lower() for c in df.columns]
+    df = df.rename(columns={"cidade": "localidade", "endereco": "logradouro", "endereço": "logradouro", "estado": "uf"})
+    for campo in CAMPOS_ENDERECO:
+        if campo not in df.columns:
+            df[campo] = ""
+    ceps = df["cep"].map(normalizar_cep)
+    return {cep: dict(zip(CAMPOS_ENDERECO, valores)) for cep, *valores in zip(ceps, *(df[c] for c in CAMPOS_ENDERECO)) if cep}
+
+def base_offline():
+    """CEP -> endereço da base local, relida só quando o arquivo muda; {} se não houver arquivo."""
+    if not os.path.exists(CEP_DATASET):
+        return {}
+    return _base_offline_em_cache(CEP_DATASET, os.path.getmtime(CEP_DATASET))
+
+# ==========================================
+# SERVIÇO DE CEP
+# ==========================================
+class ServicoCEP:
+    """Resolve CEPs na ordem cache -> base offline -> ViaCEP.
+
+    O cache guarda também os CEPs inexistentes (por menos tempo), para não
+    repetir a consulta. Depois de algumas falhas seguidas da rede, o serviço
+    para de chamá-la por um tempo e responde "indisponível" na hora.
+    """
+
+    def __init__(self, caminho=CEP_CACHE, limite=LIMITE_CACHE_CEP):
+        self.limite = limite
+        self._lock = threading.Lock()
+        self._sessao = requests.Session()
+        self._falhas_seguidas = 0
+        self._pausado_ate = 0.0
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False)
+        with self._lock, self._conexao:
+            self._conexao.execute(
+                "CREATE TABLE IF NOT EXISTS cep (cep TEXT PRIMARY KEY, dados TEXT, consultado_em REAL, usado_em REAL)"
+            )
+            self._conexao.execute("CREATE INDEX IF NOT EXISTS cep_usado_em ON cep (usado_em)")
+
+    # --- cache ---
+    def _do_cache(self, cep):
+        """(dados, ainda válido); (None, False) se o CEP não está no cache."""
+        agora = time.time()
+        with self._lock:
+            linha = self._conexao.execute("SELECT dados, consultado_em FROM cep WHERE cep = ?", (cep,)).fetchone()
+            if linha is None:
+                return None, False
+            dados = json.loads(linha[0]) if linha[0] else {}
+            validade = VALIDADE_ENCONTRADO if dados else VALIDADE_INEXISTENTE
+            with self._conexao:
+                self._conexao.execute("UPDATE cep SET usado_em = ? WHERE cep = ?", (agora, cep))
+            return dados, agora - linha[1] <= validade
+
+    def _gravar(self, cep, dados):
+        agora = time.time()
+        with self._lock, self._conexao:
+            self._conexao.execute("INSERT OR REPLACE INTO cep VALUES (?, ?, ?, ?)", (cep, json.dumps(dados, ensure_ascii=False) if dados else "", agora, agora))
+            excesso = self._conexao.execute("SELECT COUNT(*) FROM cep").fetchone()[0] - self.limite
+            if excesso > 0:
+                # LRU: saem os menos usados recentemente
+                self._conexao.execute("DELETE FROM cep WHERE cep IN (SELECT cep FROM cep ORDER BY usado_em LIMIT ?)", (excesso,))
+
+    # --- rede ---
+    def _consultar_viacep(self, cep):
+        """Dados do endereço, {} se o CEP não existe, None se a consulta falhou."""
+        if CEP_OFFLINE:
+            # A base offline substitui a rede: o que não está nela não existe
+            return {} if base_offline() else None
+        if time.monotonic() < self._pausado_ate:
+            return None
+        try:
+            r = self._sessao.get(URL_VIACEP.format(cep), timeout=TIMEOUT_VIACEP)
+            r.raise_for_status()
+            corpo = r.json()
+        except (requests.RequestException, ValueError):
+            with self._lock:
+                self._falhas_seguidas += 1
+                if self._falhas_seguidas >= FALHAS_PARA_PAUSA:
+                    self._pausado_ate = time.monotonic() + PAUSA_APOS_FALHAS
+            return None
+        with self._lock:
+            self._falhas_seguidas = 0
+        if corpo.get("erro"):
+            return {}
+        return {campo: corpo.get(campo, "") for campo in CAMPOS_ENDERECO}
+
+    def resolver(self, valor, digitado=False):
+        """(status, cep normalizado, dados do endereço)."""
+        cep = normalizar_cep(valor, digitado)
+        if not cep:
+            return INVALIDO, "", {}
+        dados, valido = self._do_cache(cep)
+        if not valido:
+            do_cache = dados
+            dados = base_offline().get(cep)
+            if dados is None:
+                dados = self._consultar_viacep(cep)
+                if dados is None:
+                    # Rede fora: um endereço já conhecido, mesmo vencido, vale mais que "indisponível"
+                    if do_cache is None:
+                        return INDISPONIVEL, cep, {}
+                    dados = do_cache
+                elif not CEP_OFFLINE:
+                    self._gravar(cep, dados)
+        return (OK if dados else INEXISTENTE), cep, dados
+
+    def validar_em_lote(self, valores, workers=WORKERS_CEP):
+        """Resolve cada CEP distinto uma vez, com no máximo `workers` consultas simultâneas."""
+        ceps = [normalizar_cep(v) for v in valores]
+        distintos = list(dict.fromkeys(ceps))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            resultados = dict(zip(distintos, pool.map(self.resolver, distintos)))
+        return [resultados[c] for c in ceps]
+
+@st.cache_resource(show_spinner=False)
+def servico_cep():
+    return ServicoCEP()
+
+def buscar_cep(cep_digitado):
+    """Endereço em uma linha ('Rua, Bairro, Cidade-UF') ou None."""
+    status, _, dados = servico_cep().resolver(cep_digitado)
+    return texto_endereco(dados) if status == OK else None
+
+# ==========================================
+# VALIDAÇÃO DA BASE
+# ==========================================
+def validar_ceps_base(df):
+    """Status e CEP normalizado de cada linha com CEP preenchido (vazios ficam de fora)."""
+    if "CEP" not in df.columns:
+        return pd.DataFrame(columns=["Nome", "CEP", "CEP normalizado", "Status", "Endereço"])
+    preenchidos = df[df["CEP"].fillna("").astype(str).str.strip().replace({"nan": "", "None": ""}) != ""]
+    valores = preenchidos["CEP"].tolist()
+    resultados = servico_cep().validar_em_lote(valores)
+    return pd.DataFrame({
+        "Nome": preenchidos["Nome"].to_numpy() if "Nome" in preenchidos.columns else "",
+        "CEP": valores,
+        "CEP normalizado": [formatar_cep(cep) for _, cep, _ in resultados],
+        "Status": [status for status, _, _ in resultados],
+        "Endereço": [texto_endereco(dados) if status == OK else "" for status, _, dados in resultados],
+    })
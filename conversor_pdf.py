@@ -0,0 +1,177 @@
+from io import BytesIO
+from xml.sax.saxutils import escape
+
+from docx import Document
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.table import Table as TabelaDocx
+from docx.text.paragraph import Paragraph as ParagrafoDocx
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY, TA_LEFT, TA_RIGHT
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.utils import ImageReader
+from reportlab.platypus import BaseDocTemplate, Frame, Image, PageBreak, PageTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.platypus.flowables import Flowable
+
+# ==========================================
+# CONVERSÃO LOCAL DOCX -> PDF (REPORTLAB)
+# ==========================================
+# Cobre o que os modelos do DP/Benefícios usam: parágrafos com negrito/itálico/
+# sublinhado, alinhamento, tamanhos de fonte, tabelas, imagens e o logo do cabeçalho.
+EMU_POR_PONTO = 12700
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+R_EMBED = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}embed"
+ALINHAMENTOS = {
+    WD_ALIGN_PARAGRAPH.CENTER: TA_CENTER,
+    WD_ALIGN_PARAGRAPH.RIGHT: TA_RIGHT,
+    WD_ALIGN_PARAGRAPH.JUSTIFY: TA_JUSTIFY,
+}
+
+def _pt(valor, padrao):
+    return valor / EMU_POR_PONTO if valor is not None else padrao
+
+def _tamanho_fonte(paragrafo):
+    for run in paragrafo.runs:
+        if run.font.size:
+            return run.font.size.pt
+    estilo = paragrafo.style
+    while estilo is not None:
+        if estilo.font.size:
+            return estilo.font.size.pt
+        estilo = estilo.base_style
+    return 11.0
+
+def _imagens(elemento, parte):
+    """Imagens (bytes, largura, altura em pontos) referenciadas dentro do elemento."""
+    imagens = []
+    for blip in elemento.iter("{http://schemas.openxmlformats.org/drawingml/2006/main}blip"):
+        rid = blip.get(R_EMBED)
+        if not rid or rid not in parte.related_parts:
+            continue
+        extent = next(blip.iterancestors("{http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing}inline",
+                                         "{http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing}anchor"), None)
+        ext = extent.find("{http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing}extent") if extent is not None else None
+        largura = int(ext.get("cx")) / EMU_POR_PONTO if ext is not None else 100
+        altura = int(ext.get("cy")) / EMU_POR_PONTO if ext is not None else 40
+        imagens.append((parte.related_parts[rid].blob, largura, altura))
+    return imagens
+
+def _marcacao(paragrafo):
+    trechos = []
+    for run in paragrafo.runs:
+        texto = escape(run.text).replace("\t", "&nbsp;" * 4).replace("\n", "<br/>")
+        if not texto:
+            continue
+        if run.bold:
+            texto = f"<b>{texto}</b>"
+        if run.italic:
+            texto = f"<i>{texto}</i>"
+        if run.underline:
+            texto = f"<u>{texto}</u>"
+        trechos.append(texto)
+    return "".join(trechos)
+
+def _paragrafo(paragrafo, parte, largura_util):
+    tamanho = _tamanho_fonte(paragrafo)
+    estilo = ParagraphStyle(
+        "docx", fontName="Helvetica", fontSize=tamanho, leading=tamanho * 1.25,
+        alignment=ALINHAMENTOS.get(paragrafo.alignment, TA_LEFT), spaceAfter=tamanho * 0.3,
+    )
+    flowables = [Image(BytesIO(blob), width=min(l, largura_util), height=a * min(1, largura_util / l)) for blob, l, a in _imagens(paragrafo._p, parte)]
+    marcacao = _marcacao(paragrafo)
+    if marcacao.strip():
+        flowables.append(Paragraph(marcacao, estilo))
+    elif not flowables:
+        flowables.append(Spacer(1, tamanho * 1.1))
+    return flowables
+
+def _tabela(tabela, parte, largura_util):
+    linhas, spans = [], []
+    for i, row in enumerate(tabela.rows):
+        celulas, anterior, inicio = [], None, 0
+        for j, cell in enumerate(row.cells):
+            # Células mescladas aparecem repetidas: vira SPAN
+            if anterior is not None and cell._tc is anterior:
+                celulas.append("")
+                spans.append(("SPAN", (inicio, i), (j, i)))
+                continue
+            anterior, inicio = cell._tc, j
+            conteudo = [f for p in cell.paragraphs for f in _paragrafo(p, parte, largura_util)]
+            celulas.append(conteudo)
+        linhas.append(celulas)
+    if not linhas:
+        return []
+
+    n_colunas = max(len(l) for l in linhas)
+    linhas = [l + [""] * (n_colunas - len(l)) for l in linhas]
+    larguras = [c.width for c in tabela.columns] if len(tabela.columns) == n_colunas else []
+    if larguras and all(larguras):
+        total = sum(larguras)
+        larguras = [largura_util * l / total for l in larguras]
+    else:
+        larguras = [largura_util / n_colunas] * n_colunas
+
+    t = Table(linhas, colWidths=larguras)
+    t.setStyle(TableStyle([
+        ("GRID", (0, 0), (-1, -1), 0.5, colors.black),
+        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+        *spans,
+    ]))
+    return [t, Spacer(1, 6)]
+
+class _Cabecalho(Flowable):
+    """Marca qual cabeçalho vale para as páginas seguintes (útil no PDF combinado)."""
+
+    def __init__(self, imagens):
+        super().__init__()
+        self.imagens = imagens
+
+    def wrap(self, *args):
+        return 0, 0
+
+    def draw(self):
+        self.canv._cabecalho_docx = self.imagens
+
+def _conteudo(docx_bytes):
+    doc = Document(BytesIO(docx_bytes))
+    secao = doc.sections[0]
+    pagina = (_pt(secao.page_width, 595), _pt(secao.page_height, 842))
+    margens = tuple(_pt(m, 72) for m in (secao.left_margin, secao.right_margin, secao.top_margin, secao.bottom_margin))
+    largura_util = pagina[0] - margens[0] - margens[1]
+
+    cabecalho = [] if secao.header.is_linked_to_previous else _imagens(secao.header._element, secao.header.part)
+    historia = [_Cabecalho(cabecalho)]
+    for elemento in doc.element.body.iterchildren():
+        if elemento.tag == f"{W}p":
+            historia.extend(_paragrafo(ParagrafoDocx(elemento, doc._body), doc.part, largura_util))
+        elif elemento.tag == f"{W}tbl":
+            historia.extend(_tabela(TabelaDocx(elemento, doc._body), doc.part, largura_util))
+    return pagina, margens, historia
+
+def _desenhar_cabecalho(canvas, doc):
+    imagens = getattr(canvas, "_cabecalho_docx", [])
+    y_topo = doc.pagesize[1] - doc.topMargin / 4
+    for blob, largura, altura in imagens:
+        escala = min(1, (doc.topMargin * 0.7) / altura) if altura else 1
+        canvas.drawImage(ImageReader(BytesIO(blob)), doc.leftMargin, y_topo - altura * escala, width=largura * escala, height=altura * escala, mask="auto")
+
+def documentos_para_pdf(lista_docx):
+    """Um único PDF com todos os documentos, cada um começando em página nova."""
+    historia, pagina, margens = [], None, None
+    for n, docx_bytes in enumerate(lista_docx):
+        pag, marg, conteudo = _conteudo(docx_bytes)
+        pagina, margens = pagina or pag, margens or marg
+        if n:
+            historia.append(PageBreak())
+        historia.extend(conteudo)
+
+    saida = BytesIO()
+    esquerda, direita, topo, base = margens or (72, 72, 72, 72)
+    doc = BaseDocTemplate(saida, pagesize=pagina or (595, 842), leftMargin=esquerda, rightMargin=direita, topMargin=topo, bottomMargin=base)
+    quadro = Frame(esquerda, base, doc.width, doc.height, id="corpo", leftPadding=0, rightPadding=0, topPadding=0, bottomPadding=0)
+    # O cabeçalho é desenhado no fim da página, quando a marca do documento da página já foi lida
+    doc.addPageTemplates([PageTemplate(id="docx", frames=[quadro], onPageEnd=_desenhar_cabecalho)])
+    doc.build(historia)
+    return saida.getvalue()
+
+def docx_para_pdf(docx_bytes):
+    return documentos_para_pdf([docx_bytes])
@@ -3,13 +3,27 @@ import pandas as pd
 import altair as alt
 from datetime import datetime, timedelta, date
 from dateutil.relativedelta import relativedelta
-from docx import Document
-from io import BytesIO
 import re
+import hashlib
+import html
 import unicodedata
-import requests
+import graphviz
+import numpy as np
 import gspread
 from google.oauth2.service_account import Credentials
+from documentos import botoes_documento, gerar_docx_com_substituicoes, modal_documentos_em_lote
+from historico import COLUNA_REMOVIDO, carregar_historico, chave_registro
+from indicadores import DIMENSOES, ENCARGOS_CLT, MARCOS_RETENCAO, obter_motor_headcount, obter_pipeline_vagas, obter_projecao_folha
+from relatorios import colunas_exportaveis, exportar_excel, iniciar_pacote, obter_pacote
+from cbo import CatalogoCBO
+from instrumentacao import iniciar_medicao, medir, painel_medicoes
+from cep import INDISPONIVEL, INEXISTENTE, INVALIDO, OK as CEP_OK, formatar_cep, servico_cep, validar_ceps_base
+from rascunhos import ANEXO_PONTO, anexo_ponto, corpo_email_ponto, filtrar_clt, matricula_ahgora, rascunhos_ponto_do_csv
+from moeda import falhas_remuneracao, formatar_brl, remuneracao_em_centavos, remuneracao_em_reais
+from indices import (
+    EVENTO_ANIVERSARIO, diferenca_calendario, obter_indice_eventos, obter_indice_hierarquia,
+    obter_indice_registros, selecionar_registro, versao_dados,
+)
 
 # ==========================================
 # PALETA DE CORES E ESTADO
@@ -34,56 +48,34 @@ def formatar_cnpj(valor):
     v = limpar_numero(valor).zfill(14)
     return f"{v[:2]}.{v[2:5]}.{v[5:8]}/{v[8:12]}-{v[12:]}" if len(v) == 14 else v
 
-def converter_remuneracao_para_float(coluna):
-    # Transforma em string, remove R$, pontos e troca vírgula por ponto
-    col_limpa = coluna.astype(str).str.replace('R$', '', regex=False)\
-                                  .str.replace('.', '', regex=False)\
-                                  .str.replace(',', '.', regex=False)\
-                                  .str.strip()
-    # Converte para número, o que não for número vira NaN (vazio)
-    return pd.to_numeric(col_limpa, errors='coerce')
+def parse_data_br(coluna):
+    return pd.to_datetime(coluna, dayfirst=True, errors="coerce")
+
+def anos_decimais(inicio, fim=None):
+    dif = diferenca_calendario(inicio, fim)
+    return (dif["anos"] + dif["meses"] / 12 + dif["dias"] / 365.25).astype("Float64")
+
+def texto_tempo_casa(inicio, fim=None, vazio=""):
+    dif = diferenca_calendario(inicio, fim)
+    validos = dif["anos"].notna()
+    dif = dif.fillna(0).astype(str)
+    texto = dif["anos"] + " anos, " + dif["meses"] + " meses e " + dif["dias"] + " dias"
+    return texto.where(validos, vazio)
 
 def calcular_idade(dt_nasc):
-    if pd.isna(dt_nasc) or dt_nasc == "": 
+    if pd.isna(dt_nasc) or dt_nasc == "":
         return ""
-    try:
-        # Se for string, tenta converter. Se já for data (Timestamp), usa direto.
-        if not isinstance(dt_nasc, pd.Timestamp):
-            dt_nasc = pd.to_datetime(dt_nasc, dayfirst=True, errors='coerce')
-        
-        if pd.isna(dt_nasc): 
-            return ""
-        
-        hoje = pd.Timestamp.today()
-        idade = hoje.year - dt_nasc.year - ((hoje.month, hoje.day) < (dt_nasc.month, dt_nasc.day))
-        return f"{idade} anos"
-    except:
-        return ""
-        
-def parse_data_br(coluna):
-    return pd.to_datetime(coluna, dayfirst=True, errors="coerce")
+    if not isinstance(dt_nasc, pd.Timestamp):
+        dt_nasc = pd.to_datetime(dt_nasc, dayfirst=True, errors='coerce')
+    anos = diferenca_calendario(pd.Series([dt_nasc]))["anos"].iloc[0]
+    return "" if pd.isna(anos) else f"{anos} anos"
 
 def calcular_tempo_casa(data_inicio):
     if pd.isna(data_inicio) or data_inicio == "": return ""
     if not isinstance(data_inicio, pd.Timestamp):
-        data_inicio = pd.to_datetime(data_inicio, errors='coerce')
-    if pd.isna(data_inicio): return ""
-    hoje = pd.Timestamp.today().normalize()
-    diff = relativedelta(hoje, data_inicio)
-    return f"{diff.years} anos, {diff.months} meses e {diff.days} dias"
-
-def buscar_cep(cep_digitado):
-    cep_limpo = str(cep_digitado).replace("-", "").replace(".", "").strip()
-    if len(cep_limpo) == 8:
-        try:
-            r = requests.get(f"https://viacep.com.br/ws/{cep_limpo}/json/")
-            if r.status_code == 200 and "erro" not in r.json():
-                dados = r.json()
-                return f"{dados['logradouro']}, {dados['bairro']}, {dados['localidade']}-{dados['uf']}"
-        except: return None
-    return None
-
-@st.cache_data(ttl=600)
+        data_inicio = pd.to_datetime(data_inicio, dayfirst=True, errors='coerce')
+    return texto_tempo_casa(pd.Series([data_inicio])).iloc[0]
+
 def buscar_lista_cbo():
     try:
         scope = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
@@ -101,6 +93,11 @@ def buscar_lista_cbo():
         return []
     except: return []
 
+@st.cache_resource(ttl=600, show_spinner=False)
+def catalogo_cbo():
+    # Um índice só para todas as sessões; a planilha é relida a cada 10 min
+    return CatalogoCBO(buscar_lista_cbo())
+
 @st.cache_data(ttl=300)
 def buscar_base_vagas():
     try:
@@ -187,7 +184,10 @@ def modal_cadastro_investidor(lista_nomes_ativos):
         raz_soc = c13.text_input("Razão Social", key=f"raz_soc_{s}")
         cargo = c14.text_input("Cargo", key=f"cargo_{s}")
         remun = c15.text_input("Remuneração", key=f"remun_{s}")
-        cbo_sel = c15b.selectbox("CBO", options=[""] + buscar_lista_cbo(), key=f"cbo_list_{s}")
+        # A busca roda no servidor: só os resultados do termo vão para o navegador
+        catalogo = catalogo_cbo()
+        termo_cbo = c15b.text_input("Buscar CBO", placeholder="Código ou cargo", key=f"cbo_busca_{s}")
+        cbo_sel = c15b.selectbox("CBO", options=[""] + catalogo.buscar(termo_cbo) if termo_cbo else [""], format_func=catalogo.rotulo, key=f"cbo_list_{s}")
 
         st.markdown("#### 🏢 Centro de Custo & Liderança")
         cv1, cv3, cv4 = st.columns([1, 1, 1])
@@ -211,112 +211,148 @@ def modal_cadastro_investidor(lista_nomes_ativos):
         
         # BOTÃO DE GRAVAR
         if st.button("🚀 Gravar na Planilha", use_container_width=True, type="primary"):
-        # Função para verificar acentos
-        def tem_acento(texto):
-            if not texto: return False
-            return texto != ''.join(c for c in unicodedata.normalize('NFD', str(texto)) if unicodedata.category(c) != 'Mn')
-
-        tel_numeros = re.sub(r'\D', '', str(tel)) if tel else ""
-
-        # --- VALIDAÇÕES ---
-        if not n_curto or not cpf:
-            st.warning("⚠️ Nome e CPF são obrigatórios!")
-        elif tem_acento(n_curto):
-            st.error("🚨 O campo 'Nome' não pode conter acentos ou cedilha (Ex: Use 'Joao' em vez de 'João').")
-        elif tel and len(tel_numeros) not in [10, 11]:
-            st.error("🚨 O 'Telefone' deve conter exatamente 10 ou 11 dígitos.")
-        else:
-            # --- FORMATAÇÕES AUTOMÁTICAS ---
-            n_curto_fmt = n_curto.title()
-            n_completo_fmt = n_completo.title()
-            e_corp_fmt = e_corp.lower()
-            e_pess_fmt = e_pess.lower()
-            raz_soc_fmt = raz_soc.title()
-            cbo_fmt = re.sub(r'\D', '', str(cbo_selecionado)) if cbo_selecionado else ""
+            # Função para verificar acentos
+            def tem_acento(texto):
+                if not texto: return False
+                return texto != ''.join(c for c in unicodedata.normalize('NFD', str(texto)) if unicodedata.category(c) != 'Mn')
+
+            tel_numeros = re.sub(r'\D', '', str(tel)) if tel else ""
+
+            # --- VALIDAÇÕES ---
+            if not n_curto or not cpf:
+                st.warning("⚠️ Nome e CPF são obrigatórios!")
+            elif tem_acento(n_curto):
+                st.error("🚨 O campo 'Nome' não pode conter acentos ou cedilha (Ex: Use 'Joao' em vez de 'João').")
+            elif tel and len(tel_numeros) not in [10, 11]:
+                st.error("🚨 O 'Telefone' deve conter exatamente 10 ou 11 dígitos.")
+            else:
+                # --- FORMATAÇÕES AUTOMÁTICAS ---
+                n_curto_fmt = n_curto.title()
+                n_completo_fmt = n_completo.title()
+                e_corp_fmt = e_corp.lower()
+                e_pess_fmt = e_pess.lower()
+                raz_soc_fmt = raz_soc.title()
+                cbo_fmt = cbo_sel or ""
+                cbo_desc = catalogo.descricao(cbo_fmt)
             
-            val_term = "Indeterminado" if indet else dt_term.strftime("%d/%m/%Y")
-            matri_final = matri if matri else ""
+                val_term = "Indeterminado" if indet else dt_term.strftime("%d/%m/%Y")
+                matri_final = matri if matri else ""
             
-            linha = [
-                n_curto_fmt, n_completo_fmt, foto, bp, matri_final, 
-                dt_cont.strftime("%d/%m/%Y"), val_term, "Ativo", unid, mod_cont, 
-                e_corp_fmt, mod_pj, ini_v4.strftime("%d/%m/%Y"), cnpj, raz_soc_fmt, 
-                cargo, remun, cbo_fmt, "", id_vaga, "", "", 
-                senior, lider, "", "", cpf, nasc.strftime("%d/%m/%Y") if nasc else "", 
-                cep, escolar, e_pess_fmt, tel, "", "", "Pendente", "", "", "", "", drive, ""
-            ]
+                linha = [
+                    n_curto_fmt, n_completo_fmt, foto, bp, matri_final, 
+                    dt_cont.strftime("%d/%m/%Y"), val_term, "Ativo", unid, mod_cont, 
+                    e_corp_fmt, mod_pj, ini_v4.strftime("%d/%m/%Y"), cnpj, raz_soc_fmt, 
+                    cargo, remun, cbo_fmt, cbo_desc, id_vaga, "", "", 
+                    senior, lider, "", "", cpf, nasc.strftime("%d/%m/%Y") if nasc else "", 
+                    cep, escolar, e_pess_fmt, tel, "", "", "Pendente", "", "", "", "", drive, ""
+                ]
             
-            try:
-                # 1. Grava no Google Sheets
-                gravar_no_google_sheets(linha)
+                try:
+                    # 1. Grava no Google Sheets
+                    gravar_no_google_sheets(linha)
                 
-                # 2. Exibe o aviso no canto da tela (Toast)
-                st.toast(f"✅ Investidor {n_curto_fmt} cadastrado com sucesso!", icon="🚀")
+                    # 2. Exibe o aviso no canto da tela (Toast)
+                    st.toast(f"✅ Investidor {n_curto_fmt} cadastrado com sucesso!", icon="🚀")
                 
-                # 3. Reinicia para atualizar a base e fechar o modal
-                st.rerun()
+                    # 3. Reinicia para atualizar a base e fechar o modal
+                    st.rerun()
                 
-            except Exception as e:
-                st.error(f"Erro ao gravar: {e}")
+                except Exception as e:
+                    st.error(f"Erro ao gravar: {e}")
                     
 # ==========================================
 # LÓGICA DE ALERTAS (ATIVOS)
 # ==========================================
-def gerar_alertas_investidor(linha):
-    alertas = []
-    hoje = pd.Timestamp.today().normalize()
-    status = str(linha.get("Situação no plano", "")).strip()
-
-    # --- AJUSTE AQUI OS DIAS DE AVISO ---
-    DIAS_AVISO_PREVIO = 15  # Voltei para 15 dias conforme seu fluxo original
-    
-    # 1. Docs Plano (CORREÇÃO: dayfirst=True)
-    data_solicitar = pd.to_datetime(linha.get("Solicitar documentação"), dayfirst=True, errors="coerce")
-    if status == "Pendente" and pd.notna(data_solicitar):
-        data_solicitar = data_solicitar.normalize() # Remove horas para comparar apenas datas
-        dias = (data_solicitar - hoje).days
-        
-        if dias < 0: 
-            alertas.append(("error", "Docs Plano: Atrasado!"))
-        elif dias <= DIAS_AVISO_PREVIO: 
-            alertas.append(("info", f"Docs Plano: Faltam {dias} dias"))
-
-    # 2. Envio EB (CORREÇÃO: dayfirst=True)
-    data_enviar_eb = pd.to_datetime(linha.get("Enviar no EB"), dayfirst=True, errors="coerce")
-    if status == "Aguardando docs" and pd.notna(data_enviar_eb):
-        data_enviar_eb = data_enviar_eb.normalize()
-        dias = (data_enviar_eb - hoje).days
-        
-        if dias < 0: 
-            alertas.append(("error", "Envio EB: Atrasado!"))
-        elif dias <= DIAS_AVISO_PREVIO: 
-            alertas.append(("info", f"Envio EB: Faltam {dias} dias"))
-
-    # 3. Aniversário (CORREÇÃO: dayfirst=True)
-    nascimento = pd.to_datetime(linha.get("Data de nascimento"), dayfirst=True, errors="coerce")
-    if pd.notna(nascimento):
-        nascimento = nascimento.normalize()
-        if nascimento.month == hoje.month:
-            if nascimento.day == hoje.day:
-                alertas.append(("success", "Feliz Aniversário! Hoje! 🎂"))
-            else:
-                alertas.append(("info", f"Aniversariante do mês (Dia {nascimento.day}) 🎉"))
-
-    # 4. Contrato (CORREÇÃO: dayfirst=True)
-    fim_contrato = pd.to_datetime(linha.get("Térm previsto"), dayfirst=True, errors="coerce")
-    if pd.notna(fim_contrato):
-        fim_contrato = fim_contrato.normalize()
-        dias = (fim_contrato - hoje).days
-        
-        if dias < 0: 
-            alertas.append(("error", "Contrato Vencido! 🚨"))
-        elif dias <= 30: 
-            alertas.append(("warning", f"Contrato vence em {dias} dias"))
+# --- AJUSTE AQUI OS DIAS DE AVISO ---
+DIAS_AVISO_PREVIO = 15  # Voltei para 15 dias conforme seu fluxo original
+DIAS_AVISO_CONTRATO = 30
+
+ICONES_ALERTA = {"error": "🚨", "warning": "⚠️", "success": "🎉", "info": "ℹ️"}
+
+def avaliar_alertas(df, hoje=None):
+    """Aplica todas as regras de alerta de uma vez sobre a base inteira.
+
+    Retorna uma linha por alerta, com `_pos` apontando para a linha de `df`.
+    """
+    hoje = pd.Timestamp.today().normalize() if hoje is None else pd.Timestamp(hoje).normalize()
+    colunas = ["_pos", "_ordem", "Tipo", "Categoria", "Alerta", "Data", "Dias"]
+
+    def coluna_data(nome):
+        if f"{nome}_dt" in df.columns:
+            return df[f"{nome}_dt"].dt.normalize()
+        if nome in df.columns:
+            return parse_data_br(df[nome]).dt.normalize()
+        return pd.Series(pd.NaT, index=df.index, dtype="datetime64[ns]")
+
+    def coluna_texto(nome):
+        return df[nome].astype(str).str.strip() if nome in df.columns else pd.Series("", index=df.index)
+
+    partes = []
+    def adicionar(mascara, ordem, tipo, categoria, mensagem, data, dias):
+        sel = mascara.fillna(False).to_numpy(dtype=bool)
+        if not sel.any():
+            return
+        partes.append(pd.DataFrame({
+            "_pos": np.flatnonzero(sel), "_ordem": ordem, "Tipo": tipo, "Categoria": categoria,
+            "Alerta": mensagem[sel].to_numpy() if isinstance(mensagem, pd.Series) else mensagem,
+            "Data": data[sel].to_numpy(), "Dias": dias[sel].to_numpy(),
+        }))
+
+    status = coluna_texto("Situação no plano")
+
+    # 1. Docs Plano e 2. Envio EB
+    for ordem, (col, situacao, rotulo) in enumerate([
+        ("Solicitar documentação", "Pendente", "Docs Plano"),
+        ("Enviar no EB", "Aguardando docs", "Envio EB"),
+    ], start=1):
+        data = coluna_data(col)
+        dias = (data - hoje).dt.days.astype("Int64")
+        alvo = (status == situacao) & data.notna()
+        adicionar(alvo & (dias < 0), ordem, "error", rotulo, f"{rotulo}: Atrasado!", data, dias)
+        adicionar(alvo & dias.between(0, DIAS_AVISO_PREVIO), ordem, "info", rotulo,
+                  f"{rotulo}: Faltam " + dias.astype(str) + " dias", data, dias)
+
+    # 3. Aniversário
+    nascimento = coluna_data("Data de nascimento")
+    no_mes = nascimento.dt.month == hoje.month
+    dia_nasc = nascimento.dt.day.astype("Int64")
+    dias_niver = (dia_nasc - hoje.day).astype("Int64")
+    adicionar(no_mes & (dia_nasc == hoje.day), 3, "success", "Aniversário", "Feliz Aniversário! Hoje! 🎂", nascimento, dias_niver)
+    adicionar(no_mes & (dia_nasc != hoje.day), 3, "info", "Aniversário",
+              "Aniversariante do mês (Dia " + dia_nasc.astype(str) + ") 🎉", nascimento, dias_niver)
+
+    # 4. Contrato
+    fim_contrato = coluna_data("Térm previsto")
+    dias_fim = (fim_contrato - hoje).dt.days.astype("Int64")
+    adicionar(dias_fim < 0, 4, "error", "Contrato", "Contrato Vencido! 🚨", fim_contrato, dias_fim)
+    adicionar(dias_fim.between(0, DIAS_AVISO_CONTRATO), 4, "warning", "Contrato",
+              "Contrato vence em " + dias_fim.astype(str) + " dias", fim_contrato, dias_fim)
+
+    # 5. MEI
+    mei = coluna_texto("Modalidade PJ").str.upper() == "MEI"
+    sem_data = pd.Series(pd.NaT, index=df.index, dtype="datetime64[ns]")
+    adicionar(mei, 5, "warning", "MEI", "Investidor MEI ⚠️", sem_data, pd.Series(pd.NA, index=df.index, dtype="Int64"))
+
+    if not partes:
+        return pd.DataFrame(columns=colunas)
+    alertas = pd.concat(partes, ignore_index=True).sort_values(["_pos", "_ordem"], kind="stable")
+    return alertas.reset_index(drop=True)[colunas].astype({"Dias": "Int64"})
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def _central_alertas(versao, dia, _df):
+    alertas = avaliar_alertas(_df, dia)
+    for col in ["Nome", "E-mail corporativo", "Situação no plano"]:
+        valores = _df[col].to_numpy() if col in _df.columns else np.full(len(_df), "")
+        alertas[col] = valores[alertas["_pos"].to_numpy(dtype=int)] if len(alertas) else []
+    return alertas
 
-    if str(linha.get("Modalidade PJ", "")).strip().upper() == "MEI":
-        alertas.append(("warning", "Investidor MEI ⚠️"))
+def central_alertas(df_ativos):
+    """Alertas de todos os ativos, recalculados uma vez por dia ou versão dos dados."""
+    return _central_alertas(versao_dados(df_ativos), pd.Timestamp.today().normalize(), df_ativos)
 
-    return alertas
+def gerar_alertas_investidor(linha):
+    alertas = avaliar_alertas(pd.DataFrame([linha]).reset_index(drop=True))
+    return list(zip(alertas["Tipo"], alertas["Alerta"]))
 
 # ==========================================
 # FUNÇÕES AUXILIARES DE AÇÃO
@@ -355,10 +391,11 @@ def modal_workflow_comissao(df_ativos, df_desligados):
 
     if nome_sel:
         # Busca a linha correta
-        res = df_total[df_total["Nome"] == nome_sel].iloc[0]
+        res = selecionar_registro(df_total, nome_sel, key="wf_com")
         
         # 1. Validação de Desligado
-        is_desligado = nome_sel in df_desligados["Nome"].values
+        indice_deslig = obter_indice_registros(df_desligados)
+        is_desligado = indice_deslig.contem("cpf", res.get("CPF", "")) or indice_deslig.contem("nome", nome_sel)
         if is_desligado:
             st.warning(f"⚠️ Esse investidor consta na base de DESLIGADOS.")
             if not st.checkbox("Desejo continuar o processo para este ex-investidor", key="wf_com_des"):
@@ -412,47 +449,89 @@ def modal_workflow_comissao(df_ativos, df_desligados):
 # MODAIS DE RELATÓRIO MASTER
 # ==========================================
 @st.dialog("📥 Exportar Relatório Master", width="large")
-def modal_exportar_excel(df_master):
+def modal_exportar_excel(bases, selecao_inicial="Ativos"):
     st.markdown("""
         <div style="padding: 10px; border-radius: 5px; border: 1px solid #dcdfe6; background-color: #f8f9fa; color: #606266; font-size: 14px; margin-bottom: 15px;">
-            Selecione abaixo as colunas que deseja incluir no seu arquivo Excel.
+            Selecione abaixo as abas e as colunas que deseja incluir no seu arquivo Excel.
         </div>
     """, unsafe_allow_html=True)
 
-    todas_colunas = sorted(df_master.columns.tolist())
+    abas_escolhidas = st.multiselect(
+        "Abas do arquivo:",
+        options=["Ativos", "Desligados", "Todos"],
+        default=[selecao_inicial]
+    )
+
+    todas_colunas = sorted(set().union(*[colunas_exportaveis(df) for df in bases.values()]))
     colunas_escolhidas = st.multiselect(
         "Colunas do relatório:",
         options=todas_colunas,
-        default=["Nome", "Cargo", "Área", "BP", "Remuneração"]
+        default=[c for c in ["Nome", "Cargo", "Área", "BP", "Remuneração"] if c in todas_colunas]
     )
 
-    if colunas_escolhidas:
-        output = BytesIO()
-        try:
-            # O engine 'xlsxwriter' precisa estar no requirements.txt
-            with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                df_master[colunas_escolhidas].to_excel(writer, index=False, sheet_name='Master')
-            
-            st.markdown("---")
-            c1, c2, c3 = st.columns([1, 2, 1])
-            with c2:
-                st.download_button(
-                    label="📗 Baixar Arquivo Excel",
-                    data=output.getvalue(),
-                    file_name=f"Relatorio_V4_{datetime.now().strftime('%d_%m_%Y')}.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                    type="primary",
-                    use_container_width=True
-                )
-        except Exception as e:
-            st.error(f"Erro técnico ao gerar arquivo: {e}")
-    else:
+    if not abas_escolhidas:
+        st.warning("Selecione ao menos uma aba.")
+    elif not colunas_escolhidas:
         st.warning("Selecione ao menos uma coluna.")
+    else:
+        # O arquivo só é montado quando pedido; trocar colunas não regera nada
+        chave = (tuple(abas_escolhidas), tuple(colunas_escolhidas))
+        st.markdown("---")
+        c1, c2, c3 = st.columns([1, 2, 1])
+        with c2:
+            if st.session_state.get("excel_master_chave") != chave:
+                if st.button("⚙️ Gerar Arquivo Excel", use_container_width=True):
+                    st.session_state["excel_master_chave"] = chave
+                    st.rerun(scope="fragment")
+            else:
+                try:
+                    abas = {nome: bases[nome] for nome in abas_escolhidas}
+                    with st.spinner("Gerando arquivo..."):
+                        dados = exportar_excel(abas, colunas_escolhidas)
+                    st.download_button(
+                        label="📗 Baixar Arquivo Excel",
+                        data=dados,
+                        file_name=f"Relatorio_V4_{datetime.now().strftime('%d_%m_%Y')}.xlsx",
+                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                        type="primary",
+                        use_container_width=True
+                    )
+                except Exception as e:
+                    st.error(f"Erro técnico ao gerar arquivo: {e}")
             
 # ==========================================
 # MODAIS DE AÇÃO (VERSÃO FINAL UNIFICADA)
 # ==========================================
 
+@st.dialog("📮 Validação de CEPs", width="large")
+def modal_validar_ceps(df_ativos):
+    st.markdown("""
+        <div style="background-color: #f9f9f9; padding: 12px; border-left: 5px solid #E30613; border-radius: 4px; margin-bottom: 20px;">
+            <span style="color: #404040; font-size: 14px;">Confere o CEP de todos os ativos e devolve o formato normalizado (00000-000) com o endereço encontrado.</span>
+        </div>
+    """, unsafe_allow_html=True)
+
+    if st.button("🔎 Validar agora", use_container_width=True, type="primary"):
+        with st.spinner("Consultando CEPs..."):
+            st.session_state["ceps_validados"] = validar_ceps_base(df_ativos)
+
+    resultado = st.session_state.get("ceps_validados")
+    if resultado is None:
+        return
+
+    contagem = resultado["Status"].value_counts()
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("✅ Válidos", int(contagem.get(CEP_OK, 0)))
+    c2.metric("❌ Formato inválido", int(contagem.get(INVALIDO, 0)))
+    c3.metric("❓ Não encontrados", int(contagem.get(INEXISTENTE, 0)))
+    c4.metric("⏳ Sem resposta", int(contagem.get(INDISPONIVEL, 0)))
+
+    so_problemas = st.toggle("Mostrar só os problemas", value=True)
+    exibir = resultado[resultado["Status"] != CEP_OK] if so_problemas else resultado
+    st.dataframe(exibir, use_container_width=True, hide_index=True)
+    st.download_button("⬇️ Baixar CSV", data=resultado.to_csv(index=False, sep=";").encode("utf-8-sig"),
+                       file_name="validacao_ceps.csv", mime="text/csv", use_container_width=True)
+
 @st.dialog("📝 Título Doc Automação")
 def modal_titulo_doc(df):
     st.markdown("""
@@ -473,12 +552,12 @@ def modal_titulo_doc(df):
         """, unsafe_allow_html=True)
         return
 
+    row = selecionar_registro(df, nome, key="titulo_doc")
     titulo = st.text_input("Nome do Documento (ex: Contrato PJ)")
     st.markdown("<br>", unsafe_allow_html=True)
     
     c1, c2, c3 = st.columns([1, 2, 1])
     if c2.button("Gerar Título", use_container_width=True, type="primary"):
-        row = df[df["Nome"]==nome].iloc[0]
         cpf = str(row.get("CPF","")).replace(".", "").replace("-", "").zfill(11)
         email = str(row.get("E-mail pessoal","")).lower()
         st.code(f"{nome} __ {cpf} __ {email} __ {titulo}")
@@ -503,7 +582,7 @@ def modal_comum(df):
         return
 
     data_desligamento = st.date_input("Data do desligamento", format="DD/MM/YYYY", key="dt_comum")
-    dados_pessoa = df[df["Nome"] == nome_selecionado].iloc[0]
+    dados_pessoa = selecionar_registro(df, nome_selecionado, key="comum")
     eh_clt, tipo_contrato = validar_clt(dados_pessoa)
     
     liberar = eh_clt
@@ -516,8 +595,7 @@ def modal_comum(df):
         try:
             arquivo_pronto = gerar_docx_com_substituicoes("Demissão por comum acordo.docx", mapa)
             c1, c2, c3 = st.columns([1, 2, 1])
-            c2.download_button("📄 Gerar e Baixar DOC", data=arquivo_pronto, file_name=f"Demissão - {nome_selecionado}.docx", mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document", use_container_width=True, type="primary")
-            c2.link_button("🔃 Converter Doc em PDF", "https://www.ilovepdf.com/pt/word_para_pdf", use_container_width=True)
+            botoes_documento(c2, arquivo_pronto, f"Demissão - {nome_selecionado}.docx", "comum", rotulo="📄 Gerar e Baixar DOC", tipo="primary")
         except: st.error("Modelo não encontrado.")
 
 @st.dialog("📄 Aviso Prévio Indenizado")
@@ -543,7 +621,7 @@ def modal_aviso_previo_indenizado(df):
     data_des = c_dat1.date_input("Data desligamento", format="DD/MM/YYYY", key="dt_des_aviso")
     data_hom = c_dat2.date_input("Data homologação", format="DD/MM/YYYY", key="dt_hom_aviso")
     
-    dados_pessoa = df[df["Nome"] == nome].iloc[0]
+    dados_pessoa = selecionar_registro(df, nome, key="aviso")
     eh_clt, tipo_contrato = validar_clt(dados_pessoa)
     
     liberar = eh_clt
@@ -556,8 +634,7 @@ def modal_aviso_previo_indenizado(df):
         try:
             arquivo_pronto = gerar_docx_com_substituicoes("Aviso prévio Indenizado.docx", mapa)
             c1, c2, c3 = st.columns([1, 2, 1])
-            c2.download_button("📄 Gerar e Baixar DOC", data=arquivo_pronto, file_name=f"Aviso - {nome}.docx", use_container_width=True, type="primary")
-            c2.link_button("🔃 Converter Doc em PDF", "https://www.ilovepdf.com/pt/word_para_pdf", use_container_width=True)
+            botoes_documento(c2, arquivo_pronto, f"Aviso - {nome}.docx", "aviso", rotulo="📄 Gerar e Baixar DOC", tipo="primary")
         except: st.error("Modelo não encontrado.")
 
 @st.dialog("🚌 Atualização do Vale Transporte")
@@ -579,23 +656,30 @@ def modal_vale_transporte(df_pessoas):
         """, unsafe_allow_html=True)
         return
 
-    res = df_pessoas[df_pessoas["Nome"] == nome_sel].iloc[0]
+    res = selecionar_registro(df_pessoas, nome_sel, key="vt")
     eh_clt, tipo_contrato = validar_clt(res)
 
     if not eh_clt:
         st.markdown(f"""<div style="padding: 10px; background-color: #fff3cd; color: #856404; border: 1px solid #ffeeba; border-radius: 4px; margin-bottom: 10px;">
-            ⚠️ <b>Atenção:</b> Investidor <b>{tipo_contrato}</b> não tem direito legal a VT.</div>""", unsafe_allow_html=True)
+            ⚠️ <b>Atenção:</b> Investidor <b>{html.escape(str(tipo_contrato))}</b> não tem direito legal a VT.</div>""", unsafe_allow_html=True)
         if not st.checkbox("Forçar geração mesmo assim", key="chk_vt"): return
 
     # --- CAMPOS DE ENDEREÇO (Com UF ao lado de Cidade) ---
     st.markdown("##### Endereço Residencial")
     c_end1, c_end2 = st.columns([1, 3])
-    cep = c_end1.text_input("CEP")
-    endereco = c_end2.text_input("Endereço (Rua/Av)")
+    cep = c_end1.text_input("CEP", key="cep_vt")
+    # CEP novo preenche o endereço (o usuário ainda pode editar os campos); incompleto não consulta
+    status_cep, cep_norm, dados_cep = servico_cep().resolver(cep, digitado=True) if cep else (None, "", {})
+    if status_cep == CEP_OK and st.session_state.get("cep_vt_preenchido") != cep_norm:
+        st.session_state.update({"end_vt": dados_cep["logradouro"], "bairro_vt": dados_cep["bairro"],
+                                 "cid_vt": dados_cep["localidade"], "uf_vt": dados_cep["uf"], "cep_vt_preenchido": cep_norm})
+    elif cep and status_cep != CEP_OK:
+        c_end1.caption(f"⚠️ {status_cep}")
+    endereco = c_end2.text_input("Endereço (Rua/Av)", key="end_vt")
     
     c_end3, c_end4, c_end5, c_end6 = st.columns([0.5, 1.4, 1.2, 0.5])
     numero = c_end3.text_input("Número")
-    bairro = c_end4.text_input("Bairro")
+    bairro = c_end4.text_input("Bairro", key="bairro_vt")
     cidade = c_end5.text_input("Cidade", key="cid_vt")
     uf = c_end6.text_input("UF", key="uf_vt")
 
@@ -651,7 +735,7 @@ def modal_vale_transporte(df_pessoas):
     
     # Mapa de Substituição Completo
     mapa = {
-        "{nome}": nome_sel, "{cpf}": res.get("CPF",""), "{cep}": cep, "{endereço}": endereco,
+        "{nome}": nome_sel, "{cpf}": res.get("CPF",""), "{cep}": formatar_cep(cep_norm) or cep, "{endereço}": endereco,
         "{número}": numero, "{bairro}": bairro, "{cidade}": cidade, "{uf_estado}": uf,
         "{soma_linhas}": str(len(trans_res)), 
         "{soma_valor}": f"{soma_valor:.2f}",
@@ -680,9 +764,7 @@ def modal_vale_transporte(df_pessoas):
 
     try:
         arquivo = gerar_docx_com_substituicoes(modelo_file, mapa)
-        with c2:
-            st.download_button(f"📄 Baixar {opcao_adesao}", data=arquivo, file_name=f"VT_{opcao_adesao.replace(' ', '_')} - {nome_sel}.docx", use_container_width=True, type="primary")
-            st.link_button("🔃 Converter Doc em PDF", "https://www.ilovepdf.com/pt/word_para_pdf", use_container_width=True)
+        botoes_documento(c2, arquivo, f"VT_{opcao_adesao.replace(' ', '_')} - {nome_sel}.docx", "vt", rotulo=f"📄 Baixar {opcao_adesao}", tipo="primary")
     except: 
         c2.error(f"Modelo '{modelo_file}' não encontrado na pasta.")
 
@@ -694,16 +776,21 @@ def modal_rascunho_ponto(df_ativos):
         </div>
     """, unsafe_allow_html=True)
 
+    modo = st.radio("Modo", ["Individual", "Em lote (CSV)"], horizontal=True, key="ponto_modo")
+    if modo == "Em lote (CSV)":
+        _rascunhos_ponto_em_lote(df_ativos)
+        return
+
     # Filtro: Apenas CLT Ativos
-    df_clt = df_ativos[df_ativos["Modelo de contrato"].astype(str).str.upper().str.contains("CLT", na=False)].copy()
+    df_clt = filtrar_clt(df_ativos)
     
     lista_nomes = [""] + sorted(df_clt["Nome"].unique())
     nome_sel = st.selectbox("Selecione o Investidor CLT:", lista_nomes, key="sel_ponto_clt_v4")
 
     if nome_sel:
-        row = df_clt[df_clt["Nome"] == nome_sel].iloc[0]
+        row = selecionar_registro(df_clt, nome_sel, key="ponto")
         # Busca a matrícula e trata o dado
-        matricula = str(row.get("Matrícula", "")).replace(".0", "").strip()
+        matricula = matricula_ahgora(row.get("Matrícula", ""))
         lider_nome = row.get("Liderança direta", "Não cadastrado") # Ajustado para o nome da sua coluna
         
         # Bloqueio se não houver matrícula
@@ -720,81 +807,198 @@ def modal_rascunho_ponto(df_ativos):
         st.markdown("---")
         st.markdown("##### Anexo Obrigatório")
         
-        # Exemplo 1: Se o arquivo for um padrão fixo que você já tem na pasta
         try:
-            with open("Treinamento CLTs - Ponto por exceção.pptx", "rb") as f:
-                st.download_button(
-                    label="📎 Baixar Anexo para o E-mail",
-                    data=f,
-                    file_name="Treinamento CLTs - Ponto por exceção.pptx",
-                    mime="application/pdf",
-                    use_container_width=True
-                )
+            st.download_button(
+                label="📎 Baixar Anexo para o E-mail",
+                data=anexo_ponto(),
+                file_name=ANEXO_PONTO,
+                mime="application/vnd.openxmlformats-officedocument.presentationml.presentation",
+                use_container_width=True
+            )
         except FileNotFoundError:
-            st.error("⚠️ Arquivo 'MTreinamento CLTs - Ponto por exceção.pptx' não encontrado na pasta do sistema.")
+            st.error(f"⚠️ Arquivo '{ANEXO_PONTO}' não encontrado na pasta do sistema.")
 
         if st.button("Gerar Rascunho", type="primary", use_container_width=True):
             if not chave_ativacao:
                 st.warning("Por favor, informe a chave de ativação para gerar o rascunho.")
             else:
-                primeiro_nome = nome_sel.split()[0].capitalize()
-                link_manual = "[https://docs.google.com/document/d/1PD-14f2227BPHbZmjAnB9JoowJgLMS9FET8YGf5Oq-w/edit?tab=t.0](https://docs.google.com/document/d/1PD-14f2227BPHbZmjAnB9JoowJgLMS9FET8YGf5Oq-w/edit?tab=t.0)"
-
                 st.markdown("---")
                 # Definimos o Assunto primeiro
                 # 1. Quadro do Assunto (Estilizado)
                 st.markdown("##### 📌 Assunto:")
                 assunto_html = f"""
                 <div style="background-color: white; color: #000000; font-family: Arial, sans-serif; font-size: 11pt; padding: 10px; border: 1px solid #eeeeee; border-radius: 8px; margin-bottom: 15px;">
-                    Formalização CLT - Sistema Ponto 🕝
+                    {ASSUNTO_PONTO}
                 </div>
                 """
                 st.markdown(assunto_html, unsafe_allow_html=True)
                 
                 st.markdown("---")
 
-                # Criamos o HTML completo em uma única variável, sem quebras de linha estranhas
                 st.markdown("##### 📌 Corpo do e-mail:")
-                corpo_final = f"""
-                <div style="background-color: white; color: #000000; font-family: Arial, sans-serif; font-size: 11pt; line-height: 1.6; padding: 20px; border: 1px solid #eeeeee; border-radius: 8px;">
-                    Olá, <b>{primeiro_nome}</b>. 
-                    Espero que esteja bem.<br><br>
-                    Tivemos um bate-papo importante sobre o modelo de contrato dos CLTs na V4 Company e agora oficialmente, estou enviando seu acesso ao sistema <b>AHGORA</b> para registro de <b>ponto por exceção.</b><br> 👉 
-                    <a href="https://docs.google.com/document/d/1PD-14f2227BPHbZmjAnB9JoowJgLMS9FET8YGf5Oq-w/edit?tab=t.0" target="_blank" style="color: #E30613; font-weight: bold; text-decoration: underline;">Clique aqui para acessar o manual de ativação</a><br><br>
-                    <b>Matrícula:</b> {matricula.zfill(6)}<br>
-                    <b>Senha:</b> 123456<br>
-                    <b>Chave de ativação:</b> {chave_ativacao}<br><br>
-                    <b>Para relembrarmos:</b><br>
-                    Adotamos a utilização do controle de ponto por <b>EXCEÇÃO</b>, no modelo de Banco de Horas trimestral. Esse sistema foi pensado para trazer mais flexibilidade e transparência na gestão do tempo de trabalho, garantindo clareza para todos.<br><br>
-                    <b>Como funciona:</b><br>
-                    • <b>Horas positivas (extras):</b> entram no banco de horas e podem ser compensadas em descanso até o final desses 3 meses, desde que tenham aprovação pela liderança e DP (milena.nascimento@v4company.com) no e-mail.<br>
-                    • <b>Horas negativas (faltas/atrasos):</b> entram no banco de horas e deverão ser compensadas no período de 3 meses do banco de horas pelo investidor.<br><br>
-                    <b>Regras principais:</b><br>
-                    • <b>Validade:</b> apuração a cada 3 meses.<br>
-                    • <b>Aprovação de horas extras:</b> Somente com autorização da liderança e DP (milena.nascimento@v4company.com), em casos específicos (ex.: War Day ou final do mês).<br><br>
-                    <b>Cálculo de horas:</b><br>
-                    • <b>Domingos/feriados</b> → 1h = 1h24 no banco.<br>
-                    • <b>Demais dias</b> → 1h trabalhada = 1h de banco de horas.<br>
-                    • <b>Adicional noturno (22h–06h):</b> pago em dinheiro (30%) dentro do mês, horas entram para banco de horas.<br><br>
-                    <b>Rescisão:</b><br>
-                    • <b>Saldo positivo</b> → pago junto às verbas rescisórias.<br>
-                    • <b>Saldo negativo</b> → descontado na rescisão.<br><br>
-                    <b>Folgas compensatórias:</b> precisam ser combinadas com 1 dia de antecedência + formalização com o DP (via e-mail milena.nascimento@v4company.com).<br><br>
-                    <b>Atestados:</b> devem ser anexados <b>obrigatoriamente</b> no sistema para abono.<br><br>
-                    <b>Apuração:</b> revisar saldo a cada 2 semanas para evitar acúmulo.<br><br>
-                    <b>Transparência:</b><br>
-                    Cada investidor terá acesso ao extrato mensal do banco de horas.<br>
-                    <b>Obs.:</b> A apuração da folha de pagamento acontece a cada dia 25.<br><br>
-                    Conte conosco para o que precisar.<br><br><br>
-                    Atenciosamente,
-                </div>
-                """
+                corpo_final = corpo_email_ponto(nome_sel, matricula.zfill(6), chave_ativacao)
                 
                 # Renderiza o HTML final
                 st.write("") # Pequeno espaçador
                 st.markdown(corpo_final, unsafe_allow_html=True)
                 st.success("Rascunho gerado! Agora basta selecionar o texto acima, copiar e colar no seu e-mail.")
+
+def _rascunhos_ponto_em_lote(df_ativos):
+    st.caption("Envie um CSV com as colunas **Matrícula** (ou **Nome**) e **Chave de ativação**. "
+               "Cada CLT encontrado vira um .eml com o treinamento anexado e a liderança em cópia.")
+    arquivo = st.file_uploader("CSV de chaves", type=["csv"], key="ponto_csv")
+    if arquivo is None:
+        return
+
+    try:
+        dados, gerados, faltantes = rascunhos_ponto_do_csv(df_ativos, arquivo.getvalue())
+    except FileNotFoundError:
+        st.error(f"⚠️ Arquivo '{ANEXO_PONTO}' não encontrado na pasta do sistema.")
+        return
+    except Exception as e:
+        st.error(f"Erro ao ler o CSV: {e}")
+        return
+
+    c1, c2 = st.columns(2)
+    c1.metric("Rascunhos gerados", gerados)
+    c2.metric("Não encontrados", len(faltantes))
+    if len(faltantes):
+        st.warning("⚠️ Algumas linhas do CSV não casaram com nenhum CLT ativo (o relatório também vai no .zip).")
+        st.dataframe(faltantes, use_container_width=True, hide_index=True)
+    if gerados:
+        st.download_button("⬇️ Baixar rascunhos (.zip)", data=dados, file_name=f"Rascunhos Ponto - {date.today().strftime('%d_%m_%Y')}.zip",
+                           mime="application/zip", use_container_width=True, type="primary")
                 
+# ==========================================
+# CONSOLIDAÇÃO DE TIMES POR LIDERANÇA
+# ==========================================
+@st.cache_data(max_entries=8, show_spinner=False)
+def consolidar_times(versao, _df):
+    """Headcount e remuneração diretos e transitivos de cada líder.
+
+    No passeio de Euler a subárvore de um líder é um trecho contíguo, então
+    os totais saem de somas acumuladas: total = acum[saída] - acum[entrada + 1].
+    """
+    hierarquia = obter_indice_hierarquia(_df)
+    ordem = hierarquia.ordem
+    n = len(ordem)
+    colunas = ["Líder", "Cargo", "Profundidade", "Liderados Diretos", "Time Total", "Remuneração Time", "CLT", "PJ", "% CLT"]
+    if n == 0:
+        return pd.DataFrame(columns=colunas)
+
+    base = _df.assign(_nome=_df["Nome"].astype(str).str.strip()).drop_duplicates("_nome")
+    pos = base["_nome"].map(hierarquia.entrada)
+    base, pos = base[pos.notna()], pos[pos.notna()].astype(int).to_numpy()
+
+    modelo = base["Modelo de contrato"].astype(str).str.upper() if "Modelo de contrato" in base.columns else pd.Series("", index=base.index)
+    remuneracao = remuneracao_em_reais(base).fillna(0)
+
+    # Valores individuais na ordem do passeio (líderes externos ficam zerados)
+    valores = np.zeros((4, n))
+    valores[0, pos] = 1
+    valores[1, pos] = remuneracao.to_numpy()
+    valores[2, pos] = modelo.str.contains("CLT").to_numpy()
+    valores[3, pos] = modelo.str.contains("PJ").to_numpy()
+    acum = np.concatenate([np.zeros((4, 1)), np.cumsum(valores, axis=1)], axis=1)
+
+    entrada = np.arange(n)
+    saida = np.array([hierarquia.saida[nome] for nome in ordem])
+    totais = acum[:, saida] - acum[:, entrada + 1]
+    diretos = np.array([len(hierarquia.filhos[nome]) for nome in ordem])
+
+    cargos = pd.Series(base["Cargo"].to_numpy() if "Cargo" in base.columns else "", index=base["_nome"]).to_dict()
+    df_times = pd.DataFrame({
+        "Líder": ordem,
+        "Cargo": [cargos.get(nome, "") for nome in ordem],
+        "Profundidade": [hierarquia.profundidade[nome] for nome in ordem],
+        "Liderados Diretos": diretos,
+        "Time Total": totais[0].astype(int),
+        "Remuneração Time": totais[1],
+        "CLT": totais[2].astype(int),
+        "PJ": totais[3].astype(int),
+    })
+    df_times["% CLT"] = np.where(df_times["Time Total"] > 0, df_times["CLT"] / df_times["Time Total"].clip(lower=1) * 100, 0.0)
+    df_times = df_times[df_times["Liderados Diretos"] > 0]
+    return df_times.sort_values("Time Total", ascending=False).reset_index(drop=True)[colunas]
+
+# ==========================================
+# ORGANOGRAMA (RAMOS RECOLHÍVEIS)
+# ==========================================
+@st.cache_resource(max_entries=8, show_spinner=False)
+def mapa_cargos(versao, _df):
+    df_cargos = _df[_df["Nome"].notna()]
+    return pd.Series(df_cargos["Cargo"].values, index=df_cargos["Nome"].astype(str).str.strip()).to_dict()
+
+def montar_ramo_organograma(hierarquia, raiz, niveis, expandidos, cargos):
+    """Nós visíveis do ramo até `niveis` abaixo da raiz; os demais ficam recolhidos."""
+    nos, arestas, recolhidos, vistos = [], [], {}, set()
+    pilha = [(raiz, 0)]
+    while pilha:
+        nome, nivel = pilha.pop()
+        if nome in vistos:
+            continue
+        vistos.add(nome)
+        nos.append(nome)
+        filhos = hierarquia.liderados_diretos(nome)
+        if not filhos:
+            continue
+        if nivel < niveis or nome in expandidos:
+            arestas.extend((nome, filho) for filho in filhos)
+            pilha.extend((filho, nivel + 1) for filho in reversed(filhos))
+        else:
+            recolhidos[nome] = hierarquia.tamanho_subarvore(nome) - 1
+
+    # A assinatura cobre tudo o que aparece no desenho do ramo
+    conteudo = "\n".join(f"{n}|{cargos.get(n, '')}|{recolhidos.get(n, '')}" for n in nos)
+    conteudo += "\n" + "\n".join(f"{a}>{b}" for a, b in arestas)
+    assinatura = hashlib.sha1(conteudo.encode("utf-8")).hexdigest()
+    return assinatura, nos, arestas, recolhidos
+
+def ramos_organograma(hierarquia, raizes, niveis, expandidos, cargos):
+    """Divide o organograma em um cabeçalho por raiz e um ramo por liderado direto."""
+    ramos = []
+    for raiz in sorted(raizes, key=lambda r: -hierarquia.tamanho_subarvore(r)):
+        filhos = hierarquia.liderados_diretos(raiz)
+        if not filhos:
+            continue
+        # Cabeçalho: raiz + liderados diretos (com o tamanho de cada time)
+        expandidos_cab = {raiz} if niveis > 1 else set(expandidos) | {raiz}
+        assinatura, nos, arestas, recolhidos = montar_ramo_organograma(hierarquia, raiz, 0, expandidos_cab, cargos)
+        ramos.append((f"{raiz} • {hierarquia.tamanho_subarvore(raiz) - 1} liderados", assinatura, nos, arestas, recolhidos))
+        if niveis > 1:
+            for filho in filhos:
+                if hierarquia.liderados_diretos(filho):
+                    ramo = montar_ramo_organograma(hierarquia, filho, niveis - 1, expandidos, cargos)
+                    ramos.append((f"↳ Ramo {filho} • {hierarquia.tamanho_subarvore(filho) - 1} liderados", *ramo))
+    return ramos
+
+@st.cache_data(max_entries=512, show_spinner=False)
+def renderizar_ramo_organograma(assinatura, _nos, _arestas, _recolhidos, _cargos):
+    """Layout do ramo, cacheado pela assinatura do conteúdo (SVG se houver o `dot`)."""
+    dot = graphviz.Digraph()
+    dot.attr(rankdir='LR', ranksep='0.6', nodesep='0.3', bgcolor='transparent')
+    dot.attr('node', shape='rectangle', style='filled, rounded',
+             fillcolor='#404040', color='#2E2E2E', fontcolor='white',
+             fontname='Arial', fontsize='10',
+             width='1.8', height='0.4')
+
+    for nome in _nos:
+        cargo = _cargos.get(nome, "")
+        label = f"{nome}\n({cargo})" if cargo else nome
+        if nome in _recolhidos:
+            dot.node(nome, f"{label}\n▸ +{_recolhidos[nome]} liderados", fillcolor='#8B0000')
+        else:
+            dot.node(nome, label)
+    for lider, liderado in _arestas:
+        dot.edge(lider, liderado, color='#808080', penwidth='3.0')
+
+    try:
+        svg = dot.pipe(format="svg").decode("utf-8")
+        return svg[svg.find("<svg"):], True
+    except (graphviz.ExecutableNotFound, graphviz.CalledProcessError):
+        # Sem o binário do Graphviz no servidor, o layout fica com o navegador
+        return dot.source, False
+
 # ==========================================
 # MODAL DE CONSULTA (HÍBRIDO - REFORMULADO V3)
 # ==========================================
@@ -830,7 +1034,10 @@ def modal_consulta_investidor(df_consulta, nome, tipo_base="ativo"):
             return ""
         return str(val)
 
-    linha = df_consulta[df_consulta["Nome"] == nome].iloc[0]
+    linha = selecionar_registro(df_consulta, nome, key=f"consulta_{tipo_base}")
+    if linha is None:
+        st.warning("Investidor não encontrado na base atual.")
+        return
 
     # --- CABEÇALHO PERSONALIZADO ---
     if tipo_base == "desligado":
@@ -838,9 +1045,9 @@ def modal_consulta_investidor(df_consulta, nome, tipo_base="ativo"):
         # HTML para alinhar Nome à esquerda e Status à direita na mesma linha
         st.markdown(f"""
             <div style="display: flex; align-items: center; justify-content: space-between; margin-bottom: 10px;">
-                <h2 style="margin: 0;">{nome}</h2>
+                <h2 style="margin: 0;">{html.escape(str(nome))}</h2>
                 <span style="color: #E30613; font-weight: bold; font-size: 16px;">
-                    Desligado em {dt_rescisao}
+                    Desligado em {html.escape(str(dt_rescisao))}
                 </span>
             </div>
             <hr style="margin-top: 0px; margin-bottom: 20px; border-top: 1px solid #ff4b4b;">
@@ -955,7 +1162,7 @@ def modal_consulta_investidor(df_consulta, nome, tipo_base="ativo"):
         # Foto (Sem título, apenas a imagem)
         foto = linha.get("Foto", "")
         if foto and str(foto).startswith("http"):
-            st.markdown(f'<div style="display:flex; justify-content:center; margin-bottom:20px; margin-top: 25px;"><img src="{foto}" width="120" style="border-radius:8px; box-shadow: 0px 2px 5px rgba(0,0,0,0.1);"></div>', unsafe_allow_html=True)
+            st.markdown(f'<div style="display:flex; justify-content:center; margin-bottom:20px; margin-top: 25px;"><img src="{html.escape(str(foto))}" width="120" style="border-radius:8px; box-shadow: 0px 2px 5px rgba(0,0,0,0.1);"></div>', unsafe_allow_html=True)
         else:
             st.markdown("<br><br>", unsafe_allow_html=True) # Espaço vazio para alinhar se não tiver foto
             st.info("Sem foto")
@@ -988,28 +1195,168 @@ def modal_consulta_investidor(df_consulta, nome, tipo_base="ativo"):
                         elif tipo == "warning": st.warning(msg, icon="⚠️")
                         elif tipo == "success": st.success(msg, icon="🎉")
                         else: st.info(msg, icon="ℹ️")
+
+    # ==========================================
+    # HISTÓRICO DE ALTERAÇÕES
+    # ==========================================
+    with st.expander("🕓 Histórico", expanded=False):
+        chave = chave_registro(pd.DataFrame([linha])).iloc[0]
+        hist = carregar_historico()
+        df_hist = hist.alteracoes(chave) if chave else pd.DataFrame()
+
+        if df_hist.empty:
+            st.info("Nenhuma alteração registrada para este investidor (o histórico começa no primeiro acesso de cada dia).")
+        else:
+            h1, h2 = st.columns([1, 2])
+            with h1:
+                data_hist = st.date_input("Valores em", value=datetime.today(), format="DD/MM/YYYY", key=f"dt_hist_{tipo_base}")
+                campos_hist = ["Cargo", "Remuneração", "Liderança direta", "Área", "Modelo de contrato", "Situação no plano"]
+                st.dataframe(
+                    pd.DataFrame({"Campo": campos_hist, "Valor": [hist.valor_em(chave, c, data_hist) or "" for c in campos_hist]}),
+                    use_container_width=True, hide_index=True
+                )
+            with h2:
+                df_hist = df_hist[df_hist["coluna"] != COLUNA_REMOVIDO]
+                df_hist = df_hist.assign(data=df_hist["data"].dt.strftime("%d/%m/%Y"))
+                df_hist = df_hist[["data", "base", "coluna", "anterior", "valor"]]
+                df_hist.columns = ["Data", "Base", "Campo", "Anterior", "Novo"]
+                st.dataframe(df_hist, use_container_width=True, hide_index=True, height=260)
                                         
+# ==========================================
+# RELATÓRIOS DO ANALYTICS (TELA E PACOTE MENSAL)
+# ==========================================
+def _colunas(df, colunas):
+    return df[[c for c in colunas if c in df.columns]]
+
+def _sem_cc(df):
+    vazio = lambda col: df[col].fillna("").astype(str).str.strip().str.lower().isin(["", "nan", "none", "nat"]) if col in df.columns else pd.Series(True, index=df.index)
+    return vazio("Código CC") | vazio("Descrição CC")
+
+def relatorio_master(df_ativos_proc, df_desligados_proc):
+    df = pd.concat([df_ativos_proc.assign(Status="Ativo"), df_desligados_proc.assign(Status="Desligado")], ignore_index=True)
+    return df[colunas_exportaveis(df)]
+
+def relatorio_aniversariantes(df_ativos_proc, eventos_mes):
+    df = df_ativos_proc.iloc[[e["_pos"] for e in eventos_mes]].assign(Idade=[e["Detalhe"] for e in eventos_mes])
+    return _colunas(df, ["Nome", "E-mail corporativo", "Área", "Data de nascimento", "Idade"])
+
+def relatorio_tempo_casa(df_ativos_proc, data_ref, min_anos=1, min_meses=0):
+    data_limite = pd.Timestamp(data_ref).normalize() - relativedelta(years=min_anos, months=min_meses)
+    df = df_ativos_proc[df_ativos_proc["Início na V4_dt"] <= data_limite].sort_values("Início na V4_dt")
+    df = df.assign(**{"Tempo de Casa": texto_tempo_casa(df["Início na V4_dt"], pd.Timestamp(data_ref).normalize(), vazio="-")})
+    return _colunas(df, ["Nome", "Remuneração", "Início na V4", "Tempo de Casa"])
+
+def relatorio_cargos_salarios(df_ativos_proc):
+    df = df_ativos_proc.assign(Rem_Num=remuneracao_em_reais(df_ativos_proc))
+    # Descrição vazia na planilha é completada pelo catálogo
+    df["Descrição CBO"] = catalogo_cbo().preencher_descricoes(df["CBO"], df.get("Descrição CBO"))
+    df_cargo = df.groupby(["Cargo", "Área", "CBO", "Descrição CBO"]).agg(Remuneração_Média=("Rem_Num", "mean")).reset_index()
+    df_cargo["Remuneração_Média"] = formatar_brl(df_cargo["Remuneração_Média"])
+    return df_cargo
+
+def relatorio_contratos_a_vencer(df_ativos_proc, inicio, fim):
+    termino = df_ativos_proc["Térm previsto_dt"]
+    df = df_ativos_proc[termino.notna() & (termino >= pd.Timestamp(inicio)) & (termino <= pd.Timestamp(fim))].sort_values("Térm previsto_dt")
+    return _colunas(df, ["Nome", "Cargo", "Modelo de contrato", "Térm previsto", "E-mail corporativo", "Liderança direta"])
+
+def relatorio_mei(df_ativos_proc):
+    df = df_ativos_proc[df_ativos_proc["Modalidade PJ"].astype(str).str.upper().str.contains("MEI", na=False)]
+    return _colunas(df, ["Nome", "E-mail corporativo", "Cargo", "Modalidade PJ"])
+
+def relatorio_centro_custo(df_ativos_proc):
+    df = df_ativos_proc.assign(Rem_Num=remuneracao_em_reais(df_ativos_proc))
+    df_cc = df[~_sem_cc(df)].groupby(["Código CC", "Descrição CC", "Área"]).agg(
+        Qtd_Investidores=("Nome", "count"),
+        Total_Remuneracao=("Rem_Num", "sum")
+    ).reset_index()
+    df_cc["Total_Remuneracao"] = formatar_brl(df_cc["Total_Remuneracao"])
+    return df_cc
+
+def relatorio_modelo_contrato(df_ativos_proc):
+    df = df_ativos_proc.assign(Rem_Num=remuneracao_em_reais(df_ativos_proc))
+    df_mod = df.groupby("Modelo de contrato").agg(
+        Qtd_Investidores=("Nome", "count"),
+        Total_Remuneracao=("Rem_Num", "sum")
+    ).reset_index()
+    df_mod["Total_Remuneracao"] = formatar_brl(df_mod["Total_Remuneracao"])
+    return df_mod
+
+def geradores_pacote_mensal(df_ativos_proc, df_desligados_proc, eventos_mes, hoje):
+    """Um gerador por arquivo do pacote; todos leem o mesmo snapshot das bases."""
+    geradores = {
+        "Master": lambda: relatorio_master(df_ativos_proc, df_desligados_proc),
+        "Aniversariantes": lambda: relatorio_aniversariantes(df_ativos_proc, eventos_mes),
+        "Tempo de Casa": lambda: relatorio_tempo_casa(df_ativos_proc, hoje),
+        "Cargos e Salários": lambda: relatorio_cargos_salarios(df_ativos_proc),
+        "Contratos a vencer": lambda: relatorio_contratos_a_vencer(df_ativos_proc, hoje, hoje + relativedelta(months=3)),
+        "MEI": lambda: relatorio_mei(df_ativos_proc),
+        "Centro de Custo": lambda: relatorio_centro_custo(df_ativos_proc),
+        "Modelo de Contrato": lambda: relatorio_modelo_contrato(df_ativos_proc),
+    }
+    colunas = df_ativos_proc.columns
+    obrigatorias = {"Tempo de Casa": "Início na V4_dt", "Contratos a vencer": "Térm previsto_dt", "MEI": "Modalidade PJ", "Aniversariantes": "Data de nascimento_dt"}
+    return {nome: gerar for nome, gerar in geradores.items() if obrigatorias.get(nome, "Nome") in colunas}
+
+@st.fragment(run_every="1s")
+def _acompanhar_pacote(versao):
+    pacote = obter_pacote(versao)
+    if pacote is None or pacote.finalizado:
+        st.rerun()
+    st.progress(pacote.progresso, text=f"⏳ Gerando relatórios... {pacote.concluidos}/{pacote.total}")
+
+def painel_pacote_relatorios(versao):
+    pacote = obter_pacote(versao)
+    if pacote is None:
+        return
+    if not pacote.finalizado:
+        _acompanhar_pacote(versao)
+        return
+    if pacote.falha is not None:
+        st.error(f"❌ Não foi possível montar o pacote: {pacote.falha}. Clique em gerar para tentar de novo.")
+        return
+    if pacote.erros:
+        st.warning("⚠️ Relatórios com erro (fora do pacote): " + ", ".join(f"{nome} ({erro})" for nome, erro in pacote.erros.items()))
+    st.download_button(
+        f"📦 Baixar pacote ({pacote.iniciado_em.strftime('%d/%m/%Y %H:%M')})",
+        data=pacote.dados,
+        file_name=f"{pacote.rotulo}.zip",
+        mime="application/zip",
+        use_container_width=True,
+        key="download_pacote"
+    )
+
+# ==========================================
+# PREPARAÇÃO DAS BASES
+# ==========================================
+def preparar_dataframe(df_raw):
+    """Colunas *_dt e Remuneração_cent; datas reescritas em dd/mm/aaaa."""
+    df = df_raw.copy(deep=False)
+    cols_data = ["Início na V4", "Data de nascimento", "Data do contrato", "Térm previsto", "Data de rescisão"]
+    for col in cols_data:
+        if col in df.columns:
+            df[f"{col}_dt"] = parse_data_br(df[col])
+            df[col] = df[f"{col}_dt"].dt.strftime("%d/%m/%Y").fillna("")
+    # Remuneração lida uma única vez, em centavos exatos
+    if "Remuneração" in df.columns:
+        df["Remuneração_cent"], _ = remuneracao_em_centavos(df["Remuneração"])
+    return df
+
 # ==========================================
 # RENDER PRINCIPAL
 # ==========================================
-def render(df_ativos, df_desligados):
+def render(df_ativos, df_desligados, df_ativos_proc=None, df_desligados_proc=None):
     if "authenticated" not in st.session_state or not st.session_state.authenticated:
         st.warning("Faça login na tela inicial.")
         st.stop()
         
-    # --- 1. PREPARAÇÃO DOS DADOS (MOVIDO PARA O TOPO) ---
-    def preparar_dataframe(df_raw):
-        df = df_raw.copy()
-        cols_data = ["Início na V4", "Data de nascimento", "Data do contrato", "Térm previsto", "Data de rescisão"]
-        for col in cols_data:
-            if col in df.columns:
-                df[f"{col}_dt"] = parse_data_br(df[col])
-                df[col] = df[f"{col}_dt"].dt.strftime("%d/%m/%Y").fillna("")
-        return df
-
-    # Criamos as variáveis processadas aqui, antes de qualquer visual
-    df_ativos_proc = preparar_dataframe(df_ativos)
-    df_desligados_proc = preparar_dataframe(df_desligados)
+    # --- 1. PREPARAÇÃO DOS DADOS ---
+    # Normalmente já vêm prontas do snapshot compartilhado (uma vez por processo)
+    iniciar_medicao()
+    with medir("Preparação"):
+        if df_ativos_proc is None:
+            df_ativos_proc = preparar_dataframe(df_ativos)
+        if df_desligados_proc is None:
+            df_desligados_proc = preparar_dataframe(df_desligados)
 
     # --- 2. CABEÇALHO (LOGO E TÍTULO) ---
     c_logo, c_texto = st.columns([0.5, 6]) 
@@ -1023,24 +1370,11 @@ def render(df_ativos, df_desligados):
         """, unsafe_allow_html=True)
                     
     aba_dashboard, aba_rolling, aba_analytics, aba_acoes, aba_conectividade = st.tabs(["📊 Dashboard", "👥 Rolling", "📈 Analytics", "⚡ Ações", "🔗 Conectividade"])
-    
-    # --- PREPARAÇÃO DE DATAS ---
-    def preparar_dataframe(df_raw):
-        df = df_raw.copy()
-        cols_data = ["Início na V4", "Data de nascimento", "Data do contrato", "Térm previsto", "Data de rescisão"]
-        for col in cols_data:
-            if col in df.columns:
-                df[f"{col}_dt"] = parse_data_br(df[col])
-                df[col] = df[f"{col}_dt"].dt.strftime("%d/%m/%Y").fillna("")
-        return df
-
-    df_ativos_proc = preparar_dataframe(df_ativos)
-    df_desligados_proc = preparar_dataframe(df_desligados)
 
     # ----------------------------------------------------
     # ABA DASHBOARD (COM FILTROS DINÂMICOS)
     # ----------------------------------------------------
-    with aba_dashboard:
+    with aba_dashboard, medir("Dashboard"):
         # --- SEÇÃO DE FILTROS ---
         st.markdown("""
             <div style="background-color: #f1f3f5; padding: 12px; border-radius: 6px; border-left: 5px solid #404040; margin-bottom: 20px;">
@@ -1063,9 +1397,9 @@ def render(df_ativos, df_desligados):
             sel_lider = col_f3.multiselect("Filtrar por Liderança", opts_lider)
 
         # --- APLICAÇÃO DOS FILTROS ---
-        # Cria cópias para não alterar os dados originais das outras abas
-        df_dash_ativos = df_ativos_proc.copy()
-        df_dash_deslig = df_desligados_proc.copy()
+        # Filtrar gera objetos novos (copy-on-write): as outras abas não são afetadas
+        df_dash_ativos = df_ativos_proc
+        df_dash_deslig = df_desligados_proc
 
         # Filtro Unidade
         if sel_unidade:
@@ -1103,19 +1437,16 @@ def render(df_ativos, df_desligados):
         
         # KPI: Tempo Médio
         if "Início na V4_dt" in df_dash_ativos.columns:
-            hj = pd.Timestamp.today().normalize()
-            datas_inicio = df_dash_ativos[df_dash_ativos["Início na V4_dt"].notna()]["Início na V4_dt"]
-            if not datas_inicio.empty:
-                anos_medios = (hj - datas_inicio).dt.days.mean() / 365.25
+            anos_medios = anos_decimais(df_dash_ativos["Início na V4_dt"]).mean()
+            if pd.notna(anos_medios):
                 col_k3.metric("Tempo Médio (Anos)", f"{anos_medios:.1f}")
             else:
                 col_k3.metric("Tempo Médio", "-")
         
         # KPI: Idade Média
         if "Data de nascimento_dt" in df_dash_ativos.columns:
-            df_nasc = df_dash_ativos[df_dash_ativos["Data de nascimento_dt"].notna()]
-            if not df_nasc.empty:
-                media_idade = ((pd.Timestamp.today() - df_nasc["Data de nascimento_dt"]).dt.days / 365.25).mean()
+            media_idade = anos_decimais(df_dash_ativos["Data de nascimento_dt"]).mean()
+            if pd.notna(media_idade):
                 col_k4.metric("Idade Média", f"{media_idade:.1f}")
             else:
                 col_k4.metric("Idade Média", "-")
@@ -1182,7 +1513,13 @@ def render(df_ativos, df_desligados):
         with g4:
             st.subheader("👥 Span of Control (Top 10)")
             if "Liderança direta" in df_dash_ativos.columns and not df_dash_ativos.empty:
-                df_lider = df_dash_ativos["Liderança direta"].replace("", pd.NA).dropna().value_counts().head(10).reset_index()
+                tipo_span = st.radio("Contagem", ["Diretos", "Time total"], horizontal=True, key="radio_span", label_visibility="collapsed")
+                if tipo_span == "Diretos":
+                    df_lider = df_dash_ativos["Liderança direta"].replace("", pd.NA).dropna().value_counts().head(10).reset_index()
+                else:
+                    df_times = consolidar_times(versao_dados(df_ativos_proc), df_ativos_proc)
+                    lideres_filtro = df_dash_ativos["Liderança direta"].astype(str).str.strip().unique()
+                    df_lider = df_times[df_times["Líder"].isin(lideres_filtro)][["Líder", "Time Total"]].head(10)
                 df_lider.columns = ["Líder", "Liderados"]
                 if not df_lider.empty:
                     chart_lider = alt.Chart(df_lider).mark_bar(color="#8B0000").encode(
@@ -1222,52 +1559,61 @@ def render(df_ativos, df_desligados):
                 st.altair_chart(chart_mod, use_container_width=True)
         
         st.markdown("---")
-        st.subheader("🌳 Estrutura Organizacional")
-        
-        import graphviz
-
-        @st.cache_data
-        def gerar_grafo_lideranca_v5(df_base, lider_raiz):
-            df_base = df_base[df_base["Nome"].notna()].copy()
-            
-            if lider_raiz == "Ver Tudo":
-                df_exibir = df_base.copy()
+        st.subheader("📉 Headcount e Turnover")
+
+        with st.expander("Evolução mensal (ativos + desligados)", expanded=False):
+            motor = obter_motor_headcount(df_dash_ativos, df_dash_deslig)
+            if motor.descartados:
+                st.caption(f"ℹ️ {motor.descartados} registro(s) sem data de início/rescisão válida foram desconsiderados.")
+
+            c_hc1, c_hc2, c_hc3, c_hc4 = st.columns([1, 1, 1, 1.2])
+            data_hc = c_hc1.date_input("Headcount em", value=datetime.today(), format="DD/MM/YYYY", key="dt_headcount")
+            # Sem ninguém nos filtros, as métricas mostram "—" em vez de um zero enganoso
+            c_hc2.metric("Headcount na data", int(motor.headcount_em(data_hc)[0]) if not motor.intervalos.empty else "—")
+            janela = c_hc3.selectbox("Período", [12, 24, 36, 60], format_func=lambda m: f"Últimos {m} meses", key="janela_turnover")
+            dim_sel = c_hc4.selectbox("Quebrar por", ["Nenhuma"] + list(DIMENSOES), key="dim_turnover")
+
+            fim_periodo = pd.Timestamp(data_hc)
+            ini_periodo = fim_periodo - pd.DateOffset(months=janela - 1)
+            df_turn = motor.serie_mensal(ini_periodo, fim_periodo, None if dim_sel == "Nenhuma" else dim_sel)
+
+            if df_turn.empty:
+                st.info("Sem dados no período selecionado.")
             else:
-                lista_nomes = [lider_raiz]
-                for _ in range(5):
-                    novos = df_base[df_base["Liderança direta"].isin(lista_nomes)]["Nome"].tolist()
-                    if not novos: break
-                    lista_nomes.extend(novos)
-                df_exibir = df_base[df_base["Nome"].isin(set(lista_nomes))]
-
-            dot = graphviz.Digraph()
-            
-            # Removemos o DPI fixo para o navegador controlar a escala
-            # Reduzimos o ranksep (espaço entre níveis) para 0.6
-            dot.attr(rankdir='LR', ranksep='0.6', nodesep='0.3', bgcolor='transparent')
-            
-            # Width 1.8 e Height 0.4 são o tamanho ideal para 2 linhas de texto
-            dot.attr('node', shape='rectangle', style='filled, rounded', 
-                     fillcolor='#404040', color='#2E2E2E', fontcolor='white', 
-                     fontname='Arial', fontsize='10', 
-                     width='1.8', height='0.4')
+                chart_hc = alt.Chart(df_turn).mark_line(point=True).encode(
+                    x=alt.X("Mês:T", title="Mês"), y=alt.Y("Headcount:Q"),
+                    color=alt.Color("Grupo:N", scale=alt.Scale(range=CORES_V4), legend=None if dim_sel == "Nenhuma" else alt.Legend()),
+                    tooltip=[alt.Tooltip("Mês:T", format="%m/%Y"), "Grupo", "Headcount", "Admissões", "Desligamentos", alt.Tooltip("Turnover %:Q", format=".1f")]
+                )
+                st.altair_chart(chart_hc, use_container_width=True)
 
-            cargos = pd.Series(df_base["Cargo"].values, index=df_base["Nome"]).to_dict()
+                total_mes = df_turn.groupby("Mês")[["Admissões", "Desligamentos"]].sum().reset_index()
+                hc_medio = df_turn.groupby("Mês")["Headcount"].sum().mean()
+                c_t1, c_t2, c_t3 = st.columns(3)
+                c_t1.metric("Admissões no período", int(total_mes["Admissões"].sum()))
+                c_t2.metric("Desligamentos no período", int(total_mes["Desligamentos"].sum()))
+                c_t3.metric("Turnover no período", f"{(total_mes['Desligamentos'].sum() / hc_medio * 100) if pd.notna(hc_medio) and hc_medio > 0 else 0:.1f}%")
 
-            for _, row in df_exibir.iterrows():
-                lid = str(row["Liderança direta"]).strip()
-                nom = str(row["Nome"]).strip()
-                
-                if lid and lid != 'nan' and lid != "":
-                    car_l = cargos.get(lid, "")
-                    car_n = cargos.get(nom, "")
-                    label_l = f"{lid}\n({car_l})" if car_l else lid
-                    label_n = f"{nom}\n({car_n})" if car_n else nom
-                    # Linhas muito mais visíveis
-                    dot.edge(label_l, label_n, color='#808080', penwidth='3.0')
-            
-            return dot
+                df_turn_view = df_turn.assign(Mês=df_turn["Mês"].dt.strftime("%m/%Y"))
+                if dim_sel == "Nenhuma":
+                    df_turn_view = df_turn_view.drop(columns="Grupo")
+                st.dataframe(df_turn_view, use_container_width=True, hide_index=True, column_config={"Turnover %": st.column_config.NumberColumn(format="%.1f%%")})
 
+        st.markdown("---")
+        st.subheader("🌳 Estrutura Organizacional")
+
+        with st.expander("📊 Times por Liderança (consolidado)", expanded=False):
+            df_times = consolidar_times(versao_dados(df_ativos_proc), df_ativos_proc)
+            if df_times.empty:
+                st.info("Sem dados de liderança.")
+            else:
+                st.caption("Time Total inclui liderados diretos e indiretos. Clique no cabeçalho para ordenar.")
+                st.dataframe(
+                    df_times.assign(**{"Remuneração Time": formatar_brl(df_times["Remuneração Time"]).to_numpy()}),
+                    use_container_width=True, hide_index=True,
+                    column_config={"% CLT": st.column_config.NumberColumn(format="%.0f%%")}
+                )
+        
         with st.expander("Visualizar organograma", expanded=False):
             # 1. Manter o seu CSS de scroll
             st.markdown("""
@@ -1284,24 +1630,23 @@ def render(df_ativos, df_desligados):
                 </style>
             """, unsafe_allow_html=True)
 
-            df_org_base = df_ativos_proc.copy()
+            df_org_base = df_ativos_proc
             lista_lideres = ["Ver Tudo"] + sorted([l for l in df_org_base["Liderança direta"].unique() if str(l) != 'nan' and l != ""])
             sel_lider = st.selectbox("Selecione um Líder:", lista_lideres, key="filtro_v5")
 
             # --- NOVO BLOCO: CARD DE DESTAQUE DO LÍDER ---
             if sel_lider != "Ver Tudo":
                 # Busca os dados desse líder na base
-                dados_lider = df_org_base[df_org_base["Nome"] == sel_lider]
+                lider_info = obter_indice_registros(df_org_base).registro("nome", sel_lider)
                 
-                if not dados_lider.empty:
-                    lider_info = dados_lider.iloc[0]
+                if lider_info is not None:
                     col_foto, col_info = st.columns([1, 5]) # Coluna da foto e coluna do texto
                     
                     with col_foto:
                         foto_url = lider_info.get("Foto", "")
                         if foto_url and str(foto_url).startswith("http"):
                             # Foto redonda com borda vermelha V4
-                            st.markdown(f'<img src="{foto_url}" style="width:70px; height:70px; border-radius:50%; object-fit:cover; border: 2px solid #E30613;">', unsafe_allow_html=True)
+                            st.markdown(f'<img src="{html.escape(str(foto_url))}" style="width:70px; height:70px; border-radius:50%; object-fit:cover; border: 2px solid #E30613;">', unsafe_allow_html=True)
                         else:
                             st.markdown('<div style="width:70px; height:70px; border-radius:50%; background-color:#f1f3f5; display:flex; align-items:center; justify-content:center; border: 2px solid #d3d3d3; color:#999; font-size:30px;">👤</div>', unsafe_allow_html=True)
                     
@@ -1311,17 +1656,41 @@ def render(df_ativos, df_desligados):
                 st.markdown("---") # Linha divisória antes do gráfico
             # --------------------------------------------
 
-            # 2. Roda o gráfico normalmente
-            grafo = gerar_grafo_lideranca_v5(df_org_base, sel_lider)
-
-            if grafo:
+            # Inconsistências da árvore (ciclos e líderes fora da base)
+            hierarquia = obter_indice_hierarquia(df_org_base)
+            if hierarquia.ciclos:
+                ciclos_txt = "; ".join(" → ".join(c + [c[0]]) for c in hierarquia.ciclos)
+                st.warning(f"🔁 Ciclo de liderança detectado: {ciclos_txt}")
+            if hierarquia.orfaos:
+                st.caption(f"ℹ️ {len(hierarquia.orfaos)} investidor(es) com liderança fora da base de ativos: {', '.join(hierarquia.externos)}")
+
+            # 2. Controles de níveis e expansão sob demanda
+            cargos = mapa_cargos(versao_dados(df_org_base, ["Nome", "Cargo"]), df_org_base)
+            raizes = hierarquia.raizes if sel_lider == "Ver Tudo" else [str(sel_lider).strip()]
+
+            c_niv, c_exp = st.columns([1, 3])
+            niveis = c_niv.number_input("Níveis visíveis", min_value=1, max_value=10, value=2, step=1, key="org_niveis")
+            opts_expandir = sorted({n for r in raizes for n in [r] + hierarquia.descendentes(r) if hierarquia.liderados_diretos(n)})
+            expandidos = set(c_exp.multiselect("Expandir lideranças", opts_expandir, key="org_expandidos"))
+
+            # 3. Cada ramo é desenhado (e cacheado) separadamente
+            ramos = ramos_organograma(hierarquia, raizes, niveis, expandidos, cargos)
+            if not ramos:
+                st.info("Sem relações de liderança para exibir.")
+            else:
                 with st.container(height=800, border=True):
-                    st.graphviz_chart(grafo, use_container_width=False)
+                    for titulo, assinatura, nos, arestas, recolhidos in ramos:
+                        st.caption(titulo)
+                        conteudo, eh_svg = renderizar_ramo_organograma(assinatura, nos, arestas, recolhidos, cargos)
+                        if eh_svg:
+                            st.markdown(f'<div style="overflow:auto;">{conteudo}</div>', unsafe_allow_html=True)
+                        else:
+                            st.graphviz_chart(conteudo, use_container_width=False)
                 
     # ----------------------------------------------------
     # ABA ROLLING (TÍTULOS PADRONIZADOS)
     # ----------------------------------------------------
-    with aba_rolling:
+    with aba_rolling, medir("Rolling"):
         # Texto Explicativo
         st.markdown("""
             <div style="background-color: #f1f3f5; padding: 12px; border-radius: 6px; border-left: 5px solid #404040; margin-bottom: 20px;">
@@ -1407,6 +1776,12 @@ def render(df_ativos, df_desligados):
             if st.button("🔍 Ver Detalhes", key=f"btn_rol{key_suffix}") and sel_investidor:
                 modal_consulta_investidor(df_atual, sel_investidor, tipo_base)
         
+        # Alerta de registros duplicados (homônimos, CPF/BP/e-mail repetidos)
+        df_colisoes = obter_indice_registros(df_atual).relatorio_colisoes()
+        if not df_colisoes.empty:
+            with st.expander(f"⚠️ {len(df_colisoes)} chave(s) duplicada(s) na base {texto_base}", expanded=False):
+                st.dataframe(df_colisoes, use_container_width=True, hide_index=True)
+
         st.markdown("<br>", unsafe_allow_html=True)
 
         st.markdown("---")
@@ -1416,22 +1791,42 @@ def render(df_ativos, df_desligados):
         
         busca = st.text_input(f"Filtrar tabela", placeholder="Digite nome, cargo ou área...", key=f"busca{key_suffix}")
         
-        df_view = df_atual.copy()
+        df_view = df_atual
         if busca:
-            df_view = df_view[df_view.astype(str).apply(lambda x: x.str.contains(busca, case=False).any(), axis=1)]
+            # Coluna a coluna, sem montar a tabela inteira em texto nem iterar por linha
+            achou = pd.Series(False, index=df_view.index)
+            for col in df_view.columns:
+                achou |= df_view[col].astype(str).str.contains(busca, case=False, regex=False)
+            df_view = df_view[achou]
         
         st.dataframe(df_view, use_container_width=True, hide_index=True, column_config=get_column_config(df_view.columns))
         
     # ----------------------------------------------------
     # ABA ANALYTICS (REESTRUTURADA)
     # ----------------------------------------------------
-    with aba_analytics:
+    with aba_analytics, medir("Analytics"):
         st.markdown("""
             <div style="background-color: #f1f3f5; padding: 12px; border-radius: 6px; border-left: 5px solid #404040; margin-bottom: 20px;">
                 <span style="color: #404040; font-size: 14px;">Utilize as abas abaixo para extrair dados estratégicos, acompanhar indicadores demográficos e realizar auditorias de contratos.</span>
             </div>
         """, unsafe_allow_html=True)
-        # ... aqui seguem as suas sub-abas m, d, e, f
+        # --- PACOTE MENSAL: todos os relatórios num zip, gerado em segundo plano ---
+        hoje_pacote = pd.Timestamp.today().normalize()
+        versao_pacote = f"{versao_dados(df_ativos_proc)}|{versao_dados(df_desligados_proc)}|{hoje_pacote.date()}"
+        pacote_atual = obter_pacote(versao_pacote)
+        c_pac_info, c_pac_btn = st.columns([3, 1])
+        with c_pac_btn:
+            # Só volta a ficar disponível se o pacote desta versão falhou
+            if st.button("📦 Gerar pacote de relatórios", use_container_width=True, disabled=pacote_atual is not None and pacote_atual.falha is None):
+                eventos_pacote = [e for e in obter_indice_eventos(df_ativos).do_mes(hoje_pacote.year, hoje_pacote.month) if e["Tipo"] == EVENTO_ANIVERSARIO]
+                iniciar_pacote(
+                    versao_pacote,
+                    geradores_pacote_mensal(df_ativos_proc, df_desligados_proc, eventos_pacote, hoje_pacote),
+                    f"Relatorios_V4_{hoje_pacote.strftime('%d_%m_%Y')}"
+                )
+        with c_pac_info:
+            painel_pacote_relatorios(versao_pacote)
+
         
         sub_master, sub_demo, sub_estat, sub_finan, sub_oper = st.tabs([
             "Master", 
@@ -1456,21 +1851,27 @@ def render(df_ativos, df_desligados):
                     key="radio_master"
                 )
             
+            # Colunas padrão para visualização rápida na tela
+            cols_master = ["Nome", "E-mail corporativo", "BP", "Modelo de contrato", "Cargo", "Remuneração", "Senioridade", "Área", "CPF"]
+
             # Lógica de unificação/seleção da base
             if status_master == "Ativos":
                 df_m = df_ativos_proc
             elif status_master == "Desligados":
                 df_m = df_desligados_proc
             else:
-                df_m = pd.concat([df_ativos_proc, df_desligados_proc], ignore_index=True)
+                # Só as colunas exibidas entram na concatenação (o Excel monta a base completa à parte)
+                cols_todos = [c for c in cols_master if c in df_ativos_proc.columns or c in df_desligados_proc.columns]
+                df_m = pd.concat([df_ativos_proc.reindex(columns=cols_todos), df_desligados_proc.reindex(columns=cols_todos)], ignore_index=True)
             
             with c_gerar:
                 st.markdown("<br>", unsafe_allow_html=True) # Espaçador para alinhar com o rádio
                 if st.button("📥 Exportar Excel", type="primary", use_container_width=True):
-                    modal_exportar_excel(df_m)
+                    modal_exportar_excel(
+                        {"Ativos": df_ativos_proc, "Desligados": df_desligados_proc, "Todos": pd.concat([df_ativos_proc, df_desligados_proc], ignore_index=True)},
+                        status_master
+                    )
 
-            # Colunas padrão para visualização rápida na tela
-            cols_master = ["Nome", "E-mail corporativo", "BP", "Modelo de contrato", "Cargo", "Remuneração", "Senioridade", "Área", "CPF"]
             cols_view = [c for c in cols_master if c in df_m.columns]
             
             st.dataframe(df_m[cols_view], use_container_width=True, hide_index=True)
@@ -1489,24 +1890,15 @@ def render(df_ativos, df_desligados):
                 mes_selecionado = st.selectbox("Mês", options=list(meses.keys()), format_func=lambda x: meses[x], index=mes_atual - 1)
                 
                 if "Data de nascimento_dt" in df_ativos_proc.columns:
-                    df_aniversario = df_ativos_proc[df_ativos_proc["Data de nascimento_dt"].dt.month == mes_selecionado].copy()
+                    # O índice de eventos já vem ordenado pelo dia, com a idade que a pessoa faz NESTE ano
+                    ano_atual = datetime.today().year
+                    eventos_mes = [e for e in obter_indice_eventos(df_ativos).do_mes(ano_atual, mes_selecionado) if e["Tipo"] == EVENTO_ANIVERSARIO]
+                    df_aniversario = relatorio_aniversariantes(df_ativos_proc, eventos_mes)
                     
                     if df_aniversario.empty:
                         st.info("Nenhum aniversariante neste mês 🎈")
                     else:
-                        # Ordena pelo dia
-                        df_aniversario["Dia_Sort"] = df_aniversario["Data de nascimento_dt"].dt.day
-                        df_aniversario = df_aniversario.sort_values("Dia_Sort")
-                        
-                        # Calcula a idade que a pessoa faz NESTE ano
-                        ano_atual = datetime.today().year
-                        df_aniversario["Idade"] = (ano_atual - df_aniversario["Data de nascimento_dt"].dt.year).astype(str) + " anos"
-                        
-                        # Colunas solicitadas: Nome, Email, Área, Data Nascimento, Idade
-                        cols_niver = ["Nome", "E-mail corporativo", "Área", "Data de nascimento", "Idade"]
-                        cols_final = [c for c in cols_niver if c in df_aniversario.columns]
-                        
-                        st.dataframe(df_aniversario[cols_final], use_container_width=True, hide_index=True)
+                        st.dataframe(df_aniversario, use_container_width=True, hide_index=True)
                 else:
                     st.warning("Coluna de Data de Nascimento não encontrada.")
 
@@ -1525,38 +1917,14 @@ def render(df_ativos, df_desligados):
                     data_ref_input = c_ref.date_input("Data de Referência", value=datetime.today(), format="DD/MM/YYYY")
                     data_ref = pd.Timestamp(data_ref_input).normalize()
                     
-                    # --- LÓGICA CORRIGIDA (DATA DE CORTE) ---
-                    # Em vez de contar dias, calculamos a data limite exata no passado.
-                    # Quem entrou DEPOIS dessa data, não entra no filtro.
-                    data_limite = data_ref - relativedelta(years=min_anos, months=min_meses)
-                    
-                    # Pega apenas quem tem data de início preenchida
-                    df_tempo = df_ativos_proc[df_ativos_proc["Início na V4_dt"].notna()].copy()
-                    
-                    # Filtra quem entrou ANTES ou NO DIA da data limite
-                    df_filtrado = df_tempo[
-                        (df_tempo["Início na V4_dt"] <= data_limite)
-                    ].copy()
-                    
-                    # Ordena pelos mais antigos
-                    df_filtrado = df_filtrado.sort_values("Início na V4_dt", ascending=True)
+                    # Data de corte exata no calendário: quem entrou depois dela não entra
+                    df_filtrado = relatorio_tempo_casa(df_ativos_proc, data_ref, min_anos, min_meses)
                     
                     if df_filtrado.empty:
                         st.info(f"Ninguém com mais de {min_anos} anos e {min_meses} meses completos até {data_ref.strftime('%d/%m/%Y')}.")
                     else:
-                        # Função para texto dinâmico
-                        def texto_tempo_dinamico(inicio):
-                            if pd.isna(inicio) or inicio > data_ref: return "-"
-                            d = relativedelta(data_ref, inicio)
-                            return f"{d.years} anos, {d.months} meses e {d.days} dias"
-
-                        df_filtrado["Tempo de Casa"] = df_filtrado["Início na V4_dt"].apply(texto_tempo_dinamico)
-                        
-                        cols_tempo = ["Nome", "Remuneração", "Início na V4", "Tempo de Casa"]
-                        cols_final = [c for c in cols_tempo if c in df_filtrado.columns]
-                        
                         st.markdown(f"Em **{data_ref.strftime('%d/%m/%Y')}**, temos **{len(df_filtrado)} investidores** com esse tempo mínimo:")
-                        st.dataframe(df_filtrado[cols_final], use_container_width=True, hide_index=True)
+                        st.dataframe(df_filtrado, use_container_width=True, hide_index=True)
                 else:
                     st.warning("Coluna Início na V4 não encontrada.")
 
@@ -1567,17 +1935,49 @@ def render(df_ativos, df_desligados):
             # MOVA PARA CÁ: Bloco de Contratos a vencer e Investidores MEI
             st.markdown("### 📊 Relatórios Estatísticos")
 
-            # Reutilizando a lógica da coluna numérica
-            df_temp_cargo = df_ativos_proc.copy()
-            df_temp_cargo["Rem_Num"] = converter_remuneracao_para_float(df_temp_cargo["Remuneração"])
-
             with st.expander("👔 Estrutura de Cargos e Salários", expanded=False):
-                df_cargo = df_temp_cargo.groupby(["Cargo", "Área", "CBO", "Descrição CBO"]).agg(
-                    Remuneração_Média=("Rem_Num", "mean")
-                ).reset_index()
-                
-                df_cargo["Remuneração_Média"] = df_cargo["Remuneração_Média"].map('R$ {:,.2f}'.format).str.replace(',', 'X').str.replace('.', ',').str.replace('X', '.')
-                st.dataframe(df_cargo, use_container_width=True, hide_index=True)
+                st.dataframe(relatorio_cargos_salarios(df_ativos_proc), use_container_width=True, hide_index=True)
+
+            # --- RETENÇÃO POR COORTE DE ADMISSÃO ---
+            with st.expander("🧬 Retenção por Coorte de Admissão", expanded=False):
+                motor_coorte = obter_motor_headcount(df_ativos_proc, df_desligados_proc)
+                intervalos_coorte = motor_coorte.intervalos
+
+                c_co1, c_co2, c_co3 = st.columns([1, 1.5, 1.5])
+                freq_coorte = c_co1.radio("Coorte por", ["Mês", "Trimestre", "Ano"], horizontal=True, key="coorte_freq")
+                areas_coorte = c_co2.multiselect("Área", sorted(intervalos_coorte["Área"].unique()), key="coorte_area")
+                modelos_coorte = c_co3.multiselect("Modelo de contrato", sorted(intervalos_coorte["Modelo"].unique()), key="coorte_modelo")
+
+                df_coorte = motor_coorte.retencao_coortes(
+                    freq={"Mês": "M", "Trimestre": "Q", "Ano": "Y"}[freq_coorte],
+                    filtros={"Área": areas_coorte, "Modelo": modelos_coorte}
+                )
+
+                if df_coorte.empty:
+                    st.info("Nenhuma admissão encontrada para os filtros selecionados.")
+                else:
+                    df_coorte["Coorte"] = df_coorte["Coorte"].astype(str)
+                    marcos_cols = [f"{m}m" for m in MARCOS_RETENCAO]
+                    df_heat = df_coorte.melt(id_vars=["Coorte", "Admitidos"], value_vars=marcos_cols, var_name="Marco", value_name="Retenção %").dropna()
+
+                    base_heat = alt.Chart(df_heat).encode(
+                        x=alt.X("Marco:N", sort=marcos_cols, title="Tempo de casa"),
+                        y=alt.Y("Coorte:N", sort="descending", title="Coorte de admissão"),
+                    )
+                    heat = base_heat.mark_rect().encode(
+                        color=alt.Color("Retenção %:Q", scale=alt.Scale(domain=[0, 100], range=["#E30613", "#F5F5F5", "#404040"])),
+                        tooltip=["Coorte", "Admitidos", "Marco", alt.Tooltip("Retenção %:Q", format=".1f")]
+                    )
+                    rotulos = base_heat.mark_text(fontSize=11).encode(
+                        text=alt.Text("Retenção %:Q", format=".0f"),
+                        color=alt.condition("datum['Retenção %'] < 35 || datum['Retenção %'] > 75", alt.value("white"), alt.value("black"))
+                    )
+                    st.altair_chart((heat + rotulos).properties(height=max(200, 22 * len(df_coorte))), use_container_width=True)
+                    st.caption("Percentual de cada coorte que seguia na V4 após 3, 6, 12 e 24 meses. Células vazias: a coorte ainda não completou o marco.")
+                    st.dataframe(
+                        df_coorte, use_container_width=True, hide_index=True,
+                        column_config={c: st.column_config.NumberColumn(format="%.1f%%") for c in marcos_cols}
+                    )
 
             # --- RELATÓRIO DE LIDERADOS POR LIDERANÇA ---
             with st.expander("👤 Liderados por Liderança", expanded=False):
@@ -1594,15 +1994,26 @@ def render(df_ativos, df_desligados):
                         lider_sel = st.selectbox("Selecione o Líder para visualizar o time", ["Selecione..."] + lista_lideres, key="sel_lider_report")
                     
                     if lider_sel != "Selecione...":
+                        hierarquia = obter_indice_hierarquia(df_ativos_proc)
+                        incluir_indiretos = st.toggle("Incluir liderados indiretos (toda a estrutura abaixo)", key="tg_lider_indiretos")
+
                         # Filtragem dos liderados
-                        df_liderados = df_ativos_proc[df_ativos_proc[col_lider] == lider_sel].copy()
+                        lider_chave = str(lider_sel).strip()
+                        if incluir_indiretos:
+                            nomes_time = hierarquia.descendentes(lider_chave)
+                        else:
+                            nomes_time = hierarquia.liderados_diretos(lider_chave)
+                        nomes_df = df_ativos_proc["Nome"].astype(str).str.strip()
+                        df_liderados = df_ativos_proc[nomes_df.isin(nomes_time)]
+                        if incluir_indiretos:
+                            df_liderados = df_liderados.assign(Nível=nomes_df[nomes_df.isin(nomes_time)].map(hierarquia.profundidade) - hierarquia.profundidade.get(lider_chave, 0))
                         
                         with c2:
                             st.metric("Total Liderados", f"{len(df_liderados)}")
             
                         # 2. Definição das colunas cadastrais (Sem Remuneração)
                         colunas_exibir = [
-                            'Nome', 'E-mail corporativo', 'Cargo', 
+                            'Nome', 'Nível', 'E-mail corporativo', 'Cargo', 'Liderança direta', 
                             'Modelo de contrato', 'CC', 'Descrição CC', 
                             'Área', 'Senioridade'
                         ]
@@ -1630,22 +2041,12 @@ def render(df_ativos, df_desligados):
                 d_fim = c2.date_input("Data final", value=datetime.today().date() + relativedelta(months=3), format="DD/MM/YYYY")
                 
                 if "Térm previsto_dt" in df_ativos_proc.columns:
-                    ini_ts = pd.Timestamp(d_ini)
-                    fim_ts = pd.Timestamp(d_fim)
-                    
-                    df_venc = df_ativos_proc[
-                        (df_ativos_proc["Térm previsto_dt"].notna()) & 
-                        (df_ativos_proc["Térm previsto_dt"] >= ini_ts) & 
-                        (df_ativos_proc["Térm previsto_dt"] <= fim_ts)
-                    ].sort_values("Térm previsto_dt")
+                    df_venc = relatorio_contratos_a_vencer(df_ativos_proc, d_ini, d_fim)
                     
                     if df_venc.empty:
                         st.info("Nenhum contrato vencendo no período selecionado ⏳")
                     else:
-                        # Colunas solicitadas: Nome, Cargo, Modelo, Término, Email, Liderança
-                        cols_venc = ["Nome", "Cargo", "Modelo de contrato", "Térm previsto", "E-mail corporativo", "Liderança direta"]
-                        cols_final = [c for c in cols_venc if c in df_venc.columns]
-                        st.dataframe(df_venc[cols_final], use_container_width=True, hide_index=True)
+                        st.dataframe(df_venc, use_container_width=True, hide_index=True)
                 else:
                     st.warning("Coluna de Término Previsto não encontrada.")
                     
@@ -1654,15 +2055,12 @@ def render(df_ativos, df_desligados):
             # ==========================================
             with st.expander("💼 Investidores MEI", expanded=False):
                 if "Modalidade PJ" in df_ativos_proc.columns:
-                    df_mei = df_ativos_proc[df_ativos_proc["Modalidade PJ"].astype(str).str.upper().str.contains("MEI", na=False)]
+                    df_mei = relatorio_mei(df_ativos_proc)
                     if df_mei.empty:
                         st.info("Nenhum investidor MEI encontrado.")
                     else:
                         st.warning(f"⚠️ Temos **{len(df_mei)} investidores MEI**.")
-                        # Colunas solicitadas: Nome, Email, Cargo, Modalidade
-                        cols_mei = ["Nome", "E-mail corporativo", "Cargo", "Modalidade PJ"]
-                        cols_final = [c for c in cols_mei if c in df_mei.columns]
-                        st.dataframe(df_mei[cols_final], use_container_width=True, hide_index=True)
+                        st.dataframe(df_mei, use_container_width=True, hide_index=True)
                 else:
                     st.warning("Coluna Modalidade PJ não encontrada.")
 
@@ -1671,17 +2069,17 @@ def render(df_ativos, df_desligados):
         with sub_finan:
             st.markdown("### 💰 Relatórios Financeiros")
             
-            # Preparando os dados numéricos para os cálculos
-            df_temp = df_ativos_proc.copy()
-            df_temp["Rem_Num"] = converter_remuneracao_para_float(df_temp["Remuneração"])
+            # A remuneração já vem em centavos da carga (Remuneração_cent)
+            df_temp = df_ativos_proc
+
+            falhas_rem = falhas_remuneracao(df_temp)
+            if falhas_rem.any():
+                with st.expander(f"⚠️ {int(falhas_rem.sum())} remuneração(ões) não reconhecida(s) — fora dos totais", expanded=False):
+                    st.dataframe(df_temp.loc[falhas_rem, ["Nome", "BP", "Remuneração"]], use_container_width=True, hide_index=True)
 
             with st.expander("🏢 Visão por Centro de Custo", expanded=False):
                 # 1. Lógica do Alerta (Interno ao Expander)
-                def is_vazio(valor):
-                    v = str(valor).strip().lower()
-                    return v in ["", "nan", "none", "nat"]
-
-                sem_cc = df_temp[df_temp["Código CC"].apply(is_vazio) | df_temp["Descrição CC"].apply(is_vazio)]
+                sem_cc = df_temp[_sem_cc(df_temp)]
                 qtd_sem_cc = len(sem_cc)
 
                 if qtd_sem_cc > 0:
@@ -1690,42 +2088,134 @@ def render(df_ativos, df_desligados):
                         st.dataframe(sem_cc[["Nome", "BP", "E-mail corporativo", "Unidade/Atuação"]], use_container_width=True, hide_index=True)
                     st.markdown("---") # Linha separadora entre o alerta e o relatório
 
-                # 2. O Relatório propriamente dito
-                # Filtramos para mostrar no relatório apenas quem TEM Centro de Custo
-                df_cc_valido = df_temp[~(df_temp["Código CC"].apply(is_vazio) | df_temp["Descrição CC"].apply(is_vazio))]
-                
-                df_cc = df_cc_valido.groupby(["Código CC", "Descrição CC", "Área"]).agg(
-                    Qtd_Investidores=("Nome", "count"),
-                    Total_Remuneracao=("Rem_Num", "sum")
-                ).reset_index()
-                
-                # Formatação Moeda BRL
-                df_cc["Total_Remuneracao"] = df_cc["Total_Remuneracao"].map('R$ {:,.2f}'.format).str.replace(',', 'X').str.replace('.', ',').str.replace('X', '.')
-                
-                st.dataframe(df_cc, use_container_width=True, hide_index=True)
+                # 2. O Relatório propriamente dito (apenas quem TEM Centro de Custo)
+                st.dataframe(relatorio_centro_custo(df_temp), use_container_width=True, hide_index=True)
 
             with st.expander("📄 Visão por Modelo de Contrato", expanded=False):
-                df_mod = df_temp.groupby("Modelo de contrato").agg(
-                    Qtd_Investidores=("Nome", "count"),
-                    Total_Remuneracao=("Rem_Num", "sum")
-                ).reset_index()
-                
-                df_mod["Total_Remuneracao"] = df_mod["Total_Remuneracao"].map('R$ {:,.2f}'.format).str.replace(',', 'X').str.replace('.', ',').str.replace('X', '.')
-                st.dataframe(df_mod, use_container_width=True, hide_index=True)
+                st.dataframe(relatorio_modelo_contrato(df_temp), use_container_width=True, hide_index=True)
                 
+            with st.expander("📈 Projeção de Folha (12 meses)", expanded=False):
+                df_vagas = buscar_base_vagas()
+                if df_vagas is None:
+                    st.caption("ℹ️ Base de vagas indisponível: a projeção considera apenas os investidores atuais.")
+                projecao = obter_projecao_folha(df_ativos_proc, df_vagas)
+                rotulos_meses = [m.strftime("%m/%Y") for m in projecao.meses]
+
+                c_p1, c_p2, c_p3, c_p4 = st.columns(4)
+                reajuste = c_p1.number_input("Reajuste (%)", min_value=-50.0, max_value=100.0, value=0.0, step=0.5, key="proj_reajuste")
+                mes_reajuste = c_p2.selectbox("A partir de", range(len(rotulos_meses)), format_func=lambda i: rotulos_meses[i], key="proj_mes_reajuste")
+                encargos = c_p3.number_input("Encargos CLT (%)", min_value=0.0, max_value=200.0, value=ENCARGOS_CLT * 100, step=1.0, key="proj_encargos")
+                dim_proj = c_p4.radio("Agrupar por", ["Código CC", "Área"], horizontal=True, key="proj_dim")
+
+                c_p5, c_p6 = st.columns(2)
+                incluir_vagas = c_p5.checkbox("Incluir vagas abertas", value=True, key="proj_vagas", disabled=not projecao.vaga.any())
+                considerar_termino = c_p6.checkbox("Encerrar contratos no Térm previsto", value=True, key="proj_termino",
+                                                   help=f"{int(projecao.com_termino.sum())} contrato(s) com término previsto.")
+
+                cenario = dict(reajuste_pct=reajuste, mes_reajuste=mes_reajuste, encargos_clt=encargos / 100,
+                               incluir_vagas=incluir_vagas, considerar_termino=considerar_termino)
+                df_serie = projecao.serie_mensal(**cenario)
+                total_proj = df_serie[["Investidores", "Vagas abertas"]].to_numpy().sum()
+
+                c_k1, c_k2, c_k3 = st.columns(3)
+                c_k1.metric("Custo no 1º mês", formatar_brl([df_serie.iloc[0, 1:].sum()])[0])
+                c_k2.metric("Custo no 12º mês", formatar_brl([df_serie.iloc[-1, 1:].sum()])[0])
+                c_k3.metric("Total projetado", formatar_brl([total_proj])[0])
+
+                df_serie_long = df_serie.melt(id_vars="Mês", var_name="Origem", value_name="Custo")
+                chart_proj = alt.Chart(df_serie_long).mark_bar().encode(
+                    x=alt.X("yearmonth(Mês):O", title="Mês"), y=alt.Y("Custo:Q", title="Custo (R$)", stack=True),
+                    color=alt.Color("Origem:N", scale=alt.Scale(range=["#404040", "#E30613"])),
+                    tooltip=[alt.Tooltip("Mês:T", format="%m/%Y"), "Origem", alt.Tooltip("Custo:Q", format=",.2f")]
+                )
+                st.altair_chart(chart_proj, use_container_width=True)
+
+                df_proj = projecao.por_dimensao(dim_proj, **cenario)
+                df_proj["Total 12 meses"] = df_proj.sum(axis=1)
+                st.dataframe(df_proj.apply(formatar_brl).reset_index(), use_container_width=True, hide_index=True)
+
         # --- SUB-ABA: OPERACIONAL ---
         with sub_oper:
             st.markdown("### 🔨 Relatórios Operacionais")
-            st.markdown("""
-                <div style="padding: 20px; border-radius: 5px; border: 1px solid #dcdfe6; background-color: #f8f9fa; color: #606266; text-align: center;">
-                    ⚙️ Esta seção está sendo preparada e será configurada futuramente. Serão incluídos relatórios operacionais do dia a dia que devem ser configurados na parte de alertas da Landing page, como investidores que estão cumprindo aviso, ex-investidores para receber distrato no dia 15, entre outros.
-                </div>
-            """, unsafe_allow_html=True)
+
+            with st.expander("🚨 Central de Alertas", expanded=True):
+                df_alertas = central_alertas(df_ativos)
+                if df_alertas.empty:
+                    st.success("Nenhum alerta para os investidores ativos hoje ✅")
+                else:
+                    c_k1, c_k2, c_k3, c_k4 = st.columns(4)
+                    contagem = df_alertas["Tipo"].value_counts()
+                    c_k1.metric("🚨 Críticos", int(contagem.get("error", 0)))
+                    c_k2.metric("⚠️ Atenção", int(contagem.get("warning", 0)))
+                    c_k3.metric("ℹ️ Informativos", int(contagem.get("info", 0)))
+                    c_k4.metric("🎉 Hoje", int(contagem.get("success", 0)))
+
+                    c_f1, c_f2, c_f3 = st.columns([1, 1, 1.5])
+                    sel_cat = c_f1.multiselect("Categoria", sorted(df_alertas["Categoria"].unique()), key="alerta_cat")
+                    sel_tipo = c_f2.multiselect("Gravidade", list(ICONES_ALERTA), format_func=lambda t: ICONES_ALERTA[t], key="alerta_tipo")
+                    busca_alerta = c_f3.text_input("Buscar investidor", key="alerta_busca")
+
+                    filtro = pd.Series(True, index=df_alertas.index)
+                    if sel_cat: filtro &= df_alertas["Categoria"].isin(sel_cat)
+                    if sel_tipo: filtro &= df_alertas["Tipo"].isin(sel_tipo)
+                    if busca_alerta: filtro &= df_alertas["Nome"].astype(str).str.contains(busca_alerta, case=False, regex=False)
+
+                    df_lista = df_alertas[filtro].assign(Gravidade=df_alertas["Tipo"].map(ICONES_ALERTA))
+                    st.dataframe(
+                        df_lista[["Gravidade", "Nome", "Categoria", "Alerta", "Data", "Dias", "E-mail corporativo", "Situação no plano"]],
+                        use_container_width=True, hide_index=True,
+                        column_config={"Data": st.column_config.DateColumn(format="DD/MM/YYYY")}
+                    )
+
+            with st.expander("🧲 Pipeline de Vagas", expanded=False):
+                df_vagas = buscar_base_vagas()
+                if df_vagas is None or df_vagas.empty:
+                    st.info("ℹ️ Base de vagas indisponível no momento.")
+                else:
+                    pipeline = obter_pipeline_vagas(df_vagas, df_ativos_proc, df_desligados_proc)
+                    situacoes = pipeline.vagas["Situação"].value_counts()
+                    tempos = pipeline.tempo_para_preencher()["Dias para preencher"]
+
+                    c_v1, c_v2, c_v3, c_v4 = st.columns(4)
+                    c_v1.metric("🟢 Abertas", int(situacoes.get("Aberta", 0)))
+                    c_v2.metric("✅ Preenchidas", int(situacoes.get("Preenchida", 0)))
+                    c_v3.metric("⏱️ Mediana para preencher", f"{tempos.median():.0f} dias" if len(tempos) else "-")
+                    c_v4.metric("👻 IDs órfãos", len(pipeline.orfaos))
+
+                    dim_vagas = st.radio("Agrupar por", ["Área", "Código CC"], horizontal=True, key="vagas_dim")
+                    st.dataframe(pipeline.resumo(dim_vagas).reset_index(), use_container_width=True, hide_index=True,
+                                 column_config={c: st.column_config.NumberColumn(format="%.0f") for c in ["Mediana (dias)", "Média (dias)"]})
+
+                    if len(tempos):
+                        chart_ttf = alt.Chart(pipeline.tempo_para_preencher()).mark_bar(color="#E30613").encode(
+                            x=alt.X("Dias para preencher:Q", bin=alt.Bin(maxbins=20), title="Dias para preencher"),
+                            y=alt.Y("count():Q", title="Vagas"),
+                        )
+                        st.altair_chart(chart_ttf, use_container_width=True)
+
+                    situacao_sel = st.multiselect("Situação", ["Aberta", "Preenchida", "Cancelada"], default=["Aberta"], key="vagas_situacao")
+                    st.dataframe(
+                        pipeline.vagas[pipeline.vagas["Situação"].isin(situacao_sel)][["ID", "Cargo", "Status", "Área", "Código CC", "Abertura", "Investidor", "Admissão", "Dias para preencher"]],
+                        use_container_width=True, hide_index=True,
+                        column_config={"Abertura": st.column_config.DateColumn(format="DD/MM/YYYY"), "Admissão": st.column_config.DateColumn(format="DD/MM/YYYY")}
+                    )
+
+                    if len(pipeline.orfaos):
+                        st.warning(f"⚠️ {len(pipeline.orfaos)} investidor(es) com ID Vaga que não existe na base de vagas.")
+                        st.dataframe(pipeline.orfaos, use_container_width=True, hide_index=True,
+                                     column_config={"Admissão": st.column_config.DateColumn(format="DD/MM/YYYY")})
+                    if len(pipeline.datas_invertidas):
+                        st.warning(f"⚠️ {len(pipeline.datas_invertidas)} vaga(s) com admissão anterior à abertura (fora do tempo para preencher).")
+                        st.dataframe(pipeline.datas_invertidas, use_container_width=True, hide_index=True,
+                                     column_config={c: st.column_config.DateColumn(format="DD/MM/YYYY") for c in ["Abertura", "Admissão"]})
+                    if len(pipeline.duplicados):
+                        if st.checkbox(f"🔁 Mostrar {pipeline.duplicados['ID'].nunique()} ID(s) de vaga usados por mais de um investidor", key="vagas_dup"):
+                            st.dataframe(pipeline.duplicados, use_container_width=True, hide_index=True)
 
     # ----------------------------------------------------
     # ABA AÇÕES
     # ----------------------------------------------------
-    with aba_acoes:
+    with aba_acoes, medir("Ações"):
         st.markdown("""
             <div style="background-color: #f1f3f5; padding: 12px; border-radius: 6px; border-left: 5px solid #404040; margin-bottom: 20px;">
                 <span style="color: #404040; font-size: 14px;">Realize cadastros, gere formulários e rascunhos de e-mail pré-preenchidos.</span>
@@ -1756,6 +2246,10 @@ def render(df_ativos, df_desligados):
                 if st.button("📄 Aviso Prévio", use_container_width=True, type="primary"): 
                     modal_aviso_previo_indenizado(df_ativos_proc)
 
+            with st.expander("🗂️ Em lote", expanded=False):
+                if st.button("🗂️ Documentos em Lote", use_container_width=True, type="primary"):
+                    modal_documentos_em_lote({"Ativos": df_ativos_proc, "Desligados": df_desligados_proc})
+
         with c_mail:
             st.markdown("##### ✉️ E-mail / Mensagens")
             with st.expander("📩 Rascunhos Admissão", expanded=False):
@@ -1773,11 +2267,13 @@ def render(df_ativos, df_desligados):
             with st.expander("🛠️ Ferramentas", expanded=False):
                 if st.button("📝 Título Doc (Automação)", use_container_width=True, type="primary"): 
                     modal_titulo_doc(df_ativos_proc)
+                if st.button("📮 Validar CEPs da base", use_container_width=True, type="primary"):
+                    modal_validar_ceps(df_ativos_proc)
 
     # ----------------------------------------------------
     # ABA CONECTIVIDADE
     # ----------------------------------------------------
-    with aba_conectividade:
+    with aba_conectividade, medir("Conectividade"):
         st.markdown("""
             <div style="background-color: #f1f3f5; padding: 12px; border-radius: 6px; border-left: 5px solid #404040; margin-bottom: 20px;">
                 <span style="color: #404040; font-size: 14px;">Acesso rápido aos sistemas e ferramentas da rede V4 Company.</span>
@@ -1824,3 +2320,5 @@ def render(df_ativos, df_desligados):
             st.link_button("Materiais V4", "https://drive.google.com/drive/folders/0AKHVpFRDdfGeUk9PVA", use_container_width=True)
             st.link_button("Job Description", "https://v4-company.notion.site/Descri-o-de-Cargos-e-OKRs-1d1f09cb6f9080d6ae8ce07e4b687caf", use_container_width=True)
             st.link_button("Base de conhecimento", "https://v4-company.notion.site/da9e55aee7304761afd5b479d71a53cf?v=0c9c758af9004838b5aa41a581dd8346", use_container_width=True)
+
+    painel_medicoes()
@@ -0,0 +1,449 @@
+import copy
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import threading
+import time
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date
+from io import BytesIO
+from xml.sax.saxutils import escape
+
+import pandas as pd
+import streamlit as st
+from lxml import etree
+
+from conversor_pdf import documentos_para_pdf, docx_para_pdf
+
+# ==========================================
+# FORMATAÇÕES USADAS NOS DOCUMENTOS
+# ==========================================
+MESES_PT = {
+    1: "janeiro", 2: "fevereiro", 3: "março", 4: "abril",
+    5: "maio", 6: "junho", 7: "julho", 8: "agosto",
+    9: "setembro", 10: "outubro", 11: "novembro", 12: "dezembro"
+}
+
+def formatar_cnpj(valor):
+    if pd.isna(valor) or valor == "":
+        return ""
+    v = str(valor).replace(".0", "").replace(".", "").replace("-", "").replace("/", "").strip()
+    v = v.zfill(14)
+    if len(v) == 14:
+        return f"{v[:2]}.{v[2:5]}.{v[5:8]}/{v[8:12]}-{v[12:]}"
+    return v
+
+def normalizar_cpf(valor):
+    if pd.isna(valor) or valor == "":
+        return ""
+    v = str(valor).replace(".0", "").replace(".", "").replace("-", "").replace("/", "").strip()
+    return re.sub(r"\D", "", v).zfill(11)
+
+def email_para_nome_arquivo(email):
+    if not email:
+        return ""
+    return str(email).replace("@", "_").replace(".", "_").lower()
+
+def data_por_extenso(d):
+    return f"{d.day} de {MESES_PT[d.month]} de {d.year}"
+
+def nome_arquivo_padrao(linha, tipo):
+    """Convenção do Drive: "Nome __ CPF __ email __ Tipo.docx"."""
+    cpf = re.sub(r"\D", "", normalizar_cpf(linha.get("CPF", "")))
+    email = email_para_nome_arquivo(linha.get("E-mail pessoal", ""))
+    return f"{linha.get('Nome', '')} __ {cpf} __ {email} __ {tipo}.docx"
+
+# ==========================================
+# MODELOS DOCX PRÉ-COMPILADOS
+# ==========================================
+# Marcadores aceitos nos modelos: {chave} e {{chave}} (inclusive quebrados em vários runs pelo Word)
+PADRAO_MARCADOR = re.compile(r"\{\{\w+\}\}|\{\w+\}")
+PARTES_COM_TEXTO = re.compile(r"word/(document|header\d*|footer\d*|footnotes|endnotes)\.xml$")
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+XML_SPACE = "{http://www.w3.org/XML/1998/namespace}space"
+_SENTINELA = "␞{}␞"
+_PADRAO_SENTINELA = re.compile("␞(\\d+)␞")
+
+def _textos_do_paragrafo(p):
+    # Só os w:t do próprio parágrafo (caixas de texto aninhadas são tratadas à parte)
+    return [t for t in p.iter(f"{W}t") if next(t.iterancestors(f"{W}p"), None) is p]
+
+def _marcar_paragrafo(p, marcadores):
+    """Junta cada marcador (mesmo quebrado entre runs) no primeiro run e troca por uma sentinela."""
+    textos = _textos_do_paragrafo(p)
+    if not textos:
+        return
+    conteudos = [t.text or "" for t in textos]
+    completo = "".join(conteudos)
+    achados = list(PADRAO_MARCADOR.finditer(completo))
+    if not achados:
+        return
+
+    limites, pos = [], 0
+    for c in conteudos:
+        limites.append((pos, pos + len(c)))
+        pos += len(c)
+
+    def localizar(offset, fim=False):
+        # Início: run que contém o caractere; fim: run que contém o último caractere
+        for i, (ini, fim_run) in enumerate(limites):
+            if (ini < offset <= fim_run) if fim else (ini <= offset < fim_run):
+                return i, offset - ini
+
+    # Da direita para a esquerda, os offsets ainda não processados continuam válidos
+    for achado in reversed(achados):
+        i, a = localizar(achado.start())
+        j, b = localizar(achado.end(), fim=True)
+        if achado.group() not in marcadores:
+            marcadores.append(achado.group())
+        sentinela = _SENTINELA.format(marcadores.index(achado.group()))
+        if i == j:
+            conteudos[i] = conteudos[i][:a] + sentinela + conteudos[i][b:]
+        else:
+            conteudos[i] = conteudos[i][:a] + sentinela
+            for k in range(i + 1, j):
+                conteudos[k] = ""
+            conteudos[j] = conteudos[j][b:]
+
+    for t, c in zip(textos, conteudos):
+        if c != (t.text or ""):
+            t.text = c
+            t.set(XML_SPACE, "preserve")
+
+class ModeloDocx:
+    """Modelo lido uma única vez: cada parte com texto vira uma lista de trechos fixos e marcadores.
+
+    Renderizar é só juntar os trechos com os valores (escapados) e acrescentar
+    essas partes a um zip-base já comprimido com o resto do modelo (estilos,
+    imagens, fontes embutidas), sem abrir o Word de novo nem percorrer
+    runs × chaves.
+    """
+
+    def __init__(self, conteudo):
+        self.hash = hashlib.sha1(conteudo).hexdigest()
+        self.marcadores = []
+        self._partes = []  # (ZipInfo, lista de trechos) das partes com marcadores
+        base = BytesIO()
+        with zipfile.ZipFile(BytesIO(conteudo)) as origem, zipfile.ZipFile(base, "w", compression=zipfile.ZIP_DEFLATED) as destino:
+            for info in origem.infolist():
+                dados = origem.read(info)
+                if PARTES_COM_TEXTO.match(info.filename):
+                    dados = self._compilar_parte(dados)
+                if isinstance(dados, list):
+                    self._partes.append((info, dados))
+                else:
+                    destino.writestr(info, dados)
+        self._base = base.getvalue()
+
+    def _compilar_parte(self, xml):
+        raiz = etree.fromstring(xml)
+        usados = []
+        for p in raiz.iter(f"{W}p"):
+            _marcar_paragrafo(p, usados)
+        if not usados:
+            return xml
+        for m in usados:
+            if m not in self.marcadores:
+                self.marcadores.append(m)
+        texto = etree.tostring(raiz, xml_declaration=True, encoding="UTF-8", standalone=True).decode("utf-8")
+        # Sentinelas locais da parte -> índices globais de marcador
+        partes = _PADRAO_SENTINELA.split(texto)
+        return [self.marcadores.index(usados[int(parte)]) if n % 2 else parte for n, parte in enumerate(partes)]
+
+    def renderizar(self, mapa):
+        """Bytes do .docx preenchido. Marcadores sem valor no mapa ficam como estão."""
+        valores = [escape("" if mapa[m] is None else str(mapa[m])) if m in mapa else escape(m) for m in self.marcadores]
+        saida = BytesIO(self._base)
+        with zipfile.ZipFile(saida, "a") as zf:
+            for info, trechos in self._partes:
+                # writestr grava CRC, tamanhos e offset no ZipInfo: cada render usa o seu,
+                # senão threads renderizando o mesmo modelo trocam os cabeçalhos entre si
+                zf.writestr(copy.copy(info), "".join(valores[t] if isinstance(t, int) else t for t in trechos).encode("utf-8"))
+        return saida.getvalue()
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def _modelo_compilado(caminho, mtime):
+    with open(caminho, "rb") as f:
+        return ModeloDocx(f.read())
+
+def obter_modelo(caminho):
+    """Modelo compilado, relido só quando o arquivo muda no disco."""
+    return _modelo_compilado(caminho, os.path.getmtime(caminho))
+
+# ==========================================
+# CACHE DE ARTEFATOS (MEMÓRIA, LRU POR TAMANHO)
+# ==========================================
+LIMITE_CACHE_ARTEFATOS = 64 * 1024 * 1024  # bytes
+
+class CacheArtefatos:
+    """Documentos prontos endereçados pelo conteúdo: (hash do modelo, mapa de substituição).
+
+    Nada vai para o disco; cada sessão recebe os próprios bytes, então dois
+    usuários gerando o mesmo documento não disputam arquivo. Quando o total
+    passa do limite, saem os menos usados recentemente.
+    """
+
+    def __init__(self, limite_bytes=LIMITE_CACHE_ARTEFATOS):
+        self.limite_bytes = limite_bytes
+        self.tamanho = 0
+        self.acertos = 0
+        self.faltas = 0
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def chave(hash_modelo, mapa):
+        conteudo = json.dumps({str(k): "" if v is None else str(v) for k, v in mapa.items()}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(f"{hash_modelo}\0{conteudo}".encode("utf-8")).hexdigest()
+
+    def obter(self, chave, gerar):
+        with self._lock:
+            dados = self._itens.get(chave)
+            if dados is not None:
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                return dados
+            self.faltas += 1
+        dados = gerar()
+        with self._lock:
+            if chave not in self._itens and len(dados) <= self.limite_bytes:
+                self._itens[chave] = dados
+                self.tamanho += len(dados)
+                while self.tamanho > self.limite_bytes:
+                    _, antigo = self._itens.popitem(last=False)
+                    self.tamanho -= len(antigo)
+        return dados
+
+@st.cache_resource(show_spinner=False)
+def cache_artefatos():
+    return CacheArtefatos()
+
+def gerar_docx_com_substituicoes(caminho, mapa):
+    """Bytes do documento preenchido (reaproveitados se o mesmo modelo + mapa já foi gerado)."""
+    modelo = obter_modelo(caminho)
+    return cache_artefatos().obter(CacheArtefatos.chave(modelo.hash, mapa), lambda: modelo.renderizar(mapa))
+
+# ==========================================
+# GERAÇÃO EM LOTE (POOL DE PROCESSOS)
+# ==========================================
+WORKERS_DOCUMENTOS = max(1, min(4, os.cpu_count() or 1))
+LOTE_MINIMO_POOL = 200  # abaixo disso, mandar os bytes entre processos custa mais do que renderizar
+
+def _mapa_subfatura(linha, p):
+    return {"{RAZAO_SOCIAL}": str(linha.get("Razão social", "")), "{CNPJ}": formatar_cnpj(linha.get("CNPJ", "")),
+            "{VIGENCIA}": p["data_vigencia"].strftime("%d/%m/%Y"), "{DATA}": data_por_extenso(date.today())}
+
+def _mapa_termo_pj(linha, p):
+    return {"{RAZAO_SOCIAL}": str(linha.get("Razão social", "")), "{CNPJ}": formatar_cnpj(linha.get("CNPJ", "")), "{DATA}": data_por_extenso(date.today())}
+
+def _mapa_exclusao(linha, p):
+    return {"{{razao_social}}": str(linha.get("Razão social", "")).upper(), "{{cnpj}}": formatar_cnpj(linha.get("CNPJ", "")),
+            "{{data_exclusao}}": p["data_exclusao"].strftime("%d/%m/%Y"), "{{data}}": data_por_extenso(date.today())}
+
+def _mapa_nao_vt(linha, p):
+    # Endereço completo não existe na base: só CEP vem preenchido
+    return {"{nome}": linha.get("Nome", ""), "{cpf}": linha.get("CPF", ""), "{cep}": linha.get("CEP", ""), "{endereço}": "",
+            "{número}": "", "{bairro}": "", "{cidade}": "", "{uf_estado}": "", "{data}": data_por_extenso(date.today())}
+
+def _mapa_comum(linha, p):
+    return {"{nome_completo}": linha.get("Nome", ""), "{cargo}": linha.get("Cargo", ""), "{data}": p["data_desligamento"].strftime("%d/%m/%Y")}
+
+def _mapa_aviso(linha, p):
+    return {"{nome_selecionado}": linha.get("Nome", ""), "{data_desligamento}": p["data_desligamento"].strftime("%d/%m/%Y"),
+            "{data_homologacao}": p["data_homologacao"].strftime("%d/%m/%Y")}
+
+# tipo -> (modelo, base de origem, parâmetros pedidos na tela, montador do mapa)
+TIPOS_DOCUMENTO = {
+    "Inclusão Subfatura": ("Subfatura.docx", "Ativos", ["data_vigencia"], _mapa_subfatura),
+    "Termo Subestipulante": ("Termo de integração de subestipulante.docx", "Ativos", [], _mapa_termo_pj),
+    "Termo de Não Adesão": ("Termo de não adesão - Plano de Saúde e Dental.docx", "Ativos", [], _mapa_termo_pj),
+    "Exclusão Subfatura": ("Exclusão Subfatura.docx", "Desligados", ["data_exclusao"], _mapa_exclusao),
+    "Não adesão ao VT": ("declaracao_nao_vale_transporte_clt.docx", "Ativos", [], _mapa_nao_vt),
+    "Demissão Comum Acordo": ("Demissão por comum acordo.docx", "Ativos", ["data_desligamento"], _mapa_comum),
+    "Aviso Prévio Indenizado": ("Aviso prévio Indenizado.docx", "Ativos", ["data_desligamento", "data_homologacao"], _mapa_aviso),
+}
+ROTULOS_PARAMETRO = {
+    "data_vigencia": "Data de início da vigência",
+    "data_exclusao": "Data de exclusão",
+    "data_desligamento": "Data do desligamento",
+    "data_homologacao": "Data homologação",
+}
+
+_MODELOS_DO_PROCESSO = {}
+
+def _renderizar_bloco(caminho, mtime, mapas):
+    # Roda dentro do worker: cada processo compila o modelo uma vez e reaproveita
+    modelo = _MODELOS_DO_PROCESSO.get((caminho, mtime))
+    if modelo is None:
+        with open(caminho, "rb") as f:
+            modelo = _MODELOS_DO_PROCESSO[(caminho, mtime)] = ModeloDocx(f.read())
+    return [modelo.renderizar(m) for m in mapas]
+
+@st.cache_resource(show_spinner=False)
+def _pool_documentos():
+    # "spawn": os workers não herdam as threads do servidor do Streamlit
+    return ProcessPoolExecutor(max_workers=WORKERS_DOCUMENTOS, mp_context=multiprocessing.get_context("spawn"))
+
+def _nomes_unicos(nomes):
+    vistos = {}
+    unicos = []
+    for nome in nomes:
+        n = vistos.get(nome, 0)
+        vistos[nome] = n + 1
+        unicos.append(nome if n == 0 else nome.replace(".docx", f" ({n + 1}).docx"))
+    return unicos
+
+def gerar_lote(tipo, linhas, parametros, incluir_pdf=False):
+    """Renderiza um documento por linha e devolve (zip, estatísticas).
+
+    Com `incluir_pdf`, o zip leva também um PDF único com todos os documentos.
+    """
+    modelo, _, _, montar_mapa = TIPOS_DOCUMENTO[tipo]
+    inicio = time.perf_counter()
+    mapas = [montar_mapa(linha, parametros) for linha in linhas]
+    nomes = _nomes_unicos([nome_arquivo_padrao(linha, tipo) for linha in linhas])
+    mtime = os.path.getmtime(modelo)
+
+    workers = 1
+    if len(mapas) >= LOTE_MINIMO_POOL and WORKERS_DOCUMENTOS > 1:
+        tamanho = -(-len(mapas) // WORKERS_DOCUMENTOS)
+        blocos = [mapas[i:i + tamanho] for i in range(0, len(mapas), tamanho)]
+        try:
+            resultados = _pool_documentos().map(_renderizar_bloco, [modelo] * len(blocos), [mtime] * len(blocos), blocos)
+            documentos = [doc for bloco in resultados for doc in bloco]
+            workers = len(blocos)
+        except BrokenProcessPool:
+            _pool_documentos.clear()
+            documentos = [obter_modelo(modelo).renderizar(m) for m in mapas]
+    else:
+        documentos = [obter_modelo(modelo).renderizar(m) for m in mapas]
+
+    buffer = BytesIO()
+    # Os .docx já são zips comprimidos: guardar sem recomprimir
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED) as zf:
+        for nome, dados in zip(nomes, documentos):
+            zf.writestr(nome, dados)
+        if incluir_pdf and documentos:
+            zf.writestr(f"{tipo}.pdf", pdf_combinado(documentos))
+
+    segundos = time.perf_counter() - inicio
+    estatisticas = {
+        "documentos": len(documentos),
+        "segundos": segundos,
+        "por_segundo": len(documentos) / segundos if segundos else 0.0,
+        "workers": workers,
+        "megabytes": buffer.tell() / 1_048_576,
+    }
+    return buffer.getvalue(), estatisticas
+
+# ==========================================
+# CONVERSÃO PARA PDF (LOCAL)
+# ==========================================
+def _fora_do_servidor(funcao, *args):
+    # O reportlab segura o GIL: converter num worker mantém as outras sessões respondendo
+    try:
+        return _pool_documentos().submit(funcao, *args).result()
+    except BrokenProcessPool:
+        _pool_documentos.clear()
+        return funcao(*args)
+
+def converter_pdf(docx_bytes):
+    """PDF do documento, gerado localmente e guardado no cache de artefatos."""
+    chave = hashlib.sha256(b"pdf\0" + docx_bytes).hexdigest()
+    return cache_artefatos().obter(chave, lambda: _fora_do_servidor(docx_para_pdf, docx_bytes))
+
+def pdf_combinado(lista_docx):
+    """Um PDF só com todos os documentos, cada um começando em página nova."""
+    return _fora_do_servidor(documentos_para_pdf, list(lista_docx))
+
+# ==========================================
+# BOTÕES DE DOWNLOAD (DOCX + PDF)
+# ==========================================
+MIME_DOCX = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+def botoes_documento(alvo, dados_docx, nome_arquivo, chave, rotulo="⬇️ Download", tipo="secondary"):
+    """Downloads do .docx e do PDF no container `alvo` (st ou uma coluna).
+
+    O .docx baixa sem rerun. O PDF é gerado no clique, fora do script; o rerun
+    que vem depois confere a conversão (já em cache se deu certo) e, se ela
+    falhou, mostra o erro no próprio diálogo.
+    """
+    alvo.download_button(rotulo, dados_docx, file_name=nome_arquivo, mime=MIME_DOCX, use_container_width=True,
+                         type=tipo, on_click="ignore", key=f"{chave}_docx")
+    nome_pdf = os.path.splitext(nome_arquivo)[0] + ".pdf"
+    if alvo.download_button("📕 Baixar PDF", lambda: converter_pdf(dados_docx), file_name=nome_pdf, mime="application/pdf",
+                            use_container_width=True, key=f"{chave}_pdf"):
+        try:
+            converter_pdf(dados_docx)
+        except Exception as e:
+            alvo.error(f"❌ Não foi possível gerar o PDF: {e}")
+
+def guardar_documento(chave, selecao, nome_arquivo, dados_docx):
+    """Guarda o documento gerado por um botão "Gerar", para os downloads sobreviverem aos reruns."""
+    st.session_state[f"_documento_{chave}"] = (selecao, nome_arquivo, dados_docx)
+
+def documento_guardado(chave, selecao):
+    """(nome do arquivo, bytes) do último documento gerado, se ainda for da mesma seleção."""
+    guardado = st.session_state.get(f"_documento_{chave}")
+    return guardado[1:] if guardado is not None and guardado[0] == selecao else None
+
+@st.dialog("🗂️ Documentos em Lote", width="large")
+def modal_documentos_em_lote(bases):
+    st.markdown("""
+        <div style="background-color: #f9f9f9; padding: 12px; border-left: 5px solid #E30613; border-radius: 4px; margin-bottom: 20px;">
+            <span style="color: #404040; font-size: 14px;">Gera o mesmo documento para vários investidores de uma vez e entrega tudo em um .zip.</span>
+        </div>
+    """, unsafe_allow_html=True)
+
+    tipo = st.selectbox("Documento", list(TIPOS_DOCUMENTO), key="lote_tipo")
+    _, origem, nomes_parametros, _ = TIPOS_DOCUMENTO[tipo]
+    df = bases.get(origem)
+    if df is None or df.empty:
+        st.warning(f"Base de {origem.lower()} indisponível.")
+        return
+
+    # --- FILTROS ---
+    c_f1, c_f2, c_f3 = st.columns(3)
+    filtro = pd.Series(True, index=df.index)
+    for coluna, col_ui in [("Modelo de contrato", c_f1), ("Situação no plano", c_f2), ("Área", c_f3)]:
+        if coluna in df.columns:
+            opcoes = sorted(df[coluna].dropna().astype(str).unique())
+            escolhidos = col_ui.multiselect(coluna, opcoes, key=f"lote_{coluna}")
+            if escolhidos:
+                filtro &= df[coluna].astype(str).isin(escolhidos)
+    df_filtrado = df[filtro & df["Nome"].notna()]
+
+    nomes = sorted(df_filtrado["Nome"].astype(str).unique())
+    selecionados = st.multiselect(f"Investidores ({len(nomes)} no filtro)", nomes, default=nomes, key=f"lote_nomes_{tipo}")
+
+    parametros = {}
+    if nomes_parametros:
+        cols = st.columns(len(nomes_parametros))
+        for col_ui, nome_param in zip(cols, nomes_parametros):
+            parametros[nome_param] = col_ui.date_input(ROTULOS_PARAMETRO[nome_param], format="DD/MM/YYYY", key=f"lote_{nome_param}")
+
+    incluir_pdf = st.checkbox("📕 Incluir um PDF com todos os documentos", key="lote_pdf")
+
+    st.markdown("<br>", unsafe_allow_html=True)
+    c1, c2, c3 = st.columns([1, 2, 1])
+    if c2.button(f"✅ Gerar {len(selecionados)} documento(s)", use_container_width=True, type="primary", disabled=not selecionados):
+        linhas = df_filtrado[df_filtrado["Nome"].astype(str).isin(selecionados)].fillna("").to_dict("records")
+        with st.spinner("Gerando documentos..."):
+            try:
+                st.session_state["lote_resultado"] = (tipo, *gerar_lote(tipo, linhas, parametros, incluir_pdf))
+            except Exception as e:
+                st.error(f"Erro ao gerar documentos: {e}")
+
+    resultado = st.session_state.get("lote_resultado")
+    if resultado and resultado[0] == tipo:
+        _, dados, est = resultado
+        c2.download_button("⬇️ Baixar .zip", data=dados, file_name=f"{tipo} - {date.today().strftime('%d_%m_%Y')}.zip",
+                           mime="application/zip", use_container_width=True, on_click="ignore")
+        st.caption(f"📊 {est['documentos']} documento(s) em {est['segundos']:.2f}s "
+                   f"({est['por_segundo']:.1f} doc/s, {est['workers']} processo(s), {est['megabytes']:.1f} MB)")
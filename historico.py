@@ -0,0 +1,179 @@
+import os
+import glob
+import bisect
+import threading
+from datetime import date
+
+import pandas as pd
+import streamlit as st
+
+from indices import normalizar_bp, normalizar_cpf, versao_dados
+
+# ==========================================
+# CONFIGURAÇÃO
+# ==========================================
+# Cada dia vira um arquivo Parquet (colunar, zstd) só com as células que mudaram.
+# O estado mais recente de cada base fica em um arquivo próprio para o próximo diff.
+HISTORICO_DIR = os.environ.get("V4_HISTORICO_DIR", ".historico")
+COLUNA_REMOVIDO = "__removido__"
+COLUNAS_LOG = ["data", "seq", "base", "chave", "coluna", "valor"]
+
+def _caminho(*partes):
+    return os.path.join(HISTORICO_DIR, *partes)
+
+def _gravar_parquet(df, caminho, **kwargs):
+    # Arquivo temporário + os.replace: quem lê nunca vê um Parquet pela metade
+    temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        df.to_parquet(temporario, compression="zstd", **kwargs)
+        os.replace(temporario, caminho)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+# ==========================================
+# CHAVE DE LINHA (BP, SENÃO CPF)
+# ==========================================
+def chave_registro(df):
+    bp = normalizar_bp(df["BP"]) if "BP" in df.columns else pd.Series("", index=df.index)
+    cpf = normalizar_cpf(df["CPF"]) if "CPF" in df.columns else pd.Series("", index=df.index)
+    return ("bp:" + bp).where(bp != "", ("cpf:" + cpf).where(cpf != "", ""))
+
+def _estado(df):
+    """Base como texto, indexada pela chave da linha (sem linhas sem chave ou duplicadas)."""
+    colunas = [c for c in df.columns if not str(c).endswith("_dt")]
+    estado = df[colunas].fillna("").astype(str).replace({"nan": "", "None": "", "NaT": ""})
+    estado.index = chave_registro(df).to_numpy()
+    estado = estado[estado.index != ""]
+    return estado[~estado.index.duplicated(keep="first")]
+
+# ==========================================
+# DIFF ENTRE ESTADOS
+# ==========================================
+def calcular_alteracoes(anterior, atual):
+    """Células novas ou alteradas (formato longo: chave, coluna, valor)."""
+    colunas = atual.columns.union(anterior.columns, sort=False)
+    atual = atual.reindex(columns=colunas, fill_value="")
+    anterior = anterior.reindex(index=atual.index, columns=colunas)
+
+    # Linhas e colunas novas comparam contra vazio: só entram os campos preenchidos
+    mudou = atual.ne(anterior.fillna(""))
+    alteracoes = atual.where(mudou).stack().dropna().rename("valor").reset_index()
+    alteracoes.columns = ["chave", "coluna", "valor"]
+    return alteracoes
+
+def _ultimos_valores(nome_base, chaves):
+    """Último valor registrado no log de cada coluna dessas chaves (uma linha por chave)."""
+    filtro = [("base", "==", nome_base), ("chave", "in", list(chaves))]
+    partes = [pd.read_parquet(a, filters=filtro) for a in sorted(glob.glob(_caminho("alteracoes_*.parquet")))]
+    partes = [p for p in partes if len(p)]
+    if not partes:
+        return pd.DataFrame(columns=[COLUNA_REMOVIDO])
+    log = pd.concat(partes, ignore_index=True).sort_values(["data", "seq"], kind="stable")
+    ultimos = log.drop_duplicates(["chave", "coluna"], keep="last")
+    return ultimos.pivot(index="chave", columns="coluna", values="valor").reindex(columns=ultimos["coluna"].unique()).fillna("")
+
+def _diff_base(nome_base, df, hoje, seq):
+    """Alterações da base e o estado novo; quem grava o estado é `registrar_snapshot`."""
+    arquivo_estado = _caminho(f"estado_{nome_base}.parquet")
+    atual = _estado(df)
+    anterior = pd.read_parquet(arquivo_estado) if os.path.exists(arquivo_estado) else atual.iloc[0:0]
+
+    # Quem volta para a base é comparado com os últimos valores que teve no log,
+    # não contra vazio: só entram os campos que mudaram enquanto esteve fora
+    novos = atual.index.difference(anterior.index)
+    conhecidos = _ultimos_valores(nome_base, novos) if len(novos) else pd.DataFrame(columns=[COLUNA_REMOVIDO])
+    marcas = conhecidos.get(COLUNA_REMOVIDO, pd.Series(dtype=str))
+    voltaram = pd.Index(marcas[marcas == "1"].index)
+    conhecidos = conhecidos.drop(columns=COLUNA_REMOVIDO, errors="ignore")
+
+    alteracoes = calcular_alteracoes(pd.concat([anterior, conhecidos]), atual)
+    removidos = anterior.index.difference(atual.index)
+    if len(removidos):
+        alteracoes = pd.concat([alteracoes, pd.DataFrame({"chave": removidos, "coluna": COLUNA_REMOVIDO, "valor": "1"})], ignore_index=True)
+    # Quem voltou deixa de constar como removido (admissões novas não têm marca a desfazer)
+    if len(voltaram):
+        alteracoes = pd.concat([alteracoes, pd.DataFrame({"chave": voltaram, "coluna": COLUNA_REMOVIDO, "valor": ""})], ignore_index=True)
+
+    return alteracoes.assign(data=pd.Timestamp(hoje), seq=seq, base=nome_base)[COLUNAS_LOG], atual
+
+# ==========================================
+# GRAVAÇÃO DO SNAPSHOT DIÁRIO
+# ==========================================
+def registrar_snapshot(bases, hoje=None):
+    """Grava as diferenças de cada base em relação ao último estado conhecido."""
+    hoje = hoje or date.today()
+    os.makedirs(HISTORICO_DIR, exist_ok=True)
+    arquivo_dia = _caminho(f"alteracoes_{hoje.isoformat()}.parquet")
+    do_dia = pd.read_parquet(arquivo_dia) if os.path.exists(arquivo_dia) else pd.DataFrame(columns=COLUNAS_LOG)
+    seq = int(do_dia["seq"].max()) + 1 if len(do_dia) else 0
+
+    diffs = {nome: _diff_base(nome, df, hoje, seq) for nome, df in bases.items() if df is not None and not df.empty}
+    novas = [alteracoes for alteracoes, _ in diffs.values() if len(alteracoes)]
+    # Primeiro o log do dia, depois os estados: se algo falhar no meio, o próximo
+    # diff ainda parte do estado antigo e as alterações não se perdem
+    if novas:
+        _gravar_parquet(pd.concat([do_dia] + novas, ignore_index=True), arquivo_dia, index=False)
+    for nome, (_, atual) in diffs.items():
+        _gravar_parquet(atual, _caminho(f"estado_{nome}.parquet"))
+    return sum(len(n) for n in novas)
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _registrar_uma_vez(versao, dia, _bases):
+    falhas = _dias_com_falha()
+    if dia in falhas:
+        return 0
+    try:
+        return registrar_snapshot(_bases, dia)
+    except Exception:
+        # O histórico nunca pode derrubar o app; a falha fica guardada até o dia seguinte
+        # para não repetir a gravação em todo rerun de toda sessão
+        falhas.clear()
+        falhas.add(dia)
+        return 0
+
+@st.cache_resource(show_spinner=False)
+def _dias_com_falha():
+    return set()
+
+def registrar_snapshot_diario(df_ativos, df_desligados):
+    """Roda no máximo uma vez por dia e versão dos dados em cada processo."""
+    bases = {"ativos": df_ativos, "desligados": df_desligados}
+    versao = versao_dados(df_ativos) + "|" + versao_dados(df_desligados)
+    return _registrar_uma_vez(versao, date.today(), bases)
+
+# ==========================================
+# CONSULTA ("VALOR EM TAL DATA")
+# ==========================================
+class Historico:
+    def __init__(self, log):
+        self.log = log.sort_values(["chave", "coluna", "data", "seq"], kind="stable").reset_index(drop=True)
+        self._series = {}
+        for (chave, coluna), grupo in self.log.groupby(["chave", "coluna"], sort=False):
+            self._series[(chave, coluna)] = (grupo["data"].tolist(), grupo["valor"].tolist())
+
+    def valor_em(self, chave, coluna, data):
+        datas, valores = self._series.get((chave, coluna), ([], []))
+        i = bisect.bisect_right(datas, pd.Timestamp(data))
+        return valores[i - 1] if i else None
+
+    def registro_em(self, chave, data, colunas):
+        return {c: self.valor_em(chave, c, data) for c in colunas}
+
+    def alteracoes(self, chave):
+        df = self.log[self.log["chave"] == chave]
+        if df.empty:
+            return df.assign(anterior=pd.Series(dtype=str))
+        df = df.assign(anterior=df.groupby(["base", "coluna"])["valor"].shift(1))
+        return df.sort_values(["data", "seq", "coluna"], ascending=[False, False, True])
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def _historico_por_arquivos(arquivos):
+    partes = [pd.read_parquet(a) for a, _ in arquivos]
+    log = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame(columns=COLUNAS_LOG)
+    log["data"] = pd.to_datetime(log["data"])
+    return Historico(log)
+
+def carregar_historico():
+    arquivos = tuple((a, os.path.getmtime(a)) for a in sorted(glob.glob(_caminho("alteracoes_*.parquet"))))
+    return _historico_por_arquivos(arquivos)
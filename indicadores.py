@@ -0,0 +1,404 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from indices import diferenca_calendario, versao_dados
+from moeda import remuneracao_em_centavos, remuneracao_em_reais
+
+# ==========================================
+# HEADCOUNT E TURNOVER (INTERVALOS DE VÍNCULO)
+# ==========================================
+DIMENSOES = {
+    "Área": "Área",
+    "Unidade": "Unidade/Atuação",
+    "Modelo": "Modelo de contrato",
+}
+MARCOS_RETENCAO = (3, 6, 12, 24)
+
+def _data(df, coluna):
+    if f"{coluna}_dt" in df.columns:
+        return df[f"{coluna}_dt"]
+    if coluna in df.columns:
+        return pd.to_datetime(df[coluna], dayfirst=True, errors="coerce")
+    return pd.Series(pd.NaT, index=df.index, dtype="datetime64[ns]")
+
+COLUNAS_SERIE = ["Mês", "Grupo", "Headcount", "Admissões", "Desligamentos", "Turnover %"]
+
+def _intervalos_vazios():
+    # Mesmos tipos da base preenchida: o .dt de "inicio"/"fim" não pode quebrar
+    return pd.DataFrame({
+        "inicio": pd.Series(dtype="datetime64[ns]"),
+        "fim": pd.Series(dtype="datetime64[ns]"),
+        "desligado": pd.Series(dtype=bool),
+        **{dim: pd.Series(dtype=object) for dim in DIMENSOES},
+    })
+
+def montar_intervalos(df_ativos, df_desligados):
+    """Um intervalo [admissão, rescisão] por pessoa, juntando ativos e desligados."""
+    partes = []
+    for df, desligado in [(df_ativos, False), (df_desligados, True)]:
+        if df is None or df.empty:
+            continue
+        parte = pd.DataFrame({
+            "inicio": _data(df, "Início na V4").dt.normalize().to_numpy(),
+            "fim": _data(df, "Data de rescisão").dt.normalize().to_numpy() if desligado else pd.NaT,
+            "desligado": desligado,
+        })
+        for dim, coluna in DIMENSOES.items():
+            valores = df[coluna] if coluna in df.columns else pd.Series("", index=df.index)
+            parte[dim] = valores.fillna("").astype(str).str.strip().replace("", "Não Inf.").to_numpy()
+        partes.append(parte)
+    if not partes:
+        return _intervalos_vazios(), 0
+
+    intervalos = pd.concat(partes, ignore_index=True)
+    invalidos = intervalos["inicio"].isna() | (intervalos["desligado"] & intervalos["fim"].isna()) | (intervalos["fim"] < intervalos["inicio"])
+    return intervalos[~invalidos].reset_index(drop=True), int(invalidos.sum())
+
+class MotorHeadcount:
+    """Headcount em qualquer data por busca binária em vetores ordenados.
+
+    Ativos em `t` = admitidos até `t` - desligados antes de `t`
+    (a pessoa conta no próprio dia da rescisão).
+    """
+
+    def __init__(self, df_ativos, df_desligados):
+        self.intervalos, self.descartados = montar_intervalos(df_ativos, df_desligados)
+        self._inicios = np.sort(self.intervalos["inicio"].to_numpy(dtype="datetime64[D]"))
+        fins = self.intervalos["fim"].dropna().to_numpy(dtype="datetime64[D]")
+        self._fins = np.sort(fins)
+
+    def headcount_em(self, datas):
+        datas = np.atleast_1d(np.asarray(pd.to_datetime(datas), dtype="datetime64[D]"))
+        admitidos = np.searchsorted(self._inicios, datas, side="right")
+        saidos = np.searchsorted(self._fins, datas, side="left")
+        return admitidos - saidos
+
+    def serie_mensal(self, inicio, fim, dimensao=None):
+        """Headcount de fim de mês, admissões, desligamentos e turnover por mês.
+
+        Cada pessoa vira dois eventos (+1 no mês da admissão, -1 no mês da
+        rescisão); o headcount sai da soma acumulada da tabela mês × grupo.
+        """
+        meses = pd.period_range(pd.Timestamp(inicio), pd.Timestamp(fim), freq="M")
+        iv = self.intervalos
+        if iv.empty or meses.empty:
+            return pd.DataFrame(columns=COLUNAS_SERIE)
+        grupo = iv[dimensao] if dimensao else pd.Series("Total", index=iv.index)
+
+        entradas = pd.DataFrame({"mes": iv["inicio"].dt.to_period("M"), "grupo": grupo, "adm": 1, "desl": 0})
+        saidas = iv[iv["fim"].notna()]
+        saidas = pd.DataFrame({"mes": saidas["fim"].dt.to_period("M"), "grupo": grupo[saidas.index], "adm": 0, "desl": 1})
+        eventos = pd.concat([entradas, saidas], ignore_index=True)
+
+        # Tudo antes do período entra como saldo inicial
+        anteriores = eventos[eventos["mes"] < meses[0]]
+        saldo = (anteriores.groupby("grupo")["adm"].sum() - anteriores.groupby("grupo")["desl"].sum())
+        no_periodo = eventos[(eventos["mes"] >= meses[0]) & (eventos["mes"] <= meses[-1])]
+        grupos = sorted(set(saldo.index) | set(no_periodo["grupo"]))
+
+        adm = no_periodo.pivot_table(index="mes", columns="grupo", values="adm", aggfunc="sum").reindex(index=meses, columns=grupos).fillna(0)
+        desl = no_periodo.pivot_table(index="mes", columns="grupo", values="desl", aggfunc="sum").reindex(index=meses, columns=grupos).fillna(0)
+        saldo = saldo.reindex(grupos).fillna(0)
+
+        hc_fim = (adm - desl).cumsum() + saldo
+        hc_ini = hc_fim - adm + desl
+        media = (hc_ini + hc_fim) / 2
+        turnover = (desl / media.where(media > 0)).fillna(0) * 100
+
+        resultado = pd.concat({
+            "Headcount": hc_fim.stack(), "Admissões": adm.stack(), "Desligamentos": desl.stack(), "Turnover %": turnover.stack(),
+        }, axis=1).reset_index()
+        resultado.columns = COLUNAS_SERIE
+        resultado["Mês"] = resultado["Mês"].dt.to_timestamp()
+        return resultado.astype({"Headcount": int, "Admissões": int, "Desligamentos": int})
+
+    def retencao_coortes(self, marcos=MARCOS_RETENCAO, freq="M", filtros=None, hoje=None):
+        """Matriz de retenção, opcionalmente filtrada por dimensão ({"Área": [...]})."""
+        iv = self.intervalos
+        for dim, valores in (filtros or {}).items():
+            if valores:
+                iv = iv[iv[dim].isin(valores)]
+        return matriz_retencao(iv, marcos, freq, hoje)
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def _construir_motor_headcount(versao, _df_ativos, _df_desligados):
+    return MotorHeadcount(_df_ativos, _df_desligados)
+
+def obter_motor_headcount(df_ativos, df_desligados):
+    versao = versao_dados(df_ativos) + "|" + versao_dados(df_desligados)
+    return _construir_motor_headcount(versao, df_ativos, df_desligados)
+
+# ==========================================
+# RETENÇÃO POR COORTE DE ADMISSÃO
+# ==========================================
+def _meses_completos(inicio, fim):
+    """Meses completos entre duas séries de datas (mesma regra do tempo de casa)."""
+    dif = diferenca_calendario(inicio, fim)
+    # Início depois do fim (admissão futura) ainda não completou nenhum marco
+    return (dif["anos"] * 12 + dif["meses"]).fillna(-1).astype(np.int64)
+
+def matriz_retencao(intervalos, marcos=MARCOS_RETENCAO, freq="M", hoje=None):
+    """Coorte × marco de tempo de casa: % dos admitidos que seguiam na empresa.
+
+    Só entra no denominador de um marco quem já teria completado aquele tempo
+    até hoje; as células ainda não observáveis ficam vazias (NaN).
+    """
+    colunas = ["Coorte", "Admitidos", *[f"{m}m" for m in marcos]]
+    if intervalos.empty:
+        return pd.DataFrame(columns=colunas)
+
+    hoje = pd.Timestamp(hoje or pd.Timestamp.today()).normalize()
+    inicio = intervalos["inicio"]
+    desligado = intervalos["desligado"].to_numpy()
+    meses_ate_hoje = _meses_completos(inicio, pd.Series(hoje, index=intervalos.index)).to_numpy()
+    meses_vinculo = _meses_completos(inicio, intervalos["fim"].fillna(hoje)).to_numpy()
+
+    marcos_arr = np.asarray(marcos)[None, :]
+    elegivel = meses_ate_hoje[:, None] >= marcos_arr
+    retido = elegivel & (~desligado[:, None] | (meses_vinculo[:, None] >= marcos_arr))
+
+    coorte = inicio.dt.to_period(freq).to_numpy()
+    nomes = [f"{m}m" for m in marcos]
+    base = pd.DataFrame(np.hstack([elegivel, retido]).astype(int), columns=[f"e{m}" for m in marcos] + nomes)
+    base["Coorte"] = coorte
+    base["Admitidos"] = 1
+    soma = base.groupby("Coorte").sum()
+
+    retidos = soma[nomes].to_numpy(dtype=float)
+    elegiveis = soma[[f"e{m}" for m in marcos]].to_numpy(dtype=float)
+    taxas = np.divide(retidos, elegiveis, out=np.full_like(retidos, np.nan), where=elegiveis > 0)
+    resultado = pd.DataFrame(taxas * 100, index=soma.index, columns=nomes)
+    resultado.insert(0, "Admitidos", soma["Admitidos"])
+    return resultado.reset_index()[colunas]
+
+# ==========================================
+# PROJEÇÃO DE FOLHA (PESSOA × MÊS)
+# ==========================================
+ENCARGOS_CLT = 0.70  # INSS patronal, RAT, terceiros, FGTS, 13º e férias + 1/3 (estimativa)
+STATUS_VAGA_FECHADA = ("FECHAD", "PREENCHID", "CANCELAD", "CONGELAD", "CONTRATAD")
+COLUNAS_VAGA = {
+    "id": ["ID Vaga", "ID da vaga", "ID"],
+    "status": ["Status", "Status da vaga", "Situação"],
+    "Área": ["Área"],
+    "Código CC": ["Código CC", "CC", "Centro de custo"],
+    "cargo": ["Cargo", "Título da vaga", "Vaga"],
+    "remuneracao": ["Remuneração", "Salário", "Salário previsto", "Remuneração prevista"],
+    "modelo": ["Modelo de contrato", "Modelo", "Tipo de contrato"],
+    "inicio": ["Previsão de início", "Data prevista", "Previsão de contratação"],
+    "abertura": ["Data de abertura", "Abertura", "Data abertura", "Aberta em", "Data de criação"],
+}
+
+def coluna_vaga(df, campo):
+    """Primeira coluna da base de vagas que corresponde ao campo (ou None)."""
+    for nome in COLUNAS_VAGA[campo]:
+        if nome in df.columns:
+            return nome
+    return None
+
+def _serie_vaga(df, campo, padrao=""):
+    nome = coluna_vaga(df, campo)
+    return df[nome] if nome else pd.Series(padrao, index=df.index)
+
+def id_vaga(coluna):
+    """ID da vaga comparável entre as bases (sem espaços, sem '.0' de número, maiúsculo)."""
+    return coluna.fillna("").astype(str).str.strip().str.replace(r"\.0$", "", regex=True).str.upper().replace({"NAN": "", "NONE": ""})
+
+def vagas_abertas(df_vagas, ids_preenchidos=()):
+    """Vagas ainda não preenchidas (pelo status e pelos IDs já usados no cadastro)."""
+    if df_vagas is None or df_vagas.empty:
+        return pd.DataFrame()
+    status = _serie_vaga(df_vagas, "status").fillna("").astype(str).str.upper()
+    fechada = status.str.contains("|".join(STATUS_VAGA_FECHADA), regex=True)
+    ids = id_vaga(_serie_vaga(df_vagas, "id"))
+    preenchida = ids.isin(set(ids_preenchidos)) & (ids != "")
+    return df_vagas[~fechada & ~preenchida]
+
+def _fracao_mes(meses_ini, meses_fim, datas, depois):
+    """Fração de cada mês (colunas) coberta antes (`depois=False`) ou depois de cada data (linhas)."""
+    dias_mes = (meses_fim - meses_ini).astype("timedelta64[D]").astype(float) + 1
+    datas = datas.astype("datetime64[D]")[:, None]
+    if depois:
+        dias = (meses_fim[None, :] - datas).astype("timedelta64[D]").astype(float) + 1
+    else:
+        dias = (datas - meses_ini[None, :]).astype("timedelta64[D]").astype(float) + 1
+    # Sem data: o mês inteiro conta
+    return np.where(np.isnat(datas), 1.0, np.clip(dias / dias_mes[None, :], 0, 1))
+
+class ProjecaoFolha:
+    """Custo mensal projetado por pessoa (e vaga aberta) nos próximos meses.
+
+    A matriz base guarda só a remuneração proporcional aos dias ativos em cada
+    mês; encargos, reajuste e filtros do cenário são aplicados por cima dela
+    com operações de vetor, sem reprocessar as bases.
+    """
+
+    def __init__(self, df_ativos, df_vagas, inicio, meses=12):
+        self.meses = pd.period_range(pd.Timestamp(inicio), periods=meses, freq="M")
+        meses_ini = self.meses.start_time.to_numpy().astype("datetime64[D]")
+        meses_fim = self.meses.end_time.normalize().to_numpy().astype("datetime64[D]")
+
+        # Investidores ativos: custam até o Térm previsto (quando houver)
+        ativos = df_ativos if df_ativos is not None else pd.DataFrame()
+        reais = remuneracao_em_reais(ativos)
+        termino = _data(ativos, "Térm previsto").to_numpy()
+        pessoas = pd.DataFrame({
+            "Origem": "Investidor",
+            "Nome": ativos["Nome"].astype(str).to_numpy() if "Nome" in ativos.columns else "",
+            "Área": ativos["Área"].fillna("").astype(str).to_numpy() if "Área" in ativos.columns else "",
+            "Código CC": ativos["Código CC"].fillna("").astype(str).to_numpy() if "Código CC" in ativos.columns else "",
+            "CLT": (ativos["Modelo de contrato"].fillna("").astype(str).str.upper().str.contains("CLT").to_numpy() if "Modelo de contrato" in ativos.columns else False),
+            "Remuneração": reais.fillna(0).to_numpy(),
+        })
+        fracao_pessoas = _fracao_mes(meses_ini, meses_fim, termino, depois=False)
+        self.com_termino = ~np.isnat(termino)
+
+        # Vagas abertas: passam a custar a partir da previsão de início (ou do primeiro mês)
+        ids_usados = id_vaga(ativos["ID Vaga"]) if "ID Vaga" in ativos.columns else []
+        vagas = vagas_abertas(df_vagas, ids_usados)
+        if len(vagas):
+            centavos, _ = remuneracao_em_centavos(_serie_vaga(vagas, "remuneracao"))
+            inicio_vaga = pd.to_datetime(_serie_vaga(vagas, "inicio", None), dayfirst=True, errors="coerce").to_numpy()
+            linhas_vagas = pd.DataFrame({
+                "Origem": "Vaga aberta",
+                "Nome": ("Vaga " + _serie_vaga(vagas, "id").astype(str) + " " + _serie_vaga(vagas, "cargo").fillna("").astype(str)).str.strip().to_numpy(),
+                "Área": _serie_vaga(vagas, "Área").fillna("").astype(str).to_numpy(),
+                "Código CC": _serie_vaga(vagas, "Código CC").fillna("").astype(str).str.replace(r"\.0$", "", regex=True).to_numpy(),
+                "CLT": _serie_vaga(vagas, "modelo").fillna("").astype(str).str.upper().str.contains("CLT").to_numpy(),
+                "Remuneração": (centavos.astype("Float64").astype(float) / 100).fillna(0).to_numpy(),
+            })
+            fracao_vagas = _fracao_mes(meses_ini, meses_fim, inicio_vaga, depois=True)
+            pessoas = pd.concat([pessoas, linhas_vagas], ignore_index=True)
+            fracao = np.vstack([fracao_pessoas, fracao_vagas])
+            self.com_termino = np.concatenate([self.com_termino, np.zeros(len(linhas_vagas), dtype=bool)])
+        else:
+            fracao = fracao_pessoas
+
+        for dim in ("Área", "Código CC"):
+            pessoas[dim] = pessoas[dim].str.strip().replace("", "Não Inf.")
+        self.pessoas = pessoas
+        self.vaga = (pessoas["Origem"] == "Vaga aberta").to_numpy()
+        self.clt = pessoas["CLT"].to_numpy(dtype=bool)
+        self.base = pessoas["Remuneração"].to_numpy()[:, None] * fracao
+        self.base_sem_termino = pessoas["Remuneração"].to_numpy()[:, None] * np.where(self.vaga[:, None], fracao, 1.0)
+
+    def cenario(self, reajuste_pct=0.0, mes_reajuste=0, encargos_clt=ENCARGOS_CLT, incluir_vagas=True, considerar_termino=True):
+        """Matriz pessoa × mês de custo total para os parâmetros do cenário."""
+        custo = self.base if considerar_termino else self.base_sem_termino
+        fator_mes = np.where(np.arange(len(self.meses)) >= mes_reajuste, 1 + reajuste_pct / 100, 1.0)
+        fator_pessoa = np.where(self.clt, 1 + encargos_clt, 1.0)
+        if not incluir_vagas:
+            fator_pessoa = np.where(self.vaga, 0.0, fator_pessoa)
+        return custo * fator_pessoa[:, None] * fator_mes[None, :]
+
+    def por_dimensao(self, dimensao, **parametros):
+        """Custo mensal somado por Área ou Código CC (linhas) e mês (colunas)."""
+        matriz = self.cenario(**parametros)
+        colunas = [m.strftime("%m/%Y") for m in self.meses]
+        df = pd.DataFrame(matriz, columns=colunas).assign(**{dimensao: self.pessoas[dimensao].to_numpy()})
+        return df.groupby(dimensao)[colunas].sum().sort_values(colunas[0], ascending=False)
+
+    def serie_mensal(self, **parametros):
+        """Custo total por mês, separando investidores atuais e vagas abertas."""
+        matriz = self.cenario(**parametros)
+        return pd.DataFrame({
+            "Mês": self.meses.start_time,
+            "Investidores": matriz[~self.vaga].sum(axis=0),
+            "Vagas abertas": matriz[self.vaga].sum(axis=0),
+        })
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def _construir_projecao_folha(versao, mes, _df_ativos, _df_vagas):
+    return ProjecaoFolha(_df_ativos, _df_vagas, mes)
+
+def obter_projecao_folha(df_ativos, df_vagas, inicio=None):
+    mes = pd.Timestamp(inicio or pd.Timestamp.today()).to_period("M")
+    versao = versao_dados(df_ativos) + "|" + (versao_dados(df_vagas) if df_vagas is not None else "")
+    return _construir_projecao_folha(versao, str(mes), df_ativos, df_vagas)
+
+# ==========================================
+# PIPELINE DE VAGAS (VAGAS × INVESTIDORES)
+# ==========================================
+STATUS_VAGA_PREENCHIDA = ("PREENCHID", "CONTRATAD", "FECHAD")
+STATUS_VAGA_CANCELADA = ("CANCELAD", "CONGELAD")
+SITUACOES_VAGA = ["Aberta", "Preenchida", "Cancelada"]
+
+def _investidores_vazios():
+    return pd.DataFrame({
+        "ID": pd.Series(dtype=object), "Investidor": pd.Series(dtype=object), "Situação do investidor": pd.Series(dtype=object),
+        "Admissão": pd.Series(dtype="datetime64[ns]"),
+        "Área do investidor": pd.Series(dtype=object), "CC do investidor": pd.Series(dtype=object),
+    })
+
+class PipelineVagas:
+    """Vagas ligadas aos investidores pelo ID Vaga, montado uma vez por versão dos dados.
+
+    O join é por hash (merge do pandas na chave normalizada). Cada vaga fica
+    com o investidor de admissão mais antiga que a usou; IDs usados por
+    investidores que não existem na base de vagas são os órfãos.
+    """
+
+    def __init__(self, df_vagas, df_ativos, df_desligados=None):
+        bases = [(df, origem) for df, origem in ((df_ativos, "Ativo"), (df_desligados, "Desligado")) if df is not None and "ID Vaga" in df.columns]
+        investidores = pd.concat([
+            pd.DataFrame({
+                "ID": id_vaga(df["ID Vaga"]).to_numpy(),
+                "Investidor": df["Nome"].astype(str).to_numpy() if "Nome" in df.columns else "",
+                "Situação do investidor": origem,
+                "Admissão": _data(df, "Início na V4").to_numpy(),
+                "Área do investidor": df["Área"].fillna("").astype(str).to_numpy() if "Área" in df.columns else "",
+                "CC do investidor": df["Código CC"].fillna("").astype(str).str.replace(r"\.0$", "", regex=True).to_numpy() if "Código CC" in df.columns else "",
+            })
+            for df, origem in bases
+        ] or [_investidores_vazios()], ignore_index=True)
+        investidores = investidores[investidores["ID"] != ""]
+        primeiro = investidores.sort_values("Admissão", na_position="last").drop_duplicates("ID")
+
+        vagas = df_vagas if df_vagas is not None else pd.DataFrame()
+        status = _serie_vaga(vagas, "status").fillna("").astype(str)
+        tabela = pd.DataFrame({
+            "ID": id_vaga(_serie_vaga(vagas, "id")).to_numpy(),
+            "Cargo": _serie_vaga(vagas, "cargo").fillna("").astype(str).to_numpy(),
+            "Status": status.to_numpy(),
+            "Área": _serie_vaga(vagas, "Área").fillna("").astype(str).str.strip().to_numpy(),
+            "Código CC": _serie_vaga(vagas, "Código CC").fillna("").astype(str).str.strip().str.replace(r"\.0$", "", regex=True).to_numpy(),
+            "Abertura": pd.to_datetime(_serie_vaga(vagas, "abertura", None), dayfirst=True, errors="coerce").to_numpy(),
+        })
+        tabela = tabela.merge(primeiro, on="ID", how="left")
+
+        status_up = tabela["Status"].str.upper()
+        preenchida = tabela["Investidor"].notna() | status_up.str.contains("|".join(STATUS_VAGA_PREENCHIDA))
+        cancelada = ~preenchida & status_up.str.contains("|".join(STATUS_VAGA_CANCELADA))
+        tabela["Situação"] = np.select([preenchida, cancelada], ["Preenchida", "Cancelada"], "Aberta")
+        # Vaga sem Área/CC herda a do investidor que a ocupou
+        for dim, do_investidor in (("Área", "Área do investidor"), ("Código CC", "CC do investidor")):
+            tabela[dim] = tabela[dim].where(tabela[dim] != "", tabela[do_investidor].fillna("")).replace("", "Não Inf.")
+        dias = (tabela["Admissão"] - tabela["Abertura"]).dt.days
+        # Admissão antes da abertura é erro de cadastro: fica de fora das médias e é listada à parte
+        invertidas = dias < 0
+        tabela["Dias para preencher"] = dias.mask(invertidas)
+        self.vagas = tabela
+        self.datas_invertidas = tabela.loc[invertidas, ["ID", "Cargo", "Abertura", "Investidor", "Admissão"]].reset_index(drop=True)
+
+        ids_vagas = set(tabela["ID"])
+        self.orfaos = investidores[~investidores["ID"].isin(ids_vagas)].sort_values(["ID", "Investidor"]).reset_index(drop=True)
+        self.duplicados = investidores[investidores["ID"].duplicated(keep=False)].sort_values(["ID", "Admissão"]).reset_index(drop=True)
+
+    def resumo(self, dimensao="Área"):
+        """Vagas abertas, preenchidas e canceladas por Área ou Código CC, com o tempo de preenchimento."""
+        contagem = pd.crosstab(self.vagas[dimensao], self.vagas["Situação"]).reindex(columns=SITUACOES_VAGA, fill_value=0)
+        dias = self.vagas.groupby(dimensao)["Dias para preencher"].agg(["median", "mean"])
+        dias.columns = ["Mediana (dias)", "Média (dias)"]
+        return contagem.join(dias).sort_values("Aberta", ascending=False)
+
+    def tempo_para_preencher(self):
+        """Dias entre a abertura da vaga e a admissão (só vagas com as duas datas, na ordem certa)."""
+        return self.vagas.dropna(subset=["Dias para preencher"])
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def _construir_pipeline_vagas(versao, _df_vagas, _df_ativos, _df_desligados):
+    return PipelineVagas(_df_vagas, _df_ativos, _df_desligados)
+
+def obter_pipeline_vagas(df_vagas, df_ativos, df_desligados=None):
+    versao = "|".join(versao_dados(df) if df is not None else "" for df in (df_vagas, df_ativos, df_desligados))
+    return _construir_pipeline_vagas(versao, df_vagas, df_ativos, df_desligados)
@@ -0,0 +1,391 @@
+import calendar
+import hashlib
+import weakref
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# ==========================================
+# VERSÃO DOS DADOS
+# ==========================================
+# id do DataFrame -> (weakref, versão) dos objetos cuja versão já é conhecida (ex.: as
+# bases do snapshot). O weakref garante que um id reaproveitado não herde a versão de outro.
+_VERSOES_REGISTRADAS = {}
+
+def registrar_versao(df, versao):
+    """Associa ao objeto uma versão já calculada; `versao_dados(df)` passa a não reler a base.
+
+    Só para DataFrames que não serão alterados no lugar (as visões do snapshot).
+    Filtros e cópias são objetos novos e voltam a ser calculados normalmente.
+    """
+    chave = id(df)
+    _VERSOES_REGISTRADAS[chave] = (weakref.ref(df, lambda _, chave=chave: _VERSOES_REGISTRADAS.pop(chave, None)), versao)
+    return df
+
+def versao_dados(df, colunas=None):
+    """Impressão digital do conteúdo do DataFrame (muda quando a planilha muda).
+
+    `colunas` limita o cálculo a parte da base; uma versão registrada da base
+    inteira já serve, porque as colunas mudam junto com ela.
+    """
+    if df is None or len(df) == 0:
+        return "vazio"
+    registrada = _VERSOES_REGISTRADAS.get(id(df))
+    if registrada is not None and registrada[0]() is df:
+        return registrada[1]
+    if colunas is not None:
+        df = df[colunas]
+    hashes = pd.util.hash_pandas_object(df, index=False).values
+    assinatura = hashlib.sha1(hashes.tobytes())
+    assinatura.update("|".join(map(str, df.columns)).encode("utf-8"))
+    return f"{len(df)}-{assinatura.hexdigest()[:16]}"
+
+# ==========================================
+# NORMALIZAÇÃO DAS CHAVES
+# ==========================================
+def _texto(coluna):
+    return coluna.fillna("").astype(str).str.strip().replace({"nan": "", "None": "", "NaT": ""})
+
+def normalizar_nome(coluna):
+    return _texto(coluna)
+
+def normalizar_cpf(coluna):
+    digitos = _texto(coluna).str.replace(r"\.0$", "", regex=True).str.replace(r"\D", "", regex=True)
+    return digitos.where(digitos == "", digitos.str.zfill(11))
+
+def normalizar_bp(coluna):
+    return _texto(coluna).str.replace(r"\.0$", "", regex=True)
+
+def normalizar_email(coluna):
+    return _texto(coluna).str.lower()
+
+def normalizar_matricula(coluna):
+    digitos = _texto(coluna).str.replace(r"\.0$", "", regex=True).str.replace(r"\D", "", regex=True)
+    return digitos.where(digitos == "", digitos.str.zfill(6))
+
+# ==========================================
+# DIFERENÇA DE CALENDÁRIO (VETORIZADA)
+# ==========================================
+def _somar_meses(dias, meses):
+    # Mesma regra do relativedelta: o dia é limitado ao último dia do mês de destino
+    mes = dias.astype("datetime64[M]")
+    dia = (dias - mes.astype("datetime64[D]")).astype(np.int64)
+    alvo = mes + meses.astype("timedelta64[M]")
+    ultimo_dia = ((alvo + np.timedelta64(1, "M")).astype("datetime64[D]") - alvo.astype("datetime64[D]")).astype(np.int64)
+    return alvo.astype("datetime64[D]") + np.minimum(dia, ultimo_dia - 1).astype("timedelta64[D]")
+
+def diferenca_calendario(inicio, fim=None):
+    """Anos, meses e dias completos de `inicio` até `fim` (padrão: hoje).
+
+    Equivale a `relativedelta(fim, inicio)` linha a linha, mas calculado com
+    NumPy sobre a coluna inteira. Datas vazias ou posteriores a `fim` ficam nulas.
+    """
+    if not isinstance(inicio, pd.Series):
+        inicio = pd.Series(inicio)
+    inicio = pd.to_datetime(inicio, errors="coerce")
+    if fim is None:
+        fim = pd.Timestamp.today()
+    if isinstance(fim, pd.Series):
+        fim = pd.to_datetime(fim, errors="coerce").reindex(inicio.index)
+    else:
+        fim = pd.Series(pd.Timestamp(fim), index=inicio.index)
+
+    ini = inicio.dt.normalize().to_numpy(dtype="datetime64[D]")
+    fin = fim.dt.normalize().to_numpy(dtype="datetime64[D]")
+    validos = ~(np.isnat(ini) | np.isnat(fin)) & (ini <= fin)
+    ini = np.where(validos, ini, fin.min() if validos.any() else np.datetime64("1970-01-01", "D"))
+    fin = np.where(validos, fin, ini)
+
+    ini_m, fin_m = ini.astype("datetime64[M]").astype(np.int64), fin.astype("datetime64[M]").astype(np.int64)
+    meses = fin_m - ini_m
+    ancora = _somar_meses(ini, meses)
+    passou = ancora > fin
+    meses = meses - passou
+    ancora = np.where(passou, _somar_meses(ini, meses), ancora)
+    dias = (fin - ancora).astype(np.int64)
+
+    resultado = pd.DataFrame({"anos": meses // 12, "meses": meses % 12, "dias": dias}, index=inicio.index).astype("Int64")
+    resultado[~validos] = pd.NA
+    return resultado
+
+# ==========================================
+# ÍNDICE DE REGISTROS (NOME, CPF, BP, E-MAIL)
+# ==========================================
+CHAVES_REGISTRO = {
+    "nome": ("Nome", normalizar_nome),
+    "cpf": ("CPF", normalizar_cpf),
+    "bp": ("BP", normalizar_bp),
+    "email": ("E-mail corporativo", normalizar_email),
+}
+
+class IndiceRegistros:
+    """Mapeia Nome, CPF, BP e e-mail corporativo para as posições das linhas."""
+
+    def __init__(self, df):
+        self.df = df
+        self._mapas = {}
+        posicoes = pd.Series(np.arange(len(df)))
+        for chave, (coluna, normalizar) in CHAVES_REGISTRO.items():
+            if coluna not in df.columns:
+                self._mapas[chave] = {}
+                continue
+            valores = normalizar(df[coluna]).to_numpy()
+            grupos = posicoes.groupby(valores, sort=False).indices
+            grupos.pop("", None)
+            self._mapas[chave] = {k: v.tolist() for k, v in grupos.items()}
+
+    def posicoes(self, chave, valor):
+        coluna, normalizar = CHAVES_REGISTRO[chave]
+        valor_norm = normalizar(pd.Series([valor])).iloc[0]
+        return self._mapas.get(chave, {}).get(valor_norm, [])
+
+    def registros(self, chave, valor):
+        return [self.df.iloc[p] for p in self.posicoes(chave, valor)]
+
+    def registro(self, chave, valor):
+        pos = self.posicoes(chave, valor)
+        return self.df.iloc[pos[0]] if pos else None
+
+    def contem(self, chave, valor):
+        return bool(self.posicoes(chave, valor))
+
+    def colisoes(self, chave):
+        return {k: v for k, v in self._mapas.get(chave, {}).items() if len(v) > 1}
+
+    def relatorio_colisoes(self):
+        linhas = []
+        for chave, (coluna, _) in CHAVES_REGISTRO.items():
+            for valor, pos in self.colisoes(chave).items():
+                nomes = ", ".join(str(n) for n in self.df.iloc[pos]["Nome"].tolist()) if "Nome" in self.df.columns else ""
+                linhas.append({"Chave": coluna, "Valor": valor, "Ocorrências": len(pos), "Nomes": nomes})
+        return pd.DataFrame(linhas, columns=["Chave", "Valor", "Ocorrências", "Nomes"])
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def _construir_indice_registros(versao, _df):
+    return IndiceRegistros(_df)
+
+def obter_indice_registros(df):
+    return _construir_indice_registros(versao_dados(df), df)
+
+def selecionar_registro(df, nome, key):
+    """Resolve o investidor pelo nome; com homônimos, pede a escolha pelo CPF/BP."""
+    indice = obter_indice_registros(df)
+    encontrados = indice.registros("nome", nome)
+    if not encontrados:
+        return None
+    if len(encontrados) == 1:
+        return encontrados[0]
+
+    def rotulo(i):
+        linha = encontrados[i]
+        cpf = normalizar_cpf(pd.Series([linha.get("CPF", "")])).iloc[0]
+        bp = normalizar_bp(pd.Series([linha.get("BP", "")])).iloc[0]
+        return f"{nome} — CPF {cpf or 'N/A'} — BP {bp or 'N/A'}"
+
+    st.warning(f"⚠️ Existem {len(encontrados)} investidores com o nome **{nome}**. Confirme pelo CPF/BP.")
+    escolha = st.selectbox("Investidor", range(len(encontrados)), format_func=rotulo, key=f"homonimo_{key}")
+    return encontrados[escolha]
+
+# ==========================================
+# ÍNDICE DE HIERARQUIA (LIDERANÇA DIRETA)
+# ==========================================
+class IndiceHierarquia:
+    """Árvore de liderança com listas de adjacência e passeio de Euler.
+
+    Os liderados (diretos e indiretos) de qualquer pessoa ocupam um trecho
+    contíguo de `ordem`, então a consulta custa O(tamanho da subárvore).
+    """
+
+    def __init__(self, df, col_nome="Nome", col_lider="Liderança direta"):
+        nomes = normalizar_nome(df[col_nome]) if col_nome in df.columns else pd.Series([], dtype=str)
+        lideres = normalizar_nome(df[col_lider]) if col_lider in df.columns else pd.Series([""] * len(nomes))
+
+        self.pai = {}
+        for nome, lider in zip(nomes.tolist(), lideres.tolist()):
+            if nome and nome not in self.pai:
+                self.pai[nome] = lider or None
+
+        # Líderes citados que não estão na base viram nós externos (raízes)
+        self.externos = sorted({l for l in self.pai.values() if l and l not in self.pai})
+        self.orfaos = sorted(n for n, l in self.pai.items() if l in self.externos)
+        for lider in self.externos:
+            self.pai[lider] = None
+
+        self.filhos = {n: [] for n in self.pai}
+        for nome, lider in self.pai.items():
+            if lider is not None:
+                self.filhos[lider].append(nome)
+        for lista in self.filhos.values():
+            lista.sort()
+
+        self.ordem, self.entrada, self.saida, self.profundidade = [], {}, {}, {}
+        raizes = sorted(n for n, l in self.pai.items() if l is None)
+        for raiz in raizes:
+            self._percorrer(raiz)
+
+        # O que sobrou sem visita está num ciclo (ou pendurado nele)
+        self.ciclos = []
+        for nome in sorted(self.pai):
+            if nome in self.entrada:
+                continue
+            caminho, atual = [], nome
+            while atual not in self.entrada and atual not in caminho:
+                caminho.append(atual)
+                atual = self.pai[atual]
+            if atual in caminho:
+                ciclo = caminho[caminho.index(atual):]
+                self.ciclos.append(ciclo)
+                self._percorrer(min(ciclo))
+            self._percorrer(nome)
+        self.raizes = raizes + [min(c) for c in self.ciclos]
+        self.em_ciclo = {n for c in self.ciclos for n in c}
+
+    def _percorrer(self, raiz):
+        if raiz in self.entrada:
+            return
+        pilha = [(raiz, 0, False)]
+        while pilha:
+            nome, nivel, fechando = pilha.pop()
+            if fechando:
+                self.saida[nome] = len(self.ordem)
+                continue
+            if nome in self.entrada:
+                continue
+            self.entrada[nome] = len(self.ordem)
+            self.profundidade[nome] = nivel
+            self.ordem.append(nome)
+            pilha.append((nome, nivel, True))
+            for filho in reversed(self.filhos[nome]):
+                if filho not in self.entrada:
+                    pilha.append((filho, nivel + 1, False))
+
+    def __contains__(self, nome):
+        return nome in self.entrada
+
+    def liderados_diretos(self, nome):
+        return list(self.filhos.get(nome, []))
+
+    def descendentes(self, nome):
+        if nome not in self.entrada:
+            return []
+        return self.ordem[self.entrada[nome] + 1:self.saida[nome]]
+
+    def tamanho_subarvore(self, nome):
+        if nome not in self.entrada:
+            return 0
+        return self.saida[nome] - self.entrada[nome]
+
+    def caminho_ate_raiz(self, nome):
+        caminho, visitados = [], set()
+        while nome is not None and nome not in visitados:
+            caminho.append(nome)
+            visitados.add(nome)
+            nome = self.pai.get(nome)
+        return caminho
+
+    def arestas(self, raiz=None):
+        nos = self.ordem if raiz is None else [raiz] + self.descendentes(raiz)
+        return [(self.pai[n], n) for n in nos if self.pai.get(n) is not None]
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def _construir_indice_hierarquia(versao, _df):
+    return IndiceHierarquia(_df)
+
+def obter_indice_hierarquia(df):
+    return _construir_indice_hierarquia(versao_dados(df, ["Nome", "Liderança direta"]), df)
+
+# ==========================================
+# ÍNDICE DE EVENTOS DO CALENDÁRIO
+# ==========================================
+EVENTO_ANIVERSARIO = "🎂 Aniversário"
+EVENTO_ANIVERSARIO_V4 = "🏅 Aniversário de V4"
+
+class IndiceEventos:
+    """Eventos por (mês, dia) para os recorrentes e por data para os pontuais.
+
+    Recorrentes: aniversários e aniversários de V4 ("Início na V4").
+    Pontuais: "Térm previsto" e prazos de benefícios (documentação e EB).
+    """
+
+    RECORRENTES = [
+        ("Data de nascimento", EVENTO_ANIVERSARIO, "{} anos"),
+        ("Início na V4", EVENTO_ANIVERSARIO_V4, "{} ano(s) de casa"),
+    ]
+    PONTUAIS = [
+        ("Térm previsto", "📄 Fim de contrato", None),
+        ("Solicitar documentação", "📂 Prazo docs do plano", "Pendente"),
+        ("Enviar no EB", "📩 Prazo envio EB", "Aguardando docs"),
+    ]
+
+    def __init__(self, df):
+        self.recorrentes = {}
+        self.pontuais = {}
+        self.pontuais_mes = {}
+        nomes = df["Nome"].astype(str).to_numpy() if "Nome" in df.columns else np.full(len(df), "")
+        fotos = df["Foto"].astype(str).to_numpy() if "Foto" in df.columns else np.full(len(df), "")
+        status = normalizar_nome(df["Situação no plano"]) if "Situação no plano" in df.columns else pd.Series("", index=df.index)
+
+        def datas(coluna, situacao):
+            if coluna not in df.columns:
+                return []
+            serie = pd.to_datetime(df[coluna], dayfirst=True, errors="coerce").dt.normalize()
+            valido = serie.notna()
+            if situacao is not None:
+                valido &= (status == situacao).to_numpy()
+            pos = np.flatnonzero(valido.to_numpy())
+            return zip(pos, serie.to_numpy()[pos].astype("datetime64[D]").tolist())
+
+        for coluna, tipo, formato in self.RECORRENTES:
+            for pos, data in datas(coluna, None):
+                evento = {"Tipo": tipo, "Nome": nomes[pos], "Foto": fotos[pos], "Origem": data, "_formato": formato, "_pos": int(pos)}
+                self.recorrentes.setdefault((data.month, data.day), []).append(evento)
+
+        for coluna, tipo, situacao in self.PONTUAIS:
+            for pos, data in datas(coluna, situacao):
+                evento = {"Tipo": tipo, "Nome": nomes[pos], "Foto": fotos[pos], "Origem": data, "_pos": int(pos)}
+                self.pontuais.setdefault(data, []).append(evento)
+                self.pontuais_mes.setdefault((data.year, data.month), []).append(evento)
+
+    def _recorrentes_no_dia(self, dia):
+        chaves = [(dia.month, dia.day)]
+        # Nascidos em 29/02 comemoram em 28/02 nos anos não bissextos
+        if (dia.month, dia.day) == (2, 28) and not calendar.isleap(dia.year):
+            chaves.append((2, 29))
+        eventos = []
+        for chave in chaves:
+            for evento in self.recorrentes.get(chave, []):
+                anos = dia.year - evento["Origem"].year
+                if anos <= 0:
+                    continue
+                eventos.append({**evento, "Data": dia, "Detalhe": evento["_formato"].format(anos)})
+        return eventos
+
+    def _pontuais_no_dia(self, dia):
+        return [{**e, "Data": dia, "Detalhe": ""} for e in self.pontuais.get(dia, [])]
+
+    def do_dia(self, dia):
+        dia = pd.Timestamp(dia).date()
+        return self._recorrentes_no_dia(dia) + self._pontuais_no_dia(dia)
+
+    def proximos(self, inicio, dias=7):
+        inicio = pd.Timestamp(inicio).date()
+        eventos = []
+        for i in range(dias + 1):
+            eventos.extend(self.do_dia(inicio + timedelta(days=i)))
+        return eventos
+
+    def do_mes(self, ano, mes):
+        eventos = []
+        for dia in range(1, calendar.monthrange(ano, mes)[1] + 1):
+            eventos.extend(self._recorrentes_no_dia(date(ano, mes, dia)))
+        eventos.extend({**e, "Data": e["Origem"], "Detalhe": ""} for e in self.pontuais_mes.get((ano, mes), []))
+        return sorted(eventos, key=lambda e: e["Data"])
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def _construir_indice_eventos(versao, _df):
+    return IndiceEventos(_df)
+
+def obter_indice_eventos(df):
+    return _construir_indice_eventos(versao_dados(df), df)
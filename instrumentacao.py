@@ -0,0 +1,68 @@
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+import streamlit as st
+
+# ==========================================
+# MEDIÇÃO DE ALOCAÇÃO POR SEÇÃO
+# ==========================================
+# Ligada só por V4_MEDIR_ALOCACAO=1 no ambiente do servidor: o tracemalloc vale para o
+# processo todo e deixa todas as sessões mais lentas, então não pode ser ligado pela URL.
+# Desligada, `medir` não faz nada. É para diagnóstico, não para uso diário.
+CHAVE_MEDICOES = "_alocacoes_rerun"
+
+def medicao_ativa():
+    return os.environ.get("V4_MEDIR_ALOCACAO") == "1"
+
+def iniciar_medicao():
+    """Zera as medições do rerun; chamar no começo do render."""
+    if not medicao_ativa():
+        st.session_state.pop(CHAVE_MEDICOES, None)
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        return
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    st.session_state[CHAVE_MEDICOES] = []
+
+@contextmanager
+def medir(secao):
+    """Registra o pico de memória alocada durante o bloco e o que ficou retido ao final.
+
+    As seções não devem ser aninhadas: o pico do tracemalloc é um só. Os números
+    são do processo inteiro, então outras sessões rodando ao mesmo tempo entram na conta.
+    """
+    medicoes = st.session_state.get(CHAVE_MEDICOES)
+    if medicoes is None or not tracemalloc.is_tracing():
+        yield
+        return
+    antes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        depois, pico = tracemalloc.get_traced_memory()
+        medicoes.append({
+            "Seção": secao,
+            "Pico alocado (MB)": (pico - antes) / 1_048_576,
+            "Retido (MB)": (depois - antes) / 1_048_576,
+            "Tempo (ms)": (time.perf_counter() - inicio) * 1000,
+        })
+
+def painel_medicoes():
+    """Tabela com as medições do rerun atual (só aparece com a medição ligada)."""
+    medicoes = st.session_state.get(CHAVE_MEDICOES)
+    if not medicoes:
+        return
+    with st.expander("🧪 Alocação de memória por seção (este rerun)", expanded=False):
+        df = pd.DataFrame(medicoes)
+        st.dataframe(df, use_container_width=True, hide_index=True,
+                     column_config={c: st.column_config.NumberColumn(format="%.2f") for c in df.columns[1:]})
+        st.caption(f"Total de pico somado: {df['Pico alocado (MB)'].sum():.1f} MB · memória rastreada agora: "
+                   f"{tracemalloc.get_traced_memory()[0] / 1_048_576:.1f} MB")
+        st.caption("⚠️ Medição do processo inteiro: com outras sessões ativas ao mesmo tempo, "
+                   "as alocações delas também entram nos números. Para medir uma seção, use o app sozinho.")
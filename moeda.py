@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# REMUNERAÇÃO EM CENTAVOS (INTEIROS EXATOS)
+# ==========================================
+# "R$ 5.000,00", "5000,5", "5.000" e "5000.50" (número vindo da planilha) são aceitos.
+_PADRAO_BR = r"^(?P<sinal>-?)(?P<inteiro>\d{1,3}(?:\.\d{3})+|\d+)(?:,(?P<decimal>\d{1,2}))?$"
+_PADRAO_PONTO = r"^(?P<sinal>-?)(?P<inteiro>\d+)\.(?P<decimal>\d{1,2})$"
+
+def remuneracao_em_centavos(coluna):
+    """Converte a coluna de remuneração para centavos (Int64).
+
+    Retorna (centavos, falhas): `falhas` marca as células preenchidas que não
+    puderam ser lidas; células vazias viram <NA> sem contar como falha.
+    """
+    texto = (
+        coluna.fillna("").astype(str)
+        .str.replace("R$", "", regex=False)
+        # O \xa0 explícito: com strings em Arrow (pandas 3), \s não casa o espaço da formatação do Sheets
+        .str.replace(r"[\s\xa0]", "", regex=True)
+        .replace({"nan": "", "None": ""})
+    )
+    partes = texto.str.extract(_PADRAO_BR)
+    sem_match = partes["inteiro"].isna()
+    if sem_match.any():
+        partes[sem_match] = texto[sem_match].str.extract(_PADRAO_PONTO)
+
+    inteiro = pd.to_numeric(partes["inteiro"].str.replace(".", "", regex=False), errors="coerce")
+    decimal = pd.to_numeric(partes["decimal"].fillna("").str.ljust(2, "0"), errors="coerce").fillna(0)
+    sinal = np.where(partes["sinal"] == "-", -1, 1)
+    centavos = ((inteiro * 100 + decimal) * sinal).astype("Int64")
+
+    falhas = centavos.isna() & (texto != "")
+    return centavos, falhas
+
+def remuneracao_em_reais(df):
+    """Remuneração em reais (float) a partir da coluna de centavos preparada na carga."""
+    if "Remuneração_cent" in df.columns:
+        return df["Remuneração_cent"].astype("Float64").astype(float) / 100
+    if "Remuneração" in df.columns:
+        return remuneracao_em_centavos(df["Remuneração"])[0].astype("Float64").astype(float) / 100
+    return pd.Series(np.nan, index=df.index)
+
+def falhas_remuneracao(df):
+    """Linhas com remuneração preenchida que a carga não conseguiu converter."""
+    if "Remuneração_cent" not in df.columns:
+        return pd.Series(False, index=df.index)
+    preenchida = df["Remuneração"].fillna("").astype(str).str.strip().replace({"nan": "", "None": ""}) != ""
+    return df["Remuneração_cent"].isna() & preenchida
+
+# ==========================================
+# FORMATAÇÃO BRL (VETORIZADA)
+# ==========================================
+def formatar_brl(valores, em_centavos=False):
+    """'R$ 1.234,56' para uma série inteira de uma vez; vazios viram ''."""
+    valores = pd.Series(valores)
+    numeros = pd.to_numeric(valores, errors="coerce").astype(float)
+    centavos = numeros if em_centavos else numeros * 100
+    validos = centavos.notna()
+
+    absoluto = centavos[validos].abs().round().astype(np.int64)
+    inteiro = (absoluto // 100).astype(str).str.replace(r"\B(?=(\d{3})+(?!\d))", ".", regex=True)
+    decimal = (absoluto % 100).astype(str).str.zfill(2)
+    sinal = pd.Series(np.where(centavos[validos] < 0, "-", ""), index=absoluto.index)
+
+    resultado = pd.Series("", index=valores.index, dtype=object)
+    resultado[validos] = sinal + "R$ " + inteiro + "," + decimal
+    return resultado
@@ -0,0 +1,190 @@
+import html
+import os
+import zipfile
+from email.message import EmailMessage
+from email.policy import SMTP
+from io import BytesIO
+
+import pandas as pd
+import streamlit as st
+
+from indices import normalizar_email, normalizar_matricula, normalizar_nome, versao_dados
+
+# ==========================================
+# E-MAIL DE FORMALIZAÇÃO CLT (SISTEMA PONTO)
+# ==========================================
+ASSUNTO_PONTO = "Formalização CLT - Sistema Ponto 🕝"
+ANEXO_PONTO = "Treinamento CLTs - Ponto por exceção.pptx"
+MIME_PPTX = ("application", "vnd.openxmlformats-officedocument.presentationml.presentation")
+LINK_MANUAL_PONTO = "https://docs.google.com/document/d/1PD-14f2227BPHbZmjAnB9JoowJgLMS9FET8YGf5Oq-w/edit?tab=t.0"
+
+CORPO_PONTO = """
+<div style="background-color: white; color: #000000; font-family: Arial, sans-serif; font-size: 11pt; line-height: 1.6; padding: 20px; border: 1px solid #eeeeee; border-radius: 8px;">
+    Olá, <b>{primeiro_nome}</b>.
+    Espero que esteja bem.<br><br>
+    Tivemos um bate-papo importante sobre o modelo de contrato dos CLTs na V4 Company e agora oficialmente, estou enviando seu acesso ao sistema <b>AHGORA</b> para registro de <b>ponto por exceção.</b><br> 👉
+    <a href="{link_manual}" target="_blank" style="color: #E30613; font-weight: bold; text-decoration: underline;">Clique aqui para acessar o manual de ativação</a><br><br>
+    <b>Matrícula:</b> {matricula}<br>
+    <b>Senha:</b> 123456<br>
+    <b>Chave de ativação:</b> {chave}<br><br>
+    <b>Para relembrarmos:</b><br>
+    Adotamos a utilização do controle de ponto por <b>EXCEÇÃO</b>, no modelo de Banco de Horas trimestral. Esse sistema foi pensado para trazer mais flexibilidade e transparência na gestão do tempo de trabalho, garantindo clareza para todos.<br><br>
+    <b>Como funciona:</b><br>
+    • <b>Horas positivas (extras):</b> entram no banco de horas e podem ser compensadas em descanso até o final desses 3 meses, desde que tenham aprovação pela liderança e DP (milena.nascimento@v4company.com) no e-mail.<br>
+    • <b>Horas negativas (faltas/atrasos):</b> entram no banco de horas e deverão ser compensadas no período de 3 meses do banco de horas pelo investidor.<br><br>
+    <b>Regras principais:</b><br>
+    • <b>Validade:</b> apuração a cada 3 meses.<br>
+    • <b>Aprovação de horas extras:</b> Somente com autorização da liderança e DP (milena.nascimento@v4company.com), em casos específicos (ex.: War Day ou final do mês).<br><br>
+    <b>Cálculo de horas:</b><br>
+    • <b>Domingos/feriados</b> → 1h = 1h24 no banco.<br>
+    • <b>Demais dias</b> → 1h trabalhada = 1h de banco de horas.<br>
+    • <b>Adicional noturno (22h–06h):</b> pago em dinheiro (30%) dentro do mês, horas entram para banco de horas.<br><br>
+    <b>Rescisão:</b><br>
+    • <b>Saldo positivo</b> → pago junto às verbas rescisórias.<br>
+    • <b>Saldo negativo</b> → descontado na rescisão.<br><br>
+    <b>Folgas compensatórias:</b> precisam ser combinadas com 1 dia de antecedência + formalização com o DP (via e-mail milena.nascimento@v4company.com).<br><br>
+    <b>Atestados:</b> devem ser anexados <b>obrigatoriamente</b> no sistema para abono.<br><br>
+    <b>Apuração:</b> revisar saldo a cada 2 semanas para evitar acúmulo.<br><br>
+    <b>Transparência:</b><br>
+    Cada investidor terá acesso ao extrato mensal do banco de horas.<br>
+    <b>Obs.:</b> A apuração da folha de pagamento acontece a cada dia 25.<br><br>
+    Conte conosco para o que precisar.<br><br><br>
+    Atenciosamente,
+</div>
+"""
+
+def filtrar_clt(df_ativos):
+    return df_ativos[df_ativos["Modelo de contrato"].astype(str).str.upper().str.contains("CLT", na=False)]
+
+def matricula_ahgora(valor):
+    """Matrícula como está na base (só sem o '.0' de célula numérica): é a credencial do Ahgora."""
+    texto = "" if valor is None or (isinstance(valor, float) and pd.isna(valor)) else str(valor).strip()
+    texto = texto[:-2] if texto.endswith(".0") else texto
+    return "" if texto.lower() in ("nan", "none") else texto
+
+def corpo_email_ponto(nome, matricula, chave):
+    primeiro_nome = str(nome).split()[0].capitalize() if str(nome).split() else ""
+    # Nome, matrícula e chave vêm da planilha/CSV: escapados para o corpo HTML
+    return CORPO_PONTO.format(primeiro_nome=html.escape(primeiro_nome), matricula=html.escape(str(matricula)),
+                              chave=html.escape(str(chave)), link_manual=LINK_MANUAL_PONTO)
+
+@st.cache_resource(show_spinner=False)
+def _anexo_em_cache(caminho, mtime):
+    with open(caminho, "rb") as f:
+        return f.read()
+
+def anexo_ponto():
+    """Bytes do treinamento em pptx, relidos só quando o arquivo muda no disco."""
+    return _anexo_em_cache(ANEXO_PONTO, os.path.getmtime(ANEXO_PONTO))
+
+# ==========================================
+# MALA DIRETA (.EML EM LOTE)
+# ==========================================
+def _nome_chave(coluna):
+    return normalizar_nome(coluna).str.casefold().str.replace(r"\s+", " ", regex=True)
+
+def ler_chaves(arquivo):
+    """Lê o CSV de chaves: uma coluna de Matrícula ou Nome e outra com a chave de ativação."""
+    df = pd.read_csv(arquivo, sep=None, engine="python", dtype=str, encoding="utf-8-sig").fillna("")
+    colunas = {str(c).strip().casefold(): c for c in df.columns}
+    col_chave = next((colunas[c] for c in colunas if "chave" in c), None)
+    col_matricula = next((colunas[c] for c in colunas if c.startswith("matr")), None)
+    col_nome = colunas.get("nome")
+    if col_chave is None or (col_matricula is None and col_nome is None):
+        raise ValueError("O CSV precisa de uma coluna 'Chave de ativação' e de uma coluna 'Matrícula' ou 'Nome'.")
+
+    return pd.DataFrame({
+        "Matrícula": df[col_matricula] if col_matricula is not None else "",
+        "Nome": df[col_nome] if col_nome is not None else "",
+        "Chave": df[col_chave].astype(str).str.strip(),
+    })
+
+def cruzar_chaves(df_clt, df_chaves):
+    """Junta as chaves aos CLTs ativos, pela matrícula e, na falta dela, pelo nome.
+
+    Retorna (encontrados, faltantes): `encontrados` traz as colunas da base
+    mais a chave; `faltantes` lista as linhas do CSV que não viram rascunho
+    (sem par na base, sem matrícula ou e-mail cadastrado, repetidas), com o motivo.
+    """
+    base = df_clt.reset_index(drop=True)
+    # Um dicionário por chave: cada linha do CSV é resolvida em O(1)
+    por_matricula = dict(zip(normalizar_matricula(base.get("Matrícula", pd.Series("", index=base.index))), base.index))
+    por_nome = dict(zip(_nome_chave(base["Nome"]), base.index))
+    por_matricula.pop("", None)
+    por_nome.pop("", None)
+
+    matriculas = normalizar_matricula(df_chaves["Matrícula"])
+    nomes = _nome_chave(df_chaves["Nome"])
+    matriculas_base = base.get("Matrícula", pd.Series("", index=base.index)).map(matricula_ahgora)
+    emails_base = base.get("E-mail corporativo", pd.Series("", index=base.index)).fillna("").astype(str).str.strip()
+    posicoes, faltantes, linha_da_pessoa = [], [], {}
+    for i, (matricula, nome, chave) in enumerate(zip(matriculas, nomes, df_chaves["Chave"])):
+        posicao = por_matricula.get(matricula) if matricula else por_nome.get(nome)
+        if posicao is None:
+            motivo = "Matrícula não encontrada entre os CLTs ativos" if matricula else "Nome não encontrado entre os CLTs ativos"
+        elif not chave:
+            motivo = "Chave de ativação vazia"
+        elif posicao in linha_da_pessoa:
+            motivo = f"Repetida: mesma pessoa da linha {linha_da_pessoa[posicao]}"
+        elif not matriculas_base.iloc[posicao]:
+            motivo = "Matrícula não cadastrada na planilha Master"
+        elif not emails_base.iloc[posicao]:
+            motivo = "E-mail corporativo não cadastrado na planilha Master"
+        else:
+            linha_da_pessoa[posicao] = i + 2
+            posicoes.append((posicao, chave))
+            continue
+        faltantes.append({"Linha do CSV": i + 2, "Matrícula": df_chaves["Matrícula"].iloc[i], "Nome": df_chaves["Nome"].iloc[i], "Motivo": motivo})
+
+    encontrados = base.iloc[[p for p, _ in posicoes]].copy()
+    encontrados["Chave"] = [c for _, c in posicoes]
+    encontrados["Matrícula_fmt"] = matriculas_base.iloc[[p for p, _ in posicoes]].to_numpy()
+    return encontrados, pd.DataFrame(faltantes, columns=["Linha do CSV", "Matrícula", "Nome", "Motivo"])
+
+def _parte_anexo(dados):
+    # Codificado em base64 uma única vez e reaproveitado por todas as mensagens
+    parte = EmailMessage()
+    parte.set_content(dados, *MIME_PPTX, disposition="attachment", filename=ANEXO_PONTO)
+    return parte
+
+def montar_eml(destinatario, copia, nome, matricula, chave, parte_anexo):
+    msg = EmailMessage(policy=SMTP)
+    msg["Subject"] = ASSUNTO_PONTO
+    msg["To"] = destinatario
+    if copia:
+        msg["Cc"] = copia
+    msg["X-Unsent"] = "1"  # Outlook abre como rascunho, pronto para enviar
+    msg.set_content(f"Olá, {nome}. Sua matrícula é {matricula} e a chave de ativação é {chave}.")
+    msg.add_alternative(corpo_email_ponto(nome, matricula, chave), subtype="html")
+    msg.make_mixed()
+    msg.attach(parte_anexo)
+    return msg.as_bytes()
+
+def gerar_rascunhos_ponto(df_ativos, df_chaves):
+    """Zip com um .eml por CLT encontrado e o relatório das linhas que não casaram.
+
+    Retorna (zip, quantidade gerada, faltantes).
+    """
+    encontrados, faltantes = cruzar_chaves(filtrar_clt(df_ativos), df_chaves)
+    # Liderança em cópia: e-mail corporativo do líder procurado pelo nome na base toda
+    email_por_nome = dict(zip(_nome_chave(df_ativos["Nome"]), normalizar_email(df_ativos.get("E-mail corporativo", pd.Series("", index=df_ativos.index)))))
+    lideres = _nome_chave(encontrados.get("Liderança direta", pd.Series("", index=encontrados.index)))
+    parte_anexo = _parte_anexo(anexo_ponto())
+
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for linha, lider in zip(encontrados.to_dict("records"), lideres):
+            destinatario = str(linha.get("E-mail corporativo", "") or "").strip()
+            eml = montar_eml(destinatario, email_por_nome.get(lider, ""), linha["Nome"], linha["Matrícula_fmt"], linha["Chave"], parte_anexo)
+            zf.writestr(f"Ponto - {linha['Nome']} - {linha['Matrícula_fmt']}.eml", eml)
+        if len(faltantes):
+            zf.writestr("Não encontrados.csv", faltantes.to_csv(index=False, sep=";").encode("utf-8-sig"))
+    return buffer.getvalue(), len(encontrados), faltantes
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def _rascunhos_em_cache(versao, conteudo_csv, _df_ativos):
+    return gerar_rascunhos_ponto(_df_ativos, ler_chaves(BytesIO(conteudo_csv)))
+
+def rascunhos_ponto_do_csv(df_ativos, conteudo_csv):
+    """Mesmo resultado de `gerar_rascunhos_ponto`, sem refazer o zip a cada rerun da tela."""
+    return _rascunhos_em_cache(versao_dados(df_ativos), conteudo_csv, df_ativos)
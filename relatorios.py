@@ -0,0 +1,156 @@
+import os
+import tempfile
+import threading
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from io import BytesIO
+
+import streamlit as st
+import xlsxwriter
+
+from indices import versao_dados
+
+# ==========================================
+# EXCEL EM STREAMING (XLSXWRITER)
+# ==========================================
+def colunas_exportaveis(df):
+    """Colunas da planilha original (sem as auxiliares *_dt / *_cent criadas na carga)."""
+    return [c for c in df.columns if not str(c).endswith(("_dt", "_cent"))]
+
+def _linhas(df):
+    # NaN/NaT viram None (célula em branco); datas seguem como datetime
+    return df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+
+def gerar_excel(abas):
+    """Workbook com uma aba por DataFrame, gravado linha a linha.
+
+    O modo `constant_memory` descarrega cada linha assim que ela é escrita,
+    então o pico de memória não cresce com o tamanho da base. Ele exige um
+    arquivo em disco, que é lido de volta e apagado.
+    """
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, "relatorio.xlsx")
+        wb = xlsxwriter.Workbook(caminho, {"constant_memory": True, "default_date_format": "dd/mm/yyyy", "strings_to_numbers": False})
+        cabecalho = wb.add_format({"bold": True, "font_color": "white", "bg_color": "#E30613"})
+        for nome, df in abas.items():
+            ws = wb.add_worksheet(str(nome)[:31])
+            ws.write_row(0, 0, [str(c) for c in df.columns], cabecalho)
+            for i, linha in enumerate(_linhas(df), start=1):
+                ws.write_row(i, 0, linha)
+            ws.freeze_panes(1, 0)
+            if len(df.columns):
+                ws.autofilter(0, 0, len(df), len(df.columns) - 1)
+        wb.close()
+        with open(caminho, "rb") as f:
+            return f.read()
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def _excel_em_cache(versao, selecao, colunas, _abas):
+    return gerar_excel({nome: df[[c for c in colunas if c in df.columns]] for nome, df in _abas.items()})
+
+def exportar_excel(abas, colunas):
+    """Bytes do xlsx, reaproveitados enquanto (colunas, abas, versão dos dados) não mudarem."""
+    versao = "|".join(versao_dados(df) for df in abas.values())
+    return _excel_em_cache(versao, tuple(abas), tuple(colunas), abas)
+
+# ==========================================
+# PACOTE DE RELATÓRIOS (ZIP EM SEGUNDO PLANO)
+# ==========================================
+WORKERS_PACOTE = 4
+MAX_PACOTES = 4  # versões guardadas ao mesmo tempo (sessões em versões diferentes durante a troca do snapshot)
+
+class PacoteRelatorios:
+    """Gera todos os relatórios de um snapshot em threads e junta tudo num zip.
+
+    O trabalho roda numa thread própria: a tela só consulta `progresso` e
+    `pronto`, nunca espera pela geração.
+    """
+
+    def __init__(self, geradores, rotulo):
+        self.geradores = geradores
+        self.rotulo = rotulo
+        self.total = len(geradores)
+        self.concluidos = 0
+        self.erros = {}
+        self.dados = None
+        self.falha = None  # erro que impediu o pacote inteiro (o zip não saiu)
+        self.iniciado_em = datetime.now()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._executar, daemon=True)
+        self._thread.start()
+
+    @property
+    def pronto(self):
+        return self.dados is not None
+
+    @property
+    def finalizado(self):
+        return self.pronto or self.falha is not None
+
+    @property
+    def progresso(self):
+        return self.concluidos / self.total if self.total else 1.0
+
+    def _gerar_arquivos(self, nome, gerar):
+        df = gerar()
+        arquivos = {f"{nome}.xlsx": gerar_excel({nome: df})}
+        if nome == "Master":
+            # CSV para quem cruza a base em outras ferramentas (Excel BR: ; e BOM)
+            arquivos[f"{nome}.csv"] = df.to_csv(index=False, sep=";").encode("utf-8-sig")
+        return arquivos
+
+    def _executar(self):
+        try:
+            self._montar_zip()
+        except Exception as e:
+            # Sem isso a tela ficaria acompanhando para sempre um pacote que nunca sai
+            self.falha = str(e) or type(e).__name__
+        finally:
+            self.geradores = None  # libera o snapshot das bases
+
+    def _montar_zip(self):
+        arquivos = {}
+        with ThreadPoolExecutor(max_workers=WORKERS_PACOTE) as pool:
+            futuros = {pool.submit(self._gerar_arquivos, nome, gerar): nome for nome, gerar in self.geradores.items()}
+            for futuro in as_completed(futuros):
+                try:
+                    arquivos.update(futuro.result())
+                except Exception as e:
+                    self.erros[futuros[futuro]] = str(e)
+                with self._lock:
+                    self.concluidos += 1
+
+        buffer = BytesIO()
+        with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            for nome in sorted(arquivos):
+                zf.writestr(f"{self.rotulo}/{nome}", arquivos[nome])
+        self.dados = buffer.getvalue()
+
+@st.cache_resource(show_spinner=False)
+def _registro_pacotes():
+    # Compartilhado por todas as sessões do processo: um pacote por versão dos dados (LRU)
+    return {"lock": threading.Lock(), "pacotes": OrderedDict()}
+
+def obter_pacote(versao):
+    registro = _registro_pacotes()
+    with registro["lock"]:
+        pacote = registro["pacotes"].get(versao)
+        if pacote is not None:
+            registro["pacotes"].move_to_end(versao)
+        return pacote
+
+def iniciar_pacote(versao, geradores, rotulo):
+    """Dispara a geração (se ainda não houver uma para esta versão, ou se a anterior falhou) e devolve o pacote."""
+    registro = _registro_pacotes()
+    with registro["lock"]:
+        pacotes = registro["pacotes"]
+        pacote = pacotes.get(versao)
+        if pacote is None or pacote.falha is not None:
+            pacote = pacotes[versao] = PacoteRelatorios(geradores, rotulo)
+        pacotes.move_to_end(versao)
+        # As versões menos usadas saem; uma sessão ainda na versão anterior não perde o pacote dela
+        while len(pacotes) > MAX_PACOTES:
+            pacotes.popitem(last=False)
+        return pacote
@@ -0,0 +1,251 @@
+import base64
+import hashlib
+import hmac
+import ipaddress
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+
+import bcrypt
+import streamlit as st
+
+# ==========================================
+# CONFIGURAÇÃO
+# ==========================================
+# O login continua no bcrypt; depois dele o navegador recebe um token assinado
+# (HMAC-SHA256) num cookie, e as próximas visitas só conferem a assinatura.
+COOKIE_SESSAO = "v4hub_sessao"
+VALIDADE_SESSAO = 12 * 3600  # segundos
+MAX_FALHAS_LOGIN = 5
+MAX_FALHAS_IP = 20  # por IP, somando todos os usuários tentados dele
+JANELA_FALHAS = 15 * 60  # segundos
+MAX_CHAVES_FALHAS = 10_000  # teto do registro de falhas; saem as chaves mais antigas
+# Tokens encerrados no "Sair" ficam em SQLite: valem para todos os processos e sobrevivem a reinícios
+SESSOES_REVOGADAS = os.environ.get("V4_SESSOES_REVOGADAS", ".sessoes_revogadas.sqlite3")
+
+def _b64(dados):
+    return base64.urlsafe_b64encode(dados).rstrip(b"=").decode("ascii")
+
+def _de_b64(texto):
+    return base64.urlsafe_b64decode(texto + "=" * (-len(texto) % 4))
+
+def _usuarios():
+    return st.secrets["users"] if "users" in st.secrets else {}
+
+def _chave_assinatura():
+    # Só com "session_secret" nos Secrets: uma chave derivada dos hashes das senhas
+    # deixaria quem vê os hashes forjar tokens. Sem ela, não há login por cookie.
+    segredo = str(st.secrets["session_secret"]) if "session_secret" in st.secrets else ""
+    return segredo.encode("utf-8") or None
+
+def cookie_disponivel():
+    return _chave_assinatura() is not None
+
+def _versao_senha(usuario):
+    """Muda quando a senha do usuário muda, derrubando os tokens antigos dele."""
+    return hashlib.sha256(_usuarios()[usuario]["password"].encode("utf-8")).hexdigest()[:16]
+
+# ==========================================
+# TOKEN ASSINADO
+# ==========================================
+@st.cache_resource(show_spinner=False)
+def _revogados():
+    # Tokens encerrados no "Sair" (id -> expiração), guardados até expirarem de qualquer forma
+    conexao = sqlite3.connect(SESSOES_REVOGADAS, check_same_thread=False)
+    with conexao:
+        conexao.execute("CREATE TABLE IF NOT EXISTS revogado (id TEXT PRIMARY KEY, exp REAL)")
+    return {"lock": threading.Lock(), "conexao": conexao}
+
+def _token_revogado(id_token):
+    revogados = _revogados()
+    with revogados["lock"]:
+        return revogados["conexao"].execute("SELECT 1 FROM revogado WHERE id = ?", (str(id_token),)).fetchone() is not None
+
+def emitir_token(usuario, agora=None):
+    """Token assinado para o usuário, ou None se não houver "session_secret"."""
+    chave = _chave_assinatura()
+    if chave is None:
+        return None
+    agora = int(agora or time.time())
+    carga = {"u": usuario, "exp": agora + VALIDADE_SESSAO, "v": _versao_senha(usuario), "id": secrets.token_urlsafe(9)}
+    corpo = _b64(json.dumps(carga, separators=(",", ":")).encode("utf-8"))
+    assinatura = _b64(hmac.new(chave, corpo.encode("ascii"), hashlib.sha256).digest())
+    return f"{corpo}.{assinatura}"
+
+def validar_token(token, agora=None):
+    """Usuário do token, ou None se a assinatura, a validade ou a senha não conferem."""
+    chave = _chave_assinatura()
+    if chave is None:
+        return None
+    try:
+        corpo, assinatura = str(token).split(".", 1)
+        esperada = _b64(hmac.new(chave, corpo.encode("ascii"), hashlib.sha256).digest())
+        if not hmac.compare_digest(assinatura, esperada):
+            return None
+        carga = json.loads(_de_b64(corpo))
+    except (ValueError, UnicodeError, KeyError, TypeError):
+        return None
+
+    usuario = carga.get("u")
+    if carga.get("exp", 0) < (agora or time.time()) or usuario not in _usuarios():
+        return None
+    if not hmac.compare_digest(str(carga.get("v", "")), _versao_senha(usuario)):
+        return None
+    if _token_revogado(carga.get("id")):
+        return None
+    return usuario
+
+def revogar_token(token):
+    try:
+        carga = json.loads(_de_b64(str(token).split(".", 1)[0]))
+    except (ValueError, UnicodeError):
+        return
+    revogados = _revogados()
+    with revogados["lock"], revogados["conexao"]:
+        # Limpa os que já expiraram de qualquer forma
+        revogados["conexao"].execute("DELETE FROM revogado WHERE exp < ?", (time.time(),))
+        revogados["conexao"].execute("INSERT OR REPLACE INTO revogado VALUES (?, ?)", (str(carga.get("id")), carga.get("exp", 0)))
+
+# ==========================================
+# LIMITE DE TENTATIVAS
+# ==========================================
+@st.cache_resource(show_spinner=False)
+def _falhas_login():
+    # chave -> horários das falhas recentes; a ordem é a da última falha (mais antigas primeiro)
+    return {"lock": threading.Lock(), "falhas": OrderedDict()}
+
+def _ip_confiavel():
+    """IP do cliente, só se for um endereço público.
+
+    Atrás de proxy reverso (Streamlit Cloud, nginx) todo mundo chega pelo mesmo
+    endereço interno; contar falhas por ele bloquearia todos os logins de uma vez.
+    """
+    ip = st.context.ip_address
+    try:
+        return ip if ip and ipaddress.ip_address(ip).is_global else None
+    except ValueError:
+        return None
+
+def _chaves_tentativa(usuario):
+    """(chave, limite) das contagens que valem para esta tentativa.
+
+    Com IP confiável, o usuário é contado junto com o IP: quem erra a senha de
+    outra pessoa de longe não tranca a conta dela. Sem IP confiável sobra só o
+    usuário, e apenas para usuários que existem (nomes inventados não ocupam o registro).
+    """
+    usuario = usuario.strip().lower()
+    existe = usuario in {u.lower() for u in _usuarios()}
+    ip = _ip_confiavel()
+    if ip:
+        return [(f"ip:{ip}", MAX_FALHAS_IP)] + ([(f"u:{usuario}|ip:{ip}", MAX_FALHAS_LOGIN)] if existe else [])
+    return [(f"u:{usuario}", MAX_FALHAS_LOGIN)] if existe else []
+
+def _expurgar(falhas, chave, agora):
+    fila = falhas.get(chave)
+    while fila and fila[0] < agora - JANELA_FALHAS:
+        fila.popleft()
+    if fila is not None and not fila:
+        del falhas[chave]
+        return None
+    return fila
+
+def segundos_bloqueado(usuario, agora=None):
+    """Quanto falta para liberar novas tentativas (0 se liberado)."""
+    agora = agora or time.time()
+    registro = _falhas_login()
+    espera = 0
+    with registro["lock"]:
+        for chave, limite in _chaves_tentativa(usuario):
+            fila = _expurgar(registro["falhas"], chave, agora)
+            if fila and len(fila) >= limite:
+                espera = max(espera, fila[0] + JANELA_FALHAS - agora)
+    return int(espera)
+
+def _registrar_falha(usuario):
+    registro = _falhas_login()
+    agora = time.time()
+    with registro["lock"]:
+        falhas = registro["falhas"]
+        for chave, limite in _chaves_tentativa(usuario):
+            fila = _expurgar(falhas, chave, agora)
+            if fila is None:
+                fila = falhas[chave] = deque(maxlen=limite)
+            fila.append(agora)
+            falhas.move_to_end(chave)
+        while len(falhas) > MAX_CHAVES_FALHAS:
+            falhas.popitem(last=False)
+
+def _limpar_falhas(usuario):
+    registro = _falhas_login()
+    with registro["lock"]:
+        # O contador do IP continua: ele também soma tentativas em outros usuários
+        for chave, _ in _chaves_tentativa(usuario):
+            if chave.startswith("u:"):
+                registro["falhas"].pop(chave, None)
+
+# ==========================================
+# LOGIN / COOKIE
+# ==========================================
+def autenticar(usuario, senha):
+    """Confere usuário e senha (bcrypt). Retorna (ok, mensagem de erro)."""
+    espera = segundos_bloqueado(usuario)
+    if espera:
+        return False, f"Muitas tentativas sem sucesso. Tente novamente em {max(1, espera // 60)} min."
+    dados = _usuarios().get(usuario)
+    if dados is None or not bcrypt.checkpw(senha.encode("utf-8"), dados["password"].encode("utf-8")):
+        _registrar_falha(usuario)
+        return False, "Usuário ou senha inválidos"
+    _limpar_falhas(usuario)
+    return True, ""
+
+def usuario_do_cookie():
+    token = st.context.cookies.get(COOKIE_SESSAO)
+    return validar_token(token) if token else None
+
+def _gravar_cookie(valor, max_age):
+    # O Streamlit não grava cookies pela resposta HTTP, então este não pode ser HttpOnly:
+    # por isso todo texto da planilha que entra em bloco HTML é escapado antes
+    seguro = "; Secure" if str(st.context.url or "").startswith("https") else ""
+    st.html(
+        f"<script>document.cookie = '{COOKIE_SESSAO}={valor}; Max-Age={max_age}; Path=/; SameSite=Strict{seguro}';</script>",
+        unsafe_allow_javascript=True,
+    )
+
+def iniciar_sessao(usuario):
+    """Marca a sessão como autenticada; o cookie é gravado no próximo render (`aplicar_cookie`)."""
+    st.session_state.authenticated = True
+    st.session_state.user_name = _usuarios()[usuario]["name"]
+    # Sem "session_secret" o login vale só para esta aba (nenhum cookie é gravado)
+    token = emitir_token(usuario)
+    if token:
+        st.session_state.token_sessao = st.session_state.cookie_pendente = token
+
+def aplicar_cookie():
+    """Grava (ou apaga, depois do "Sair") o cookie pendente. Deve rodar num render normal, sem st.rerun logo depois."""
+    token = st.session_state.pop("cookie_pendente", None)
+    if token:
+        _gravar_cookie(token, VALIDADE_SESSAO)
+    if st.session_state.pop("limpar_cookie", False):
+        _gravar_cookie("", 0)
+
+def restaurar_sessao():
+    """Recupera o login pelo cookie, sem bcrypt. True se a sessão ficou autenticada."""
+    usuario = usuario_do_cookie()
+    if usuario is None:
+        return False
+    st.session_state.authenticated = True
+    st.session_state.user_name = _usuarios()[usuario]["name"]
+    st.session_state.token_sessao = st.context.cookies.get(COOKIE_SESSAO)
+    return True
+
+def encerrar_sessao():
+    token = st.session_state.pop("token_sessao", None)
+    if token:
+        revogar_token(token)
+    st.session_state.authenticated = False
+    st.session_state.pop("cookie_pendente", None)
+    st.session_state.limpar_cookie = True
@@ -0,0 +1,113 @@
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+from indices import registrar_versao, versao_dados
+
+# ==========================================
+# SNAPSHOT COMPARTILHADO DAS BASES
+# ==========================================
+# Uma cópia das bases por processo, não por sessão. O pandas usa copy-on-write:
+# as sessões recebem visões rasas, e qualquer escrita numa visão copia só o
+# que foi alterado, sem tocar no snapshot.
+# No pandas 3 o copy-on-write é sempre ligado; antes disso precisa da opção
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+VALIDADE_SNAPSHOT = 600  # segundos (mesmo TTL da leitura antiga da planilha)
+
+class Snapshot:
+    """Versão imutável das bases: originais da planilha e preparadas para o DP."""
+
+    def __init__(self, versoes, df_ativos, df_desligados, preparar=None):
+        self.versao = "|".join(versoes)
+        self.carregado_em = datetime.now()
+        self._bases = {"ativos": df_ativos, "desligados": df_desligados}
+        self._versoes = dict(zip(("ativos", "desligados"), versoes))
+        if preparar is not None:
+            self._bases["ativos_proc"] = preparar(df_ativos)
+            self._bases["desligados_proc"] = preparar(df_desligados)
+            # Calculadas uma vez por carga; as visões já saem com a versão registrada
+            for nome in ("ativos_proc", "desligados_proc"):
+                self._versoes[nome] = versao_dados(self._bases[nome])
+
+    def _visao(self, nome):
+        # Objeto novo a cada pedido: incluir coluna numa sessão não aparece nas outras.
+        # A versão vai junto, então os índices "por versão" não relêem a base a cada chamada.
+        return registrar_versao(self._bases[nome].copy(deep=False), self._versoes[nome])
+
+    @property
+    def ativos(self):
+        return self._visao("ativos")
+
+    @property
+    def desligados(self):
+        return self._visao("desligados")
+
+    @property
+    def ativos_proc(self):
+        return self._visao("ativos_proc")
+
+    @property
+    def desligados_proc(self):
+        return self._visao("desligados_proc")
+
+class LojaSnapshots:
+    """Guarda o snapshot atual do processo e troca de versão de forma atômica.
+
+    Leitores só pegam a referência de `atual` (sem lock) e usam o mesmo objeto
+    até o fim do rerun. Só um escritor por vez busca e prepara a versão nova;
+    enquanto isso os outros seguem com a versão anterior.
+    """
+
+    def __init__(self, validade=VALIDADE_SNAPSHOT):
+        self.validade = validade
+        self.atual = None
+        self.ultimo_erro = None
+        self._buscado_em = 0.0
+        self._lock_escrita = threading.Lock()
+
+    def _vencido(self):
+        return self.atual is None or time.monotonic() - self._buscado_em > self.validade
+
+    def obter(self, carregar, preparar=None):
+        snapshot = self.atual
+        if snapshot is not None and not self._vencido():
+            return snapshot
+        # Com uma versão em mãos, ninguém espera a planilha: quem não conseguir o
+        # lock segue com o snapshot atual enquanto outro rerun busca o novo
+        if not self._lock_escrita.acquire(blocking=snapshot is None):
+            return snapshot
+        try:
+            if not self._vencido():
+                return self.atual
+            try:
+                df_ativos, df_desligados = carregar()
+            except Exception as e:
+                if self.atual is None:
+                    raise
+                # Planilha fora do ar: segue com a última versão boa
+                self.ultimo_erro = e
+                self._buscado_em = time.monotonic()
+                return self.atual
+            self.ultimo_erro = None
+            self._buscado_em = time.monotonic()
+            versoes = (versao_dados(df_ativos), versao_dados(df_desligados))
+            if self.atual is not None and "|".join(versoes) == self.atual.versao:
+                return self.atual  # nada mudou: mantém o objeto (e os caches ligados a ele)
+            # Prepara fora da vista dos leitores; a troca é uma única atribuição
+            self.atual = Snapshot(versoes, df_ativos, df_desligados, preparar)
+            return self.atual
+        finally:
+            self._lock_escrita.release()
+
+    def invalidar(self):
+        """Força a próxima leitura a buscar a planilha de novo."""
+        self._buscado_em = 0.0
+
+@st.cache_resource(show_spinner=False)
+def loja_snapshots():
+    return LojaSnapshots()
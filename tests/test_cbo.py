@@ -0,0 +1,39 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cbo import CatalogoCBO
+
+LINHAS = [
+    "2521-05 - Administrador",
+    "2124-05 – Analista de desenvolvimento de sistemas",
+    "1423-05: Gerente de marketing",
+    "2531-15 | Analista de mídias sociais",
+    "4110-10 - Assistente administrativo",
+    "linha sem código",
+]
+
+def test_linhas_com_separadores_variados():
+    catalogo = CatalogoCBO(LINHAS)
+    assert len(catalogo) == 5
+    assert catalogo.descricao(252105.0) == "Administrador"
+    assert catalogo.rotulo("2531-15") == "2531-15 - Analista de mídias sociais"
+
+def test_busca_por_prefixo_ignora_acento_e_caixa():
+    catalogo = CatalogoCBO(LINHAS)
+    assert catalogo.buscar("midia") == ["253115"]
+    assert catalogo.buscar("MÍDIAS") == ["253115"]
+    assert catalogo.buscar("anal sist") == ["212405"]
+    assert sorted(catalogo.buscar("ADMIN")) == ["252105", "411010"]
+
+def test_descricao_que_comeca_pelo_termo_vem_primeiro():
+    catalogo = CatalogoCBO(LINHAS)
+    assert catalogo.buscar("admin") == ["252105", "411010"]
+    assert catalogo.buscar("assist admin") == ["411010"]
+
+def test_busca_por_prefixo_do_codigo():
+    catalogo = CatalogoCBO(LINHAS)
+    assert catalogo.buscar("2") == ["212405", "252105", "253115"]
+    assert catalogo.buscar("2521-0") == ["252105"]
+    assert catalogo.buscar("9") == []
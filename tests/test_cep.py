@@ -0,0 +1,21 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cep import normalizar_cep
+
+def test_cep_da_planilha_recupera_o_zero_perdido():
+    assert normalizar_cep(1310100.0) == "01310100"
+    assert normalizar_cep("1310100") == "01310100"
+    assert normalizar_cep("01310-100") == "01310100"
+    assert normalizar_cep(" 88.015-600 ") == "88015600"
+
+def test_cep_curto_ou_invalido_vira_vazio():
+    for valor in ["13101", "131010", "123456789", "abcde-fgh", "0000000", "", None, float("nan")]:
+        assert normalizar_cep(valor) == ""
+
+def test_cep_digitado_exige_os_oito_digitos():
+    assert normalizar_cep("1310100", digitado=True) == ""
+    assert normalizar_cep("01310-10", digitado=True) == ""
+    assert normalizar_cep("01310-100", digitado=True) == "01310100"
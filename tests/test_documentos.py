@@ -0,0 +1,32 @@
+import os
+import sys
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from documentos import ModeloDocx
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _modelo():
+    with open(os.path.join(RAIZ, "declaracao_vale_transporte_clt.docx"), "rb") as f:
+        return ModeloDocx(f.read())
+
+def test_renderizar_em_threads_gera_zips_validos():
+    modelo = _modelo()
+    mapas = [{m: f"Valor {i} " * (1 + i % 7) for m in modelo.marcadores} for i in range(480)]
+
+    def renderizar(mapa):
+        with zipfile.ZipFile(BytesIO(modelo.renderizar(mapa))) as zf:
+            return zf.testzip()
+
+    # Troca de thread bem mais frequente para a disputa aparecer mesmo com um só núcleo
+    intervalo = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            assert list(pool.map(renderizar, mapas)) == [None] * len(mapas)
+    finally:
+        sys.setswitchinterval(intervalo)
@@ -0,0 +1,67 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from indicadores import MotorHeadcount, matriz_retencao
+
+def _ativos(inicios):
+    return pd.DataFrame({"Nome": [f"A{i}" for i in range(len(inicios))], "Início na V4": inicios, "Área": "Tech"})
+
+def _desligados(pares):
+    return pd.DataFrame({
+        "Nome": [f"D{i}" for i in range(len(pares))],
+        "Início na V4": [i for i, _ in pares],
+        "Data de rescisão": [f for _, f in pares],
+        "Área": "Vendas",
+    })
+
+def test_motor_sem_intervalos():
+    for ativos, desligados in [(pd.DataFrame(), pd.DataFrame()), (None, None), (_ativos(["sem data"]), pd.DataFrame())]:
+        motor = MotorHeadcount(ativos, desligados)
+        assert motor.intervalos.empty
+        assert motor.headcount_em(["2024-01-01", "2024-06-30"]).tolist() == [0, 0]
+        assert motor.serie_mensal("2024-01-01", "2024-03-01").empty
+        assert motor.retencao_coortes(hoje="2024-06-01").empty
+
+def test_headcount_conta_o_dia_da_rescisao():
+    motor = MotorHeadcount(_ativos(["01/01/2024"]), _desligados([("01/02/2024", "15/03/2024")]))
+    datas = ["2023-12-31", "2024-01-01", "2024-02-01", "2024-03-15", "2024-03-16"]
+    assert motor.headcount_em(datas).tolist() == [0, 1, 2, 2, 1]
+
+def test_rescisao_antes_da_admissao_e_descartada():
+    motor = MotorHeadcount(None, _desligados([("10/05/2024", "01/05/2024"), ("01/01/2024", "")]))
+    assert motor.intervalos.empty
+    assert motor.descartados == 2
+
+def test_serie_mensal_soma_admissoes_e_desligamentos():
+    motor = MotorHeadcount(_ativos(["01/01/2024", "10/02/2024"]), _desligados([("01/12/2023", "20/02/2024")]))
+    serie = motor.serie_mensal("2024-01-01", "2024-03-01").set_index("Mês")
+    assert serie["Headcount"].tolist() == [2, 2, 2]
+    assert serie["Admissões"].tolist() == [1, 1, 0]
+    assert serie["Desligamentos"].tolist() == [0, 1, 0]
+    assert np.isclose(serie.loc["2024-02-01", "Turnover %"], 50.0)
+
+def test_matriz_retencao_por_coorte():
+    motor = MotorHeadcount(_ativos(["31/01/2024", "01/10/2024"]), _desligados([("15/01/2024", "14/05/2024")]))
+    matriz = matriz_retencao(motor.intervalos, marcos=(3, 6), hoje="2024-12-31").set_index("Coorte")
+    janeiro, outubro = pd.Period("2024-01", "M"), pd.Period("2024-10", "M")
+    assert matriz.loc[janeiro, "Admitidos"] == 2
+    assert matriz.loc[janeiro, "3m"] == 100.0
+    assert matriz.loc[janeiro, "6m"] == 50.0
+    # Ainda sem 3 meses de casa: célula não observável
+    assert matriz.loc[outubro, "Admitidos"] == 1
+    assert np.isnan(matriz.loc[outubro, "3m"])
+
+def test_matriz_retencao_usa_meses_de_calendario():
+    motor = MotorHeadcount(_ativos(["30/11/2024"]), None)
+    assert matriz_retencao(motor.intervalos, marcos=(3,), hoje="2025-02-27")["3m"].isna().all()
+    assert matriz_retencao(motor.intervalos, marcos=(3,), hoje="2025-02-28")["3m"].tolist() == [100.0]
+
+def test_matriz_retencao_vazia():
+    matriz = matriz_retencao(MotorHeadcount(None, None).intervalos, marcos=(3, 6))
+    assert matriz.empty
+    assert list(matriz.columns) == ["Coorte", "Admitidos", "3m", "6m"]
@@ -0,0 +1,37 @@
+import os
+import sys
+from datetime import date
+
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from indices import diferenca_calendario
+
+def _tupla(dif, i=0):
+    linha = dif.iloc[i]
+    return (linha["anos"], linha["meses"], linha["dias"])
+
+def test_29_de_fevereiro_completa_o_ano_no_fim_de_fevereiro():
+    assert _tupla(diferenca_calendario(["2020-02-29"], date(2021, 2, 28))) == (1, 0, 0)
+    assert _tupla(diferenca_calendario(["2020-02-29"], date(2024, 2, 29))) == (4, 0, 0)
+    assert _tupla(diferenca_calendario(["2020-02-29"], date(2021, 3, 1))) == (1, 0, 1)
+
+def test_fim_de_mes_e_limitado_ao_ultimo_dia_do_mes_de_destino():
+    assert _tupla(diferenca_calendario(["2023-01-31"], date(2023, 2, 28))) == (0, 1, 0)
+    assert _tupla(diferenca_calendario(["2023-01-31"], date(2023, 3, 30))) == (0, 1, 30)
+    assert _tupla(diferenca_calendario(["2023-03-31"], date(2023, 4, 30))) == (0, 1, 0)
+
+def test_confere_com_relativedelta_dia_a_dia():
+    inicios = pd.Series(pd.date_range("2019-12-25", "2021-03-05", freq="D"))
+    fim = date(2024, 2, 29)
+    dif = diferenca_calendario(inicios, fim)
+    esperado = [relativedelta(fim, d.date()) for d in inicios]
+    assert list(zip(dif["anos"], dif["meses"], dif["dias"])) == [(r.years, r.months, r.days) for r in esperado]
+
+def test_inicio_vazio_ou_depois_do_fim_fica_nulo():
+    dif = diferenca_calendario(["2025-01-10", None, "2023-05-01"], date(2024, 6, 1))
+    assert dif.iloc[0].isna().all()
+    assert dif.iloc[1].isna().all()
+    assert _tupla(dif, 2) == (1, 1, 0)
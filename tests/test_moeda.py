@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from moeda import falhas_remuneracao, formatar_brl, remuneracao_em_centavos
+
+def test_remuneracao_em_formato_brasileiro_e_numerico():
+    valores = pd.Series(["R$ 5.000,00", "5000,5", "5.000", "5000.50", "1.234.567,89", "-R$ 10,00", 3500.0, "R$\xa0900"])
+    centavos, falhas = remuneracao_em_centavos(valores)
+    assert centavos.tolist() == [500000, 500050, 500000, 500050, 123456789, -1000, 350000, 90000]
+    assert not falhas.any()
+
+def test_remuneracao_vazia_nao_e_falha_e_texto_invalido_e():
+    centavos, falhas = remuneracao_em_centavos(pd.Series(["", None, "nan", "a combinar", "5,000.00"]))
+    assert centavos.isna().all()
+    assert falhas.tolist() == [False, False, False, True, True]
+
+def test_falhas_remuneracao_usa_a_coluna_preparada():
+    df = pd.DataFrame({"Remuneração": ["R$ 1.000,00", "???", ""]})
+    df["Remuneração_cent"] = remuneracao_em_centavos(df["Remuneração"])[0]
+    assert falhas_remuneracao(df).tolist() == [False, True, False]
+
+def test_formatar_brl():
+    assert formatar_brl([1234.56, 0, -1500, 1_000_000.005, None, "x"]).tolist() == [
+        "R$ 1.234,56", "R$ 0,00", "-R$ 1.500,00", "R$ 1.000.000,00", "", "",
+    ]
+    assert formatar_brl(pd.Series([123456789, 5]), em_centavos=True).tolist() == ["R$ 1.234.567,89", "R$ 0,05"]